@@ -1,387 +1,446 @@
 # app.py
 import streamlit as st
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
-import re
 import pandas as pd
+import plotly.graph_objects as go
 from io import StringIO, BytesIO
-import base64
-import zipfile
 
-def parse_kml_file(uploaded_file):
-    """Parse KML file dan ekstrak informasi dengan struktur folder asli"""
+from movetoheal.browse import filter_placemarks, page_count, page_rows
+from movetoheal.cache import cache_from_env, content_hash, profile_key
+from movetoheal.diff import diff_revisions, diff_rows, folder_signatures
+from movetoheal.export import (build_folder_zip, folder_filename, render_delta, render_document, render_folder,
+                               render_folder_exports, render_tiled_kmz, render_validation)
+from movetoheal.kmz import KML_MIME, KMZ_MIME, write_kmz
+from movetoheal.merge import merge_key, merge_parsed, parse_sources, source_names
+from movetoheal.parser import PARSE_ERRORS, parse_kml
+from movetoheal import perf
+from movetoheal.preview import MAX_PRIMITIVES, preview_data
+from movetoheal.rules import DEFAULT_RULE_SET, classify_placemarks, load_rule_set
+from movetoheal.simplify import simplification_report, simplify_store
+from movetoheal.stats import compute_network_stats, stats_to_csv
+from movetoheal.store import GEOMETRY_TYPES
+from movetoheal.tiles import DEFAULT_MAX_PER_TILE
+from movetoheal.validate import (DEFAULT_OPTIONS, OFFENDER_FOLDERS, build_spatial_index, report_rows,
+                                 validate_network)
+from movetoheal.writer import EXPORT_PROFILES, kml_preview, write_enhanced_kml, write_single_folder_kml
+
+def parse_kml_file(uploaded_file, rule_set=None, classify=True):
+    """Parse KML/KMZ dengan struktur folder asli (lihat movetoheal.parser.parse_kml)
+
+    Mengembalikan (folders_data, store); bila file rusak, pesan error
+    ditampilkan dan hasilnya ([], None).
+    """
     try:
-        content = uploaded_file.getvalue().decode('utf-8')
-        root = ET.fromstring(content)
-    except:
+        return parse_kml(uploaded_file, rule_set, classify)
+    except PARSE_ERRORS:
         st.error("Error parsing KML file")
-        return [], []
-    
-    folders_data = []
-    all_placemarks = []
-    
-    # Cari semua Folder dan Placemark dalam file KML
-    for folder in root.iter('{http://www.opengis.net/kml/2.2}Folder'):
-        folder_data = {
-            'name': '',
-            'placemarks': []
-        }
-        
-        # Extract folder name
-        name_elem = folder.find('{http://www.opengis.net/kml/2.2}name')
-        folder_data['name'] = name_elem.text if name_elem is not None else 'Unnamed Folder'
-        
-        # Extract placemarks dalam folder ini
-        for placemark in folder.findall('.//{http://www.opengis.net/kml/2.2}Placemark'):
-            placemark_data = extract_placemark_data(placemark)
-            if placemark_data:
-                folder_data['placemarks'].append(placemark_data)
-                all_placemarks.append(placemark_data)
-        
-        folders_data.append(folder_data)
-    
-    # Juga cari Placemark langsung di root (tanpa folder)
-    root_placemarks = []
-    for placemark in root.findall('.//{http://www.opengis.net/kml/2.2}Placemark'):
-        # Skip jika placemark sudah ada dalam folder
-        placemark_name = placemark.find('{http://www.opengis.net/kml/2.2}name')
-        placemark_name = placemark_name.text if placemark_name is not None else ''
-        
-        if not any(pm['name'] == placemark_name for folder in folders_data for pm in folder['placemarks']):
-            placemark_data = extract_placemark_data(placemark)
-            if placemark_data:
-                root_placemarks.append(placemark_data)
-                all_placemarks.append(placemark_data)
+        return [], None
+
+def identify_type(name, description, rule_set=None):
+    """Identifikasi tipe berdasarkan nama dan deskripsi (satu placemark)"""
+    return (rule_set or DEFAULT_RULE_SET).classify_one(name, description)
+
+def get_style_for_type(type_name, geometry_type, rule_set=None):
+    """Dapatkan style berdasarkan tipe dan geometri"""
+    return (rule_set or DEFAULT_RULE_SET).style_for(type_name)
+
+def create_enhanced_kml(folders_data, store, rule_set=None, profile=None):
+    """Buat KML baru dengan struktur folder asli dan style yang diperbarui"""
+    output = StringIO()
+    write_enhanced_kml(output, folders_data, store, rule_set, profile)
+    return output.getvalue()
+
+def create_enhanced_kmz(folders_data, store, rule_set=None, profile=None):
+    """Sama seperti create_enhanced_kml, dikompresi langsung menjadi KMZ (bytes)"""
+    output = BytesIO()
+    write_kmz(output, lambda entry: write_enhanced_kml(entry, folders_data, store, rule_set, profile))
+    return output.getvalue()
+
+def create_single_folder_kml(folder_data, store, rule_set=None, profile=None):
+    """Buat KML untuk satu folder saja"""
+    output = StringIO()
+    write_single_folder_kml(output, folder_data, store, rule_set, profile)
+    return output.getvalue()
+
+def create_zip_with_separate_kmls(folders_data, store, rule_set=None, profile=None, output_format='kml'):
+    """Buat file ZIP berisi KML (atau KMZ) terpisah untuk setiap folder"""
+    exports = render_folder_exports(folders_data, store, rule_set, profile, output_format)
+    return build_folder_zip(exports)
+
+@st.cache_resource
+def get_result_cache():
+    """Satu ResultCache bersama untuk semua sesi (anggaran dari environment)"""
+    return cache_from_env()
+
+
+def load_placemarks(uploaded_file, rule_set, cache):
+    """Parse dan klasifikasi lewat cache; mengembalikan (file_hash, folders_data, store)
+
+    Hasil parse dikunci dengan hash isi file saja dan klasifikasi dengan hash
+    file + sidik aturan, sehingga mengganti aturan tidak mem-parse ulang.
+    """
+    file_hash = content_hash(uploaded_file)
+
+    def parse():
+        folders_data, store = parse_kml_file(uploaded_file, classify=False)
+        return (folders_data, store) if store is not None else None
+
+    parsed = cache.get_or_compute(('parse', file_hash), parse)
+    if parsed is None:
+        return file_hash, [], None
+    folders_data, store = parsed
+    return file_hash, folders_data, classify_cached(cache, file_hash, store, rule_set)
+
+
+def classify_cached(cache, key, store, rule_set):
+    """Store dengan tipe dari cache klasifikasi (kunci: hash upload + sidik aturan)"""
+    types = cache.get_or_compute(
+        ('classify', key, rule_set.fingerprint),
+        lambda: classify_placemarks(store.with_types(None), rule_set).type,
+    )
+    # Store hasil parse dipakai bersama antar sesi; tipe dipasang pada salinan
+    return store.with_types(types)
+
+
+def load_uploads(uploaded_files, rule_set, cache):
+    """Parse banyak file (paralel, hanya yang belum ada di cache) lalu gabungkan
+
+    Satu file dipakai apa adanya dengan kunci hash file. Beberapa file
+    digabung menjadi satu pohon folder per file sumber dengan placemark
+    duplikat dibuang (lihat movetoheal.merge). Mengembalikan (upload_hash,
+    folders_data, store, file_rows); store None bila tidak ada file yang
+    berhasil diparse.
+    """
+    hashes = [content_hash(uploaded_file) for uploaded_file in uploaded_files]
+    parsed = {file_hash: cache.get(('parse', file_hash)) for file_hash in dict.fromkeys(hashes)}
+    pending = {file_hash: uploaded_file for uploaded_file, file_hash in zip(uploaded_files, hashes)
+               if parsed[file_hash] is None}
+    results = dict(zip(pending, parse_sources([uploaded_file.getvalue() for uploaded_file in pending.values()])))
+    for file_hash, result in results.items():
+        if result['parsed'] is not None:
+            parsed[file_hash] = cache.put(('parse', file_hash), result['parsed'])
     
-    # Jika ada placemark di root, buat folder khusus
-    if root_placemarks:
-        folders_data.append({
-            'name': 'Root Placemarks',
-            'placemarks': root_placemarks
+    file_rows, sources = [], []
+    for uploaded_file, file_hash, source_name in zip(uploaded_files, hashes, source_names([f.name for f in uploaded_files])):
+        result = results.get(file_hash)
+        ok = parsed[file_hash] is not None
+        file_rows.append({
+            'File': uploaded_file.name,
+            'Status': 'OK' if ok else 'Error',
+            'Placemark': len(parsed[file_hash][1]) if ok else 0,
+            'Duplikat Dibuang': 0,
+            'Ukuran': format_size(uploaded_file.size),
+            'Waktu Parse (s)': result['seconds'] if result else None,
+            'Dari Cache': result is None,
+            'Error': result['error'] if result else None,
         })
+        if ok:
+            sources.append((source_name, file_hash, len(file_rows) - 1))
+    if not sources:
+        return None, [], None, file_rows
     
-    return folders_data, all_placemarks
+    if len(uploaded_files) == 1:
+        upload_hash = hashes[0]
+        folders_data, store = parsed[upload_hash]
+    else:
+        upload_hash = merge_key((source_name, file_hash) for source_name, file_hash, _ in sources)
+        folders_data, store, merge_rows = cache.get_or_compute(('merge', upload_hash), lambda: merge_parsed(
+            [(source_name, *parsed[file_hash]) for source_name, file_hash, _ in sources]))
+        for (_, _, row_index), merge_row in zip(sources, merge_rows):
+            file_rows[row_index]['Duplikat Dibuang'] = merge_row['Duplikat Dibuang']
+    return upload_hash, folders_data, classify_cached(cache, upload_hash, store, rule_set), file_rows
+
+
+def render_cache_panel(cache):
+    """Panel sidebar: hit/miss cache per tahap dan pemakaian anggaran"""
+    summary = cache.summary()
+    st.subheader("🗄️ Cache")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Hit", summary['hit'])
+    with col2:
+        st.metric("Miss", summary['miss'])
+    st.caption(f"Memori: {format_size(summary['memory_used'])} / {format_size(summary['memory_budget'])} "
+               f"· {summary['entries']} entry")
+    if summary['disk_budget']:
+        st.caption(f"Disk: {format_size(summary['disk_used'])} / {format_size(summary['disk_budget'])}")
+    if summary['stages']:
+        st.dataframe(pd.DataFrame([
+            {'Tahap': stage, 'Hit': counters['hit'], 'Miss': counters['miss']}
+            for stage, counters in summary['stages'].items()
+        ]), use_container_width=True, hide_index=True)
+    if st.button("Kosongkan cache"):
+        cache.clear()
 
-def extract_placemark_data(placemark):
-    """Ekstrak data dari placemark termasuk geometry asli"""
-    placemark_data = {}
+
+def render_placemark_browser(folders_data, store, rule_set):
+    """Satu tabel placemark gabungan dengan filter dan paginasi di server"""
+    st.write("**Daftar Placemark:**")
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 3])
+    with col1:
+        folder_ids = st.multiselect("Folder (termasuk subfolder)", [f['id'] for f in folders_data],
+                                    format_func=lambda folder_id: folders_data[folder_id]['path'])
+    with col2:
+        types = st.multiselect("Tipe", sorted(set(store.type)))
+    with col3:
+        geometries = st.multiselect("Geometri", list(GEOMETRY_TYPES))
+    with col4:
+        name_query = st.text_input("Cari nama")
     
-    # Extract name
-    name_elem = placemark.find('{http://www.opengis.net/kml/2.2}name')
-    placemark_data['name'] = name_elem.text if name_elem is not None else 'N/A'
+    attribute = None
+    if store.attributes:
+        col1, col2 = st.columns([3, 7])
+        with col1:
+            attribute_name = st.selectbox("Atribut", [''] + list(store.attributes),
+                                          format_func=lambda name: name or '(semua)')
+        with col2:
+            attribute_value = st.text_input("Nilai atribut (sama persis)", disabled=not attribute_name)
+        attribute = (attribute_name, attribute_value.strip())
     
-    # Extract description
-    desc_elem = placemark.find('{http://www.opengis.net/kml/2.2}description')
-    placemark_data['description'] = desc_elem.text if desc_elem is not None else ''
+    indices = filter_placemarks(store, folders_data, folder_ids, types, geometries, name_query.strip(), attribute)
     
-    # Extract geometry type dan coordinates asli
-    line_string_elem = placemark.find('.//{http://www.opengis.net/kml/2.2}LineString')
-    point_elem = placemark.find('.//{http://www.opengis.net/kml/2.2}Point')
+    col1, col2, col3 = st.columns([2, 2, 6])
+    with col1:
+        page_size = st.selectbox("Baris per halaman", [50, 100, 250, 500], index=1)
+    pages = page_count(len(indices), page_size)
+    with col2:
+        page = st.number_input("Halaman", min_value=1, max_value=pages, value=1, step=1)
+    with col3:
+        st.caption(f"{len(indices)} dari {len(store)} placemark cocok · halaman {page} dari {pages}")
     
-    if line_string_elem is not None:
-        placemark_data['geometry_type'] = 'LineString'
-        coords_elem = line_string_elem.find('{http://www.opengis.net/kml/2.2}coordinates')
-        placemark_data['coordinates'] = coords_elem.text if coords_elem is not None else 'N/A'
-        placemark_data['original_geometry'] = 'LineString'
-    elif point_elem is not None:
-        placemark_data['geometry_type'] = 'Point'
-        coords_elem = point_elem.find('{http://www.opengis.net/kml/2.2}coordinates')
-        placemark_data['coordinates'] = coords_elem.text if coords_elem is not None else 'N/A'
-        placemark_data['original_geometry'] = 'Point'
+    rows = page_rows(store, folders_data, indices, page, page_size, rule_set)
+    if rows:
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
     else:
-        placemark_data['geometry_type'] = 'Unknown'
-        placemark_data['coordinates'] = 'N/A'
-        placemark_data['original_geometry'] = 'Unknown'
-    
-    # Extract icon URL
-    icon_elem = placemark.find('.//{http://www.opengis.net/kml/2.2}href')
-    placemark_data['icon_url'] = icon_elem.text if icon_elem is not None else 'N/A'
+        st.info("Tidak ada placemark yang cocok dengan filter")
+
+
+def render_map_preview(store, rule_set, cache, file_hash):
+    """Preview peta WebGL lon/lat (tanpa tile server); desimasi dilakukan di server"""
+    st.subheader("🗺️ Preview Peta")
+    view_key = f"map-view-{file_hash}"
+    view = st.session_state.get(view_key)
+    data = cache.get_or_compute(('preview', file_hash, rule_set.fingerprint, view, MAX_PRIMITIVES),
+                                lambda: preview_data(store, rule_set, view))
+    if data['view'] is None:
+        st.write("Tidak ada koordinat untuk ditampilkan")
+        return
     
-    # Identifikasi tipe berdasarkan aturan
-    placemark_data['type'] = identify_type(placemark_data['name'], placemark_data['description'])
+    fig = go.Figure()
+    for line in data['lines']:
+        fig.add_trace(go.Scattergl(x=line['lon'], y=line['lat'], mode='lines', name=line['type'], hoverinfo='name',
+                                   line={'color': line['color'], 'width': line['width']}))
+    for point in data['points']:
+        fig.add_trace(go.Scattergl(x=point['lon'], y=point['lat'], mode='markers', name=point['type'],
+                                   text=point['label'], hoverinfo='text', marker={'size': point['size']}))
+    west, south, east, north = data['view']
+    fig.update_layout(
+        height=550, margin={'l': 0, 'r': 0, 't': 30, 'b': 0}, dragmode='select',
+        xaxis={'range': [west, east], 'title': 'Lon'},
+        yaxis={'range': [south, north], 'title': 'Lat', 'scaleanchor': 'x', 'scaleratio': data['aspect']},
+    )
+    event = st.plotly_chart(fig, use_container_width=True, on_select='rerun', selection_mode='box', key=f"map-{file_hash}")
     
-    return placemark_data
-
-def identify_type(name, description):
-    """Identifikasi tipe berdasarkan nama dan deskripsi"""
-    name_str = str(name).upper()
-    desc_str = str(description).upper()
+    # Seleksi kotak menjadi tampilan baru (dirender ulang dengan detail lebih halus)
+    boxes = event.selection.box if event else []
+    if boxes and boxes[-1]['x'] and boxes[-1]['y']:
+        x0, x1 = sorted(boxes[-1]['x'])
+        y0, y1 = sorted(boxes[-1]['y'])
+        selected = (x0, y0, x1, y1)
+        if selected != st.session_state.get(view_key + '-box'):
+            st.session_state[view_key + '-box'] = selected
+            st.session_state[view_key] = selected
+            st.rerun()
     
-    if 'JC01' in name_str:
-        return 'JC01'
-    elif 'OP01' in name_str:
-        return 'OP01'
-    elif '-OB' in name_str:
-        return 'OB'
-    elif '-OC' in name_str:
-        return 'OC'
-    elif 'OTB-4X1-BIG-BAY' in desc_str:
-        return 'OTB-4x1-Big-Bay'
-    elif '-KU' in name_str:
-        return 'KU-Line'
-    else:
-        return 'Unknown'
+    stats = data['stats']
+    st.caption(f"{stats['Marker Titik']} marker dari {stats['Titik']} titik, {stats['Vertex Garis Dikirim']} dari "
+               f"{stats['Vertex Garis']} vertex garis (maks {MAX_PRIMITIVES} primitif). "
+               "Pilih area dengan seleksi kotak untuk memperbesar.")
+    if view is not None and st.button("🔍 Tampilkan seluruh data"):
+        st.session_state[view_key] = None
+        st.rerun()
 
-def get_style_for_type(type_name, geometry_type):
-    """Dapatkan style berdasarkan tipe dan geometri"""
-    if type_name == 'KU-Line':
-        return {
-            'line_color': 'ff00ff00',  # Hijau
-            'line_width': 3,
-            'icon_url': None
-        }
-    elif type_name == 'JC01':
-        return {
-            'icon_url': 'http://maps.google.com/mapfiles/kml/shapes/forbidden.png',
-            'line_color': None,
-            'line_width': None
-        }
-    elif type_name == 'OP01':
-        return {
-            'icon_url': 'http://maps.google.com/mapfiles/kml/paddle/ltblu-stars.png',
-            'line_color': None,
-            'line_width': None
-        }
-    elif type_name == 'OB':
-        return {
-            'icon_url': 'http://maps.google.com/mapfiles/kml/shapes/placemark_square.png',
-            'line_color': None,
-            'line_width': None
-        }
-    elif type_name == 'OC':
-        return {
-            'icon_url': 'http://maps.google.com/mapfiles/kml/shapes/triangle.png',
-            'line_color': None,
-            'line_width': None
-        }
-    elif type_name == 'OTB-4x1-Big-Bay':
-        return {
-            'icon_url': 'http://maps.google.com/mapfiles/kml/shapes/picnic.png',
-            'line_color': None,
-            'line_width': None
-        }
-    else:
-        return {
-            'icon_url': 'http://maps.google.com/mapfiles/kml/paddle/red-circle.png',
-            'line_color': None,
-            'line_width': None
-        }
 
-def create_enhanced_kml(folders_data):
-    """Buat KML baru dengan struktur folder asli dan style yang diperbarui"""
-    kml = ET.Element('kml', xmlns='http://www.opengis.net/kml/2.2')
-    document = ET.SubElement(kml, 'Document')
+def render_validation_section(folders_data, store, rule_set, cache, file_hash, export_profile, output_format):
+    """Validasi topologi: jarak titik ke kabel, ujung menggantung, titik bertumpuk"""
+    st.subheader("🧭 Validasi Jaringan")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        max_cable_distance = st.number_input("Jarak maks titik ke kabel (m)", min_value=0.1,
+                                             value=DEFAULT_OPTIONS['max_cable_distance'])
+    with col2:
+        snap_distance = st.number_input("Toleransi ujung kabel ke JC01/OB (m)", min_value=0.01,
+                                        value=DEFAULT_OPTIONS['snap_distance'])
+    with col3:
+        stack_distance = st.number_input("Jarak titik bertumpuk (m)", min_value=0.01,
+                                         value=DEFAULT_OPTIONS['stack_distance'])
+    options = {'max_cable_distance': max_cable_distance, 'snap_distance': snap_distance,
+               'stack_distance': stack_distance}
     
-    # Pertahankan struktur folder asli
-    for folder_data in folders_data:
-        folder_elem = ET.SubElement(document, 'Folder')
-        
-        # Nama folder asli
-        name_elem = ET.SubElement(folder_elem, 'name')
-        name_elem.text = folder_data['name']
-        
-        # Description folder (opsional)
-        desc_elem = ET.SubElement(folder_elem, 'description')
-        desc_elem.text = f"Folder: {folder_data['name']} - {len(folder_data['placemarks'])} items"
-        
-        # Tambahkan placemarks ke folder asli
-        for placemark_data in folder_data['placemarks']:
-            placemark_elem = ET.SubElement(folder_elem, 'Placemark')
-            
-            # Name asli
-            name_elem = ET.SubElement(placemark_elem, 'name')
-            name_elem.text = placemark_data['name']
-            
-            # Description dengan info lengkap
-            desc_elem = ET.SubElement(placemark_elem, 'description')
-            desc_text = f"""
-            <![CDATA[
-            <h3>Informasi Titik</h3>
-            <b>Nama:</b> {placemark_data['name']}<br/>
-            <b>Tipe Teridentifikasi:</b> {placemark_data['type']}<br/>
-            <b>Geometri Asli:</b> {placemark_data['original_geometry']}<br/>
-            <b>Folder:</b> {folder_data['name']}<br/>
-            <b>Koordinat:</b> {placemark_data['coordinates'][:100]}...<br/>
-            <b>Deskripsi Asli:</b> {placemark_data['description']}<br/>
-            <b>Style Applied:</b> {get_style_for_type(placemark_data['type'], placemark_data['geometry_type'])['icon_url'] or 'LineString Hijau'}<br/>
-            ]]>
-            """
-            desc_elem.text = desc_text
-            
-            # Style berdasarkan tipe
-            style = ET.SubElement(placemark_elem, 'Style')
-            style_config = get_style_for_type(placemark_data['type'], placemark_data['geometry_type'])
-            
-            if placemark_data['type'] == 'KU-Line':
-                # Style untuk LineString KU - HIJAU width 3
-                line_style = ET.SubElement(style, 'LineStyle')
-                color_elem = ET.SubElement(line_style, 'color')
-                color_elem.text = style_config['line_color']  # Hijau
-                width_elem = ET.SubElement(line_style, 'width')
-                width_elem.text = str(style_config['line_width'])  # Width 3
-                
-                # Nonaktifkan icon untuk LineString
-                icon_style = ET.SubElement(style, 'IconStyle')
-                scale = ET.SubElement(icon_style, 'scale')
-                scale.text = '0'  # Sembunyikan icon
-            else:
-                # Style untuk Point
-                icon_style = ET.SubElement(style, 'IconStyle')
-                icon = ET.SubElement(icon_style, 'Icon')
-                href = ET.SubElement(icon, 'href')
-                href.text = style_config['icon_url']
-            
-            # Geometry - GUNAKAN GEOMETRI ASLI
-            if placemark_data['type'] == 'KU-Line':
-                # Untuk KU, gunakan LineString asli dari KML
-                line_string = ET.SubElement(placemark_elem, 'LineString')
-                coordinates = ET.SubElement(line_string, 'coordinates')
-                
-                # Gunakan koordinat asli dari data LineString
-                if placemark_data['original_geometry'] == 'LineString':
-                    coordinates.text = placemark_data['coordinates']
-                else:
-                    # Jika aslinya Point, buat LineString sederhana dari koordinat tersebut
-                    if placemark_data['coordinates'] != 'N/A' and ',' in placemark_data['coordinates']:
-                        coords = placemark_data['coordinates'].split(',')
-                        if len(coords) >= 2:
-                            lon = float(coords[0])
-                            lat = float(coords[1])
-                            # Buat line pendek dari titik asli
-                            line_coords = f"{lon},{lat},0 {lon+0.001},{lat+0.001},0"
-                            coordinates.text = line_coords
-            else:
-                # Untuk non-KU, pertahankan geometry asli
-                if placemark_data['original_geometry'] == 'LineString':
-                    line_string = ET.SubElement(placemark_elem, 'LineString')
-                    coordinates = ET.SubElement(line_string, 'coordinates')
-                    coordinates.text = placemark_data['coordinates']
-                else:
-                    point = ET.SubElement(placemark_elem, 'Point')
-                    coordinates = ET.SubElement(point, 'coordinates')
-                    coordinates.text = placemark_data['coordinates']
+    index = cache.get_or_compute(('spatial', file_hash, rule_set.fingerprint),
+                                 lambda: build_spatial_index(store, rule_set))
+    report = cache.get_or_compute(
+        ('validate', file_hash, rule_set.fingerprint, profile_key(options)),
+        lambda: validate_network(folders_data, store, index, **options),
+    )
     
-    # Convert to string
-    rough_string = ET.tostring(kml, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ")
-
-def create_single_folder_kml(folder_data):
-    """Buat KML untuk satu folder saja"""
-    kml = ET.Element('kml', xmlns='http://www.opengis.net/kml/2.2')
-    document = ET.SubElement(kml, 'Document')
+    columns = st.columns(len(report['summary']))
+    for column, (label, value) in zip(columns, report['summary'].items()):
+        with column:
+            st.metric(label, value)
     
-    # Nama document sesuai folder
-    name_elem = ET.SubElement(document, 'name')
-    name_elem.text = folder_data['name']
+    for kind, folder_name in OFFENDER_FOLDERS.items():
+        rows = report[kind]
+        with st.expander(f"{folder_name} ({len(rows)})"):
+            if rows:
+                # Tabel dibatasi; daftar lengkap ada di CSV/KML
+                st.dataframe(pd.DataFrame(report_rows(rows[:1000])), use_container_width=True, hide_index=True)
+                if len(rows) > 1000:
+                    st.caption(f"Menampilkan 1000 dari {len(rows)} baris")
+            else:
+                st.write("Tidak ada")
     
-    # Description document
-    desc_elem = ET.SubElement(document, 'description')
-    desc_elem.text = f"KML untuk folder: {folder_data['name']} - {len(folder_data['placemarks'])} items"
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ Download Jarak Titik ke Kabel (CSV)",
+            data=lambda: stats_to_csv(report_rows(report['points'])),
+            file_name="validasi_jarak_kabel.csv",
+            mime="text/csv",
+            on_click='ignore',
+        )
+    with col2:
+        st.download_button(
+            f"⬇️ Download Pelanggar ({output_format.upper()})",
+            data=lambda: render_validation(report, export_profile, output_format),
+            file_name=f"validasi_pelanggar.{output_format}",
+            mime=KMZ_MIME if output_format == 'kmz' else KML_MIME,
+            on_click='ignore',
+        )
+
+
+def render_diff_section(folders_data, store, rule_set, cache, file_hash, export_profile, output_format, render_zip):
+    """Perbandingan dengan revisi lama: placemark berubah, folder berubah dan KML delta"""
+    st.subheader("🔁 Bandingkan dengan Revisi Sebelumnya")
+    previous_file = st.file_uploader("Revisi sebelumnya (KML / KMZ)", type=['kml', 'kmz'], key='previous-revision')
+    if previous_file is None:
+        st.caption("Upload revisi lama untuk melihat placemark yang ditambah, dihapus, dipindah atau berubah tipe")
+        return
     
-    # Tambahkan semua placemarks dari folder ini
-    for placemark_data in folder_data['placemarks']:
-        placemark_elem = ET.SubElement(document, 'Placemark')
-        
-        # Name asli
-        name_elem = ET.SubElement(placemark_elem, 'name')
-        name_elem.text = placemark_data['name']
-        
-        # Description dengan info lengkap
-        desc_elem = ET.SubElement(placemark_elem, 'description')
-        desc_text = f"""
-        <![CDATA[
-        <h3>Informasi Titik</h3>
-        <b>Nama:</b> {placemark_data['name']}<br/>
-        <b>Tipe Teridentifikasi:</b> {placemark_data['type']}<br/>
-        <b>Geometri Asli:</b> {placemark_data['original_geometry']}<br/>
-        <b>Folder Asli:</b> {folder_data['name']}<br/>
-        <b>Koordinat:</b> {placemark_data['coordinates'][:100]}...<br/>
-        <b>Deskripsi Asli:</b> {placemark_data['description']}<br/>
-        <b>Style Applied:</b> {get_style_for_type(placemark_data['type'], placemark_data['geometry_type'])['icon_url'] or 'LineString Hijau'}<br/>
-        ]]>
-        """
-        desc_elem.text = desc_text
-        
-        # Style berdasarkan tipe
-        style = ET.SubElement(placemark_elem, 'Style')
-        style_config = get_style_for_type(placemark_data['type'], placemark_data['geometry_type'])
-        
-        if placemark_data['type'] == 'KU-Line':
-            # Style untuk LineString KU - HIJAU width 3
-            line_style = ET.SubElement(style, 'LineStyle')
-            color_elem = ET.SubElement(line_style, 'color')
-            color_elem.text = style_config['line_color']  # Hijau
-            width_elem = ET.SubElement(line_style, 'width')
-            width_elem.text = str(style_config['line_width'])  # Width 3
-            
-            # Nonaktifkan icon untuk LineString
-            icon_style = ET.SubElement(style, 'IconStyle')
-            scale = ET.SubElement(icon_style, 'scale')
-            scale.text = '0'  # Sembunyikan icon
-        else:
-            # Style untuk Point
-            icon_style = ET.SubElement(style, 'IconStyle')
-            icon = ET.SubElement(icon_style, 'Icon')
-            href = ET.SubElement(icon, 'href')
-            href.text = style_config['icon_url']
-        
-        # Geometry - GUNAKAN GEOMETRI ASLI
-        if placemark_data['type'] == 'KU-Line':
-            # Untuk KU, gunakan LineString asli dari KML
-            line_string = ET.SubElement(placemark_elem, 'LineString')
-            coordinates = ET.SubElement(line_string, 'coordinates')
-            
-            # Gunakan koordinat asli dari data LineString
-            if placemark_data['original_geometry'] == 'LineString':
-                coordinates.text = placemark_data['coordinates']
-            else:
-                # Jika aslinya Point, buat LineString sederhana dari koordinat tersebut
-                if placemark_data['coordinates'] != 'N/A' and ',' in placemark_data['coordinates']:
-                    coords = placemark_data['coordinates'].split(',')
-                    if len(coords) >= 2:
-                        lon = float(coords[0])
-                        lat = float(coords[1])
-                        # Buat line pendek dari titik asli
-                        line_coords = f"{lon},{lat},0 {lon+0.001},{lat+0.001},0"
-                        coordinates.text = line_coords
-        else:
-            # Untuk non-KU, pertahankan geometry asli
-            if placemark_data['original_geometry'] == 'LineString':
-                line_string = ET.SubElement(placemark_elem, 'LineString')
-                coordinates = ET.SubElement(line_string, 'coordinates')
-                coordinates.text = placemark_data['coordinates']
-            else:
-                point = ET.SubElement(placemark_elem, 'Point')
-                coordinates = ET.SubElement(point, 'coordinates')
-                coordinates.text = placemark_data['coordinates']
+    with perf.span('load_placemarks', revision='previous'):
+        old_hash, old_folders, old_store = load_placemarks(previous_file, rule_set, cache)
+    if old_store is None:
+        return
+    report = cache.get_or_compute(('diff', old_hash, file_hash, rule_set.fingerprint),
+                                  lambda: diff_revisions(old_folders, old_store, folders_data, store))
     
-    # Convert to string
-    rough_string = ET.tostring(kml, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ")
-
-def create_zip_with_separate_kmls(folders_data):
-    """Buat file ZIP berisi KML terpisah untuk setiap folder"""
-    zip_buffer = BytesIO()
+    columns = st.columns(len(report['summary']))
+    for column, (label, value) in zip(columns, report['summary'].items()):
+        with column:
+            st.metric(label, value)
     
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for folder_data in folders_data:
-            # Buat KML untuk folder ini
-            folder_kml = create_single_folder_kml(folder_data)
-            
-            # Buat nama file yang aman
-            safe_name = re.sub(r'[^\w\s-]', '', folder_data['name']).strip()
-            safe_name = re.sub(r'[-\s]+', '_', safe_name)
-            filename = f"{safe_name}.kml"
-            
-            # Tambahkan ke ZIP
-            zip_file.writestr(filename, folder_kml)
+    changed_folders = [folders_data[folder_id] for folder_id in report['changed_folders']]
+    st.caption(f"{len(changed_folders)} folder berubah"
+               + (f", {len(report['removed_folders'])} folder hilang" if report['removed_folders'] else ""))
+    rows = report['rows']
+    if not rows:
+        st.success("✅ Tidak ada perbedaan placemark")
+        return
+    # Tabel dibatasi; daftar lengkap ada di CSV/KML
+    st.dataframe(pd.DataFrame(diff_rows(rows[:1000])), use_container_width=True, hide_index=True)
+    if len(rows) > 1000:
+        st.caption(f"Menampilkan 1000 dari {len(rows)} baris")
     
-    zip_buffer.seek(0)
-    return zip_buffer
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            "⬇️ Download Perbedaan (CSV)",
+            data=lambda: stats_to_csv(diff_rows(rows)),
+            file_name="perbedaan_revisi.csv",
+            mime="text/csv",
+            on_click='ignore',
+        )
+    with col2:
+        st.download_button(
+            f"⬇️ Download Delta ({output_format.upper()})",
+            data=lambda: render_delta(report, old_folders, old_store, folders_data, store, rule_set, export_profile, output_format),
+            file_name=f"delta_revisi.{output_format}",
+            mime=KMZ_MIME if output_format == 'kmz' else KML_MIME,
+            on_click='ignore',
+        )
+    with col3:
+        # Folder yang tidak berubah diambil dari cache render revisi sebelumnya
+        st.download_button(
+            f"⬇️ Download ZIP Folder Berubah ({len(changed_folders)})",
+            data=lambda: render_zip(changed_folders),
+            file_name="kml_folders_changed.zip",
+            mime="application/zip",
+            disabled=not changed_folders,
+            on_click='ignore',
+        )
+
+
+def format_size(num_bytes):
+    """Ukuran file yang mudah dibaca"""
+    for unit in ('B', 'KB', 'MB'):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == 'B' else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+def signed_size(num_bytes):
+    """Selisih ukuran bertanda (+/-); '-' bila tidak diketahui"""
+    if num_bytes is None:
+        return '-'
+    return ('-' if num_bytes < 0 else '+') + format_size(abs(num_bytes))
+
+def size_caption(output_size, input_size):
+    """Keterangan ukuran keluaran dibanding file input"""
+    if not input_size:
+        return f"Ukuran: {format_size(output_size)}"
+    change = (output_size - input_size) / input_size * 100
+    return f"Ukuran: {format_size(output_size)} (input {format_size(input_size)}, {change:+.0f}%)"
+
+def rules_markdown_lines(rule_set):
+    """Baris tabel markdown aturan untuk halaman awal"""
+    lines = [
+        "| Pattern | Field | Icon | Keterangan |",
+        "|---------|-------|------|------------|",
+    ]
+    for row in rule_set.describe():
+        icon = f"`{row['Icon']}`" if row['Icon'] != 'LineString' else 'LineString'
+        field = f"{row['Field']} (sama persis)" if row['Match'] == 'equals' else row['Field']
+        lines.append(f"| **{row['Pattern']}** | {field} | {row['Simbol']} {icon} | {row['Keterangan']} |")
+    return lines
+
+def render_perf_panel(spans):
+    """Panel sidebar: span instrumentasi yang selesai pada rerun ini"""
+    with st.expander("⏱️ Performance"):
+        if not spans:
+            st.caption("Tidak ada tahap yang diukur (hasil dari cache)")
+            return
+        st.dataframe(pd.DataFrame([{
+            'Tahap': "　" * record['depth'] + record['span'],
+            'Wall (ms)': round(record['wall_s'] * 1000, 1),
+            'CPU (ms)': round(record['cpu_s'] * 1000, 1),
+            'RSS Δ': signed_size(record['rss_delta_bytes']),
+            'Tracemalloc Δ': signed_size(record.get('traced_peak_delta_bytes')),
+            'Counts': ", ".join(f"{key}={value}" for key, value in record['counts'].items()),
+        } for record in spans]), use_container_width=True, hide_index=True)
+
 
 def main():
+    # Span tahap pipeline dikumpulkan per rerun untuk panel Performance
+    with perf.collect() as spans, perf.span('rerun'):
+        render_page()
+    
+    # Dirender terakhir agar hitungan mencakup rerun ini
+    with st.sidebar:
+        render_cache_panel(get_result_cache())
+        if perf.enabled():
+            render_perf_panel(spans)
+
+
+def render_page():
     st.set_page_config(
         page_title="KML Structure Preserver",
         page_icon="🗺️",
@@ -391,28 +450,67 @@ def main():
     st.title("🗺️ KML Structure Preserver with Complete Rules")
     st.markdown("Upload file KML - Struktur folder **asli dipertahankan**, aturan icon lengkap")
     
-    # Upload file
-    uploaded_file = st.file_uploader("Pilih file KML", type=['kml'])
+    # Aturan klasifikasi (default atau file YAML/JSON dari user)
+    rule_set = DEFAULT_RULE_SET
+    with st.sidebar:
+        st.subheader("⚙️ Aturan Klasifikasi")
+        rules_file = st.file_uploader("File aturan (opsional)", type=['yaml', 'yml', 'json'])
+        if rules_file is not None:
+            try:
+                rule_set = load_rule_set(rules_file)
+                st.success(f"✅ {len(rule_set.rules)} aturan dimuat dari {rules_file.name}")
+            except ValueError as exc:
+                st.error(f"Error membaca file aturan: {exc}")
+        
+        st.subheader("📦 Profil Ekspor")
+        profile_name = st.radio("Profil", ['standar', 'compact'], format_func=str.capitalize,
+                                help="Compact: style bersama per tipe, presisi koordinat terbatas, description minimal")
+        export_profile = dict(EXPORT_PROFILES[profile_name])
+        if profile_name == 'compact':
+            export_profile['precision'] = st.number_input("Desimal koordinat", min_value=0, max_value=15,
+                                                          value=export_profile['precision'])
+            export_profile['drop_zero_altitude'] = st.checkbox("Hapus altitude 0", value=True)
+            export_profile['description'] = st.selectbox(
+                "Description", ['minimal', 'full', 'none'],
+                format_func=lambda mode: {'minimal': 'Minimal', 'full': 'Lengkap', 'none': 'Tanpa (hanya asli)'}[mode])
+        if st.checkbox("Sederhanakan LineString", help="Douglas-Peucker; ujung garis dan vertex di JC01/OB dipertahankan"):
+            export_profile['simplify_tolerance'] = st.number_input("Toleransi (m)", min_value=0.01, value=1.0)
+        output_format = st.radio("Format keluaran", ['kml', 'kmz'], format_func=str.upper, horizontal=True)
+    
+    # Upload file (satu proyek bisa terdiri dari banyak file)
+    uploaded_files = st.file_uploader("Pilih file KML / KMZ (bisa lebih dari satu)", type=['kml', 'kmz'],
+                                      accept_multiple_files=True)
+    
+    cache = get_result_cache()
     
-    if uploaded_file is not None:
-        # Parse KML dengan struktur folder asli
-        with st.spinner("Menganalisis struktur KML asli..."):
-            folders_data, all_placemarks = parse_kml_file(uploaded_file)
+    if uploaded_files:
+        input_size = sum(uploaded_file.size for uploaded_file in uploaded_files)
+        # Parse KML dengan struktur folder asli (dipakai ulang dari cache bila file sama)
+        with st.spinner("Menganalisis struktur KML asli..."), perf.span('load_placemarks', files=len(uploaded_files)) as record:
+            file_hash, folders_data, store, file_rows = load_uploads(uploaded_files, rule_set, cache)
+            record.set(input_bytes=input_size, placemarks=len(store) if store is not None else 0)
         
-        if all_placemarks:
-            st.success(f"✅ Berhasil mengidentifikasi {len(all_placemarks)} elemen dalam {len(folders_data)} folder!")
+        # Status per file: file yang rusak tidak menggagalkan file lain
+        failed = [row for row in file_rows if row['Status'] != 'OK']
+        for row in failed:
+            st.error(f"Error parsing {row['File']}: {row['Error']}")
+        if len(file_rows) > 1:
+            with st.expander(f"📄 File Sumber ({len(file_rows) - len(failed)}/{len(file_rows)} berhasil)", expanded=bool(failed)):
+                st.dataframe(pd.DataFrame(file_rows), use_container_width=True, hide_index=True)
+        
+        if store is not None and len(store):
+            st.success(f"✅ Berhasil mengidentifikasi {len(store)} elemen dalam {len(folders_data)} folder!")
             
             # Analisis data
             type_counts = {}
-            for pm in all_placemarks:
-                type_name = pm['type']
+            for type_name in store.type:
                 type_counts[type_name] = type_counts.get(type_name, 0) + 1
             
             # Tampilkan summary
             col1, col2, col3, col4, col5, col6 = st.columns(6)
             
             with col1:
-                st.metric("Total Elemen", len(all_placemarks))
+                st.metric("Total Elemen", len(store))
             with col2:
                 st.metric("Folder Asli", len(folders_data))
             with col3:
@@ -424,82 +522,155 @@ def main():
             with col6:
                 st.metric("Lainnya", type_counts.get('Unknown', 0))
             
-            # Tampilkan struktur folder asli
+            # Tampilkan struktur folder asli (satu tabel ringkas, satu baris per folder)
             st.subheader("📁 Struktur Folder Asli KML")
-            for i, folder_data in enumerate(folders_data):
-                with st.expander(f"📂 {folder_data['name']} ({len(folder_data['placemarks'])} items)"):
-                    folder_df = pd.DataFrame([{
-                        'Nama': pm['name'],
-                        'Tipe': pm['type'],
-                        'Geometri Asli': pm['original_geometry'],
-                        'Icon Terapkan': get_style_for_type(pm['type'], pm['geometry_type'])['icon_url'] or 'LineString Hijau'
-                    } for pm in folder_data['placemarks']])
-                    st.dataframe(folder_df, use_container_width=True)
+            with st.expander(f"🌳 Pohon folder ({len(folders_data)} folder)"):
+                st.dataframe(pd.DataFrame([{
+                    'Folder': "　" * folder_data['depth'] + "📂 " + folder_data['name'],
+                    'Path': folder_data['path'],
+                    'Items': len(folder_data['placemarks']),
+                    'Subfolder': len(folder_data['children']),
+                } for folder_data in folders_data]), use_container_width=True, hide_index=True)
+            
+            # Browser placemark: filter di server, hanya halaman aktif yang dikirim
+            render_placemark_browser(folders_data, store, rule_set)
+            
+            render_map_preview(store, rule_set, cache, file_hash)
             
             # Menu Download Options
             st.subheader("📥 Menu Download")
             
+            mime = KMZ_MIME if output_format == 'kmz' else KML_MIME
+            
+            # Store untuk ekspor: LineString disederhanakan bila diminta
+            export_store = store
+            tolerance = export_profile['simplify_tolerance']
+            if tolerance:
+                export_store = cache.get_or_compute(('simplify', file_hash, rule_set.fingerprint, tolerance),
+                                                    lambda: simplify_store(store, tolerance))
+                with st.expander(f"✂️ Penyederhanaan LineString (toleransi {tolerance} m)"):
+                    simplify_rows = cache.get_or_compute(
+                        ('simplify-report', file_hash, rule_set.fingerprint, profile_key(export_profile)),
+                        lambda: simplification_report(folders_data, store, export_store, export_profile),
+                    )
+                    st.dataframe(pd.DataFrame(simplify_rows), use_container_width=True, hide_index=True)
+            
+            # Artefak dikunci dengan hash file + aturan + profil + format
+            settings_key = (file_hash, rule_set.fingerprint, profile_key(export_profile), output_format)
+            
+            def artifact_key(name):
+                return ('render',) + settings_key + (name,)
+            
+            # Render per folder dikunci dengan sidik isi folder (bukan hash file)
+            # sehingga folder yang sama di revisi berikutnya tidak dirender ulang
+            signatures = cache.get_or_compute(('signatures', file_hash, rule_set.fingerprint, tolerance),
+                                              lambda: folder_signatures(folders_data, export_store))
+            
+            def folder_key(folder_data):
+                return ('folder-render', signatures[folder_data['id']]) + settings_key[1:]
+            
+            def cached_artifact(name, render, key=None):
+                def generate():
+                    with perf.span('download', artifact=name, format=output_format):
+                        return cache.get_or_compute(key or artifact_key(name), render)
+                return generate
+            
+            def render_zip(folders=None):
+                folders = [f for f in (folders_data if folders is None else folders) if len(f['placemarks'])]
+                rendered = {f['id']: cache.get(folder_key(f)) for f in folders}
+                missing = [f for f in folders if rendered[f['id']] is None]
+                # Hanya folder yang belum ada di cache yang dirender; hasilnya ikut
+                # disimpan untuk tombol download individual
+                for folder_export in render_folder_exports(missing, export_store, rule_set, export_profile, output_format):
+                    rendered[folder_export['folder']['id']] = cache.put(folder_key(folder_export['folder']), folder_export['data'])
+                return build_folder_zip([{'folder': f, 'filename': folder_filename(f, output_format), 'data': rendered[f['id']]}
+                                         for f in folders]).getvalue()
+            
+            def size_note(name):
+                output_size = cache.size_of(artifact_key(name))
+                if output_size is None:
+                    return "Ukuran dihitung saat file diunduh"
+                return size_caption(output_size, input_size)
+            
             # Tab untuk opsi download
-            tab1, tab2, tab3 = st.tabs(["📄 KML Utuh", "📁 KML per Folder", "⚙️ Aturan"])
+            tab1, tab2, tab_tiles, tab3 = st.tabs(["📄 KML Utuh", "📁 KML per Folder", "🗺️ KMZ Bertingkat", "⚙️ Aturan"])
             
             with tab1:
                 st.write("**Download KML Utuh**")
                 st.write("Semua folder dalam satu file KML dengan aturan style diterapkan")
                 
-                enhanced_kml = create_enhanced_kml(folders_data)
+                # File baru dibuat saat tombol diklik, tidak disematkan di halaman
+                st.download_button(
+                    f"⬇️ Download {output_format.upper()} Utuh",
+                    data=cached_artifact('full', lambda: render_document(folders_data, export_store, rule_set, export_profile, output_format)),
+                    file_name=f"kml_enhanced_complete.{output_format}",
+                    mime=mime,
+                    on_click='ignore',
+                )
+                st.caption(size_note('full'))
                 
-                # Create download link untuk KML utuh
-                b64_kml = base64.b64encode(enhanced_kml.encode()).decode()
-                href_kml = f'<a href="data:application/vnd.google-earth.kml+xml;base64,{b64_kml}" download="kml_enhanced_complete.kml">⬇️ Download KML Utuh</a>'
-                st.markdown(href_kml, unsafe_allow_html=True)
-                
-                # Preview kecil
+                # Preview kecil (hanya awal dokumen yang dirender)
                 with st.expander("🔍 Preview KML Utuh"):
-                    st.code(enhanced_kml[:1000] + "..." if len(enhanced_kml) > 1000 else enhanced_kml, language='xml')
+                    preview = kml_preview(lambda sink: write_enhanced_kml(sink, folders_data, export_store, rule_set, export_profile), limit=1001)
+                    st.code(preview[:1000] + "..." if len(preview) > 1000 else preview, language='xml')
             
             with tab2:
                 st.write("**Download KML per Folder**")
                 st.write("Setiap folder menjadi file KML terpisah dalam format ZIP")
                 
-                # Buat ZIP dengan KML terpisah
-                zip_buffer = create_zip_with_separate_kmls(folders_data)
-                
-                # Create download link untuk ZIP
-                b64_zip = base64.b64encode(zip_buffer.getvalue()).decode()
-                href_zip = f'<a href="data:application/zip;base64,{b64_zip}" download="kml_folders_separated.zip">⬇️ Download ZIP (KML per Folder)</a>'
-                st.markdown(href_zip, unsafe_allow_html=True)
+                # ZIP dirender (paralel, setiap folder satu kali) saat tombol diklik
+                st.download_button(
+                    f"⬇️ Download ZIP ({output_format.upper()} per Folder)",
+                    data=cached_artifact('zip', render_zip),
+                    file_name="kml_folders_separated.zip",
+                    mime="application/zip",
+                    on_click='ignore',
+                )
+                st.caption(size_note('zip'))
                 
                 # Tampilkan daftar file dalam ZIP
+                export_folders = [f for f in folders_data if len(f['placemarks'])]
                 st.write("**File yang akan dihasilkan:**")
-                for folder_data in folders_data:
-                    safe_name = re.sub(r'[^\w\s-]', '', folder_data['name']).strip()
-                    safe_name = re.sub(r'[-\s]+', '_', safe_name)
-                    st.write(f"📄 {safe_name}.kml ({len(folder_data['placemarks'])} items)")
+                for folder_data in export_folders:
+                    st.write(f"📄 {folder_filename(folder_data, output_format)} ({len(folder_data['placemarks'])} items)")
                 
                 # Opsi download per folder individual
                 st.write("**Download Folder Individual:**")
                 col1, col2 = st.columns(2)
                 
-                for i, folder_data in enumerate(folders_data):
+                for i, folder_data in enumerate(export_folders):
                     with col1 if i % 2 == 0 else col2:
-                        folder_kml = create_single_folder_kml(folder_data)
-                        safe_name = re.sub(r'[^\w\s-]', '', folder_data['name']).strip()
-                        safe_name = re.sub(r'[-\s]+', '_', safe_name)
-                        
-                        b64_folder = base64.b64encode(folder_kml.encode()).decode()
-                        href_folder = f'<a href="data:application/vnd.google-earth.kml+xml;base64,{b64_folder}" download="{safe_name}.kml" style="font-size: 0.8em;">⬇️ {folder_data["name"]}</a>'
-                        st.markdown(href_folder, unsafe_allow_html=True)
+                        st.download_button(
+                            f"⬇️ {folder_data['path']}",
+                            data=cached_artifact(
+                                f"folder:{folder_data['id']}",
+                                lambda folder_data=folder_data: render_folder(folder_data, export_store, rule_set, export_profile, output_format),
+                                key=folder_key(folder_data)),
+                            file_name=folder_filename(folder_data, output_format),
+                            mime=mime,
+                            key=f"folder-download-{folder_data['id']}",
+                            on_click='ignore',
+                        )
+            
+            with tab_tiles:
+                st.write("**Download KMZ Bertingkat (Region/LOD)**")
+                st.write("Placemark dibagi ke tile quadtree; Google Earth hanya memuat tile yang terlihat")
+                
+                tile_size = int(st.number_input("Maksimum placemark per tile", min_value=100,
+                                                value=DEFAULT_MAX_PER_TILE, step=500))
+                tiles_name = f"tiles:{tile_size}"
+                st.download_button(
+                    "⬇️ Download KMZ Bertingkat",
+                    data=cached_artifact(tiles_name, lambda: render_tiled_kmz(folders_data, export_store, rule_set, export_profile, tile_size)),
+                    file_name="kml_enhanced_tiles.kmz",
+                    mime=KMZ_MIME,
+                    on_click='ignore',
+                )
+                st.caption(size_note(tiles_name))
             
             with tab3:
                 st.write("**Aturan yang Diterapkan**")
-                rules_data = [
-                    {'Pattern': '-JC01', 'Icon': 'forbidden.png', 'Keterangan': 'Titik forbidden'},
-                    {'Pattern': '-OP01', 'Icon': 'ltblu-stars.png', 'Keterangan': 'Titik bintang biru'},
-                    {'Pattern': '-OB', 'Icon': 'placemark_square.png', 'Keterangan': 'Titik persegi'},
-                    {'Pattern': '-OC', 'Icon': 'triangle.png', 'Keterangan': 'Titik segitiga'},
-                    {'Pattern': '-KU', 'Icon': 'LineString Hijau', 'Keterangan': 'Garis hijau width 3'},
-                    {'Pattern': 'OTB-4x1-Big-Bay', 'Icon': 'picnic.png', 'Keterangan': 'Titik picnic (dari spec_id)'}
-                ]
+                rules_data = rule_set.describe()
                 
                 rules_df = pd.DataFrame(rules_data)
                 st.dataframe(rules_df, use_container_width=True)
@@ -519,33 +690,61 @@ def main():
             
             with col2:
                 st.write("**Informasi File:**")
-                st.write(f"- **Nama file**: {uploaded_file.name}")
+                if len(uploaded_files) == 1:
+                    st.write(f"- **Nama file**: {uploaded_files[0].name}")
+                else:
+                    st.write(f"- **Jumlah file**: {len(uploaded_files)} (digabung, duplikat dibuang)")
                 st.write(f"- **Total folder**: {len(folders_data)}")
-                st.write(f"- **Total placemarks**: {len(all_placemarks)}")
+                st.write(f"- **Total placemarks**: {len(store)}")
                 st.write(f"- **Folder terbesar**: {max([len(f['placemarks']) for f in folders_data])} items")
                 st.write(f"- **Folder terkecil**: {min([len(f['placemarks']) for f in folders_data])} items")
+            
+            # Statistik jaringan KU-Line per folder
+            st.write("**Statistik Jaringan per Folder:**")
+            stats_rows, stats_total = cache.get_or_compute(
+                ('stats', file_hash, rule_set.fingerprint),
+                lambda: compute_network_stats(folders_data, store, cable_types=rule_set.line_types()),
+            )
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Total Panjang KU-Line", f"{stats_total['Panjang Kabel (m)'] / 1000:,.2f} km")
+            with col2:
+                st.metric("Vertex KU-Line", stats_total['Vertex Kabel'])
+            with col3:
+                density = stats_total['Titik per km']
+                st.metric("OB/OC/JC01 per km", f"{density:.2f}" if density is not None else "-")
+            
+            stats_df = pd.DataFrame(stats_rows + [stats_total])
+            st.dataframe(stats_df, use_container_width=True)
+            
+            st.download_button(
+                "⬇️ Download Statistik (CSV)",
+                data=lambda: stats_to_csv(stats_rows, stats_total),
+                file_name="statistik_jaringan.csv",
+                mime="text/csv",
+                on_click='ignore',
+            )
+            
+            # Validasi topologi jaringan (indeks spasial dibangun sekali per file + aturan)
+            render_validation_section(folders_data, store, rule_set, cache, file_hash, export_profile, output_format)
+            render_diff_section(folders_data, store, rule_set, cache, file_hash, export_profile, output_format, render_zip)
         
         else:
             st.warning("Tidak ada elemen yang ditemukan dalam file KML")
 
     else:
         # Contoh penggunaan
-        st.info("""
+        rules_table = "\n        ".join(rules_markdown_lines(rule_set))
+        st.info(f"""
         **📋 Aturan Lengkap yang Diterapkan:**
 
-        | Pattern | Icon | Keterangan |
-        |---------|------|------------|
-        | **-JC01** | 🚫 `forbidden.png` | Titik forbidden |
-        | **-OP01** | 🔵 `ltblu-stars.png` | Titik bintang biru |
-        | **-OB** | ◼️ `placemark_square.png` | Titik persegi |
-        | **-OC** | 🔺 `triangle.png` | Titik segitiga |
-        | **-KU** | 🟢 LineString hijau | Garis hijau width 3 |
-        | **OTB-4x1-Big-Bay** | 🧺 `picnic.png` | Titik picnic (dari spec_id) |
+        {rules_table}
 
         **✅ Fitur Utama:**
         - Struktur folder asli **dipertahankan 100%**
         - **Download KML Utuh**: Semua folder dalam satu file
         - **Download KML per Folder**: Setiap folder menjadi file terpisah (ZIP)
+        - Input dan output **KML atau KMZ**
         - Aturan icon diterapkan otomatis
         - LineString asli untuk -KU tetap digunakan
         """)
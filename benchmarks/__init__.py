@@ -0,0 +1 @@
+"""Benchmark dan generator data sintetis (lihat benchmarks/run.py)"""
@@ -0,0 +1,157 @@
+"""Generator KML sintetis untuk benchmark
+
+    python -m benchmarks.generate 100000 data.kml --folders 200 --depth 3
+
+Pohon folder, jumlah placemark, campuran tipe (dari pattern aturan) dan
+jumlah vertex LineString bisa diatur. Dengan seed yang sama hasilnya selalu
+identik, dan file ditulis streaming sehingga 1 juta placemark tidak perlu
+dibangun di memori.
+"""
+import argparse
+import hashlib
+import json
+import random
+from xml.sax.saxutils import escape
+
+from movetoheal.rules import DEFAULT_RULES
+
+DEFAULT_CONFIG = {
+    'placemarks': 10000,
+    'folders': 50,
+    'depth': 3,
+    # Bobot per tipe aturan bawaan; 'Unknown' untuk nama yang tidak cocok aturan apa pun
+    'type_mix': {'JC01': 1, 'OP01': 1, 'OB': 3, 'OC': 2, 'OTB-4x1-Big-Bay': 1, 'KU-Line': 3, 'Unknown': 1},
+    'line_vertices': (20, 80),
+    'seed': 1,
+}
+
+# 2: tipe dari aturan atribut ditulis sebagai ExtendedData
+FILE_FORMAT = 2
+
+
+def resolve_config(**overrides):
+    """DEFAULT_CONFIG dengan nilai yang diberikan (None diabaikan)"""
+    config = dict(DEFAULT_CONFIG)
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    config['line_vertices'] = tuple(config['line_vertices'])
+    return config
+
+
+def config_key(config):
+    """Sidik konfigurasi, dipakai untuk nama file data yang di-cache"""
+    # Format dinaikkan bila isi file berubah untuk konfigurasi yang sama
+    key = dict(config, format=FILE_FORMAT)
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def _folder_tree(count, depth, rng):
+    """List parent id per folder; folder pertama selalu di root"""
+    parents = []
+    depths = []
+    for folder_id in range(count):
+        candidates = [i for i in range(max(0, folder_id - 20), folder_id) if depths[i] < depth - 1]
+        parent = rng.choice(candidates + [None]) if folder_id and candidates else None
+        parents.append(parent)
+        depths.append(0 if parent is None else depths[parent] + 1)
+    return parents
+
+
+def _type_templates():
+    """Nama/deskripsi/atribut per tipe dari aturan bawaan pertama untuk tipe tersebut"""
+    templates = {'Unknown': ('TITIK', '', {})}
+    for rule in DEFAULT_RULES:
+        if rule['type'] in templates:
+            continue
+        if rule['field'] == 'name':
+            templates[rule['type']] = (rule['pattern'], 'catatan survei', {})
+        elif rule['field'] == 'description':
+            templates[rule['type']] = ('ODP', f"spec_id: {rule['pattern']}", {})
+        else:
+            # Atribut ExtendedData
+            templates[rule['type']] = ('ODP', 'catatan survei', {rule['field']: rule['pattern']})
+    return templates
+
+
+def write_placemark(handle, index, type_name, rng, config, templates):
+    pattern, description, attributes = templates[type_name]
+    lon = 106.0 + rng.random()
+    lat = -6.0 - rng.random()
+    name = f"P{index:07d}{pattern}" if pattern.startswith('-') else f"{pattern}-{index:07d}"
+    handle.write(f"<Placemark><name>{escape(name)}</name>")
+    if description:
+        handle.write(f"<description>{escape(description)}</description>")
+    if attributes:
+        handle.write('<ExtendedData>')
+        for key, value in attributes.items():
+            handle.write(f'<Data name="{escape(key)}"><value>{escape(value)}</value></Data>')
+        handle.write('</ExtendedData>')
+    if type_name == 'KU-Line':
+        vertices = rng.randint(*config['line_vertices'])
+        points = ' '.join(f"{lon + j * 1e-4:.7f},{lat + j * 7e-5:.7f},0" for j in range(vertices))
+        handle.write(f"<LineString><coordinates>{points}</coordinates></LineString></Placemark>\n")
+    else:
+        handle.write(f"<Point><coordinates>{lon:.7f},{lat:.7f},0</coordinates></Point></Placemark>\n")
+
+
+def generate_kml(path, **overrides):
+    """Tulis KML sintetis ke path; mengembalikan konfigurasi yang dipakai"""
+    config = resolve_config(**overrides)
+    rng = random.Random(config['seed'])
+    templates = _type_templates()
+    type_names = list(config['type_mix'])
+    weights = [config['type_mix'][name] for name in type_names]
+    unknown = [name for name in type_names if name not in templates]
+    if unknown:
+        raise ValueError(f"Tipe tidak dikenal di type_mix: {', '.join(unknown)}")
+
+    folder_count = max(1, config['folders'])
+    parents = _folder_tree(folder_count, max(1, config['depth']), rng)
+    children = [[] for _ in range(folder_count)]
+    for folder_id, parent in enumerate(parents):
+        if parent is not None:
+            children[parent].append(folder_id)
+
+    # Placemark dibagi rata ke semua folder (sisa ke folder awal)
+    base, extra = divmod(config['placemarks'], folder_count)
+    counts = [base + (1 if folder_id < extra else 0) for folder_id in range(folder_count)]
+    next_index = [0]
+
+    def write_folder(handle, folder_id):
+        handle.write(f"<Folder><name>Folder {folder_id} &amp; area</name>\n")
+        for type_name in rng.choices(type_names, weights, k=counts[folder_id]):
+            write_placemark(handle, next_index[0], type_name, rng, config, templates)
+            next_index[0] += 1
+        for child_id in children[folder_id]:
+            write_folder(handle, child_id)
+        handle.write("</Folder>\n")
+
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                     '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>\n')
+        for folder_id, parent in enumerate(parents):
+            if parent is None:
+                write_folder(handle, folder_id)
+        handle.write("</Document></kml>\n")
+    return config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat file KML sintetis untuk benchmark")
+    parser.add_argument('placemarks', type=int)
+    parser.add_argument('path')
+    parser.add_argument('--folders', type=int)
+    parser.add_argument('--depth', type=int)
+    parser.add_argument('--min-vertices', type=int, default=DEFAULT_CONFIG['line_vertices'][0])
+    parser.add_argument('--max-vertices', type=int, default=DEFAULT_CONFIG['line_vertices'][1])
+    parser.add_argument('--type-mix', type=json.loads, help='JSON, misal \'{"OB": 5, "KU-Line": 1}\'')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+    config = generate_kml(
+        args.path, placemarks=args.placemarks, folders=args.folders, depth=args.depth,
+        type_mix=args.type_mix, line_vertices=(args.min_vertices, args.max_vertices), seed=args.seed,
+    )
+    print(json.dumps(config))
+
+
+if __name__ == '__main__':
+    main()
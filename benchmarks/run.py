@@ -0,0 +1,223 @@
+"""Benchmark pipeline KML: waktu dan memori puncak per operasi
+
+    python -m benchmarks.run --sizes 1k,10k,100k --out hasil.json
+    python -m benchmarks.run --sizes 1m --repeat 1 --out hasil-1m.json
+    python -m benchmarks.run --sizes 10k --baseline baseline.json --fail-on-regression
+    python -m benchmarks.run --sizes 100k --type-mix '{"KU-Line": 1}' --min-vertices 200 --max-vertices 500
+
+Untuk setiap ukuran dibuat (atau dipakai ulang) KML sintetis, lalu setiap
+operasi diukur waktunya (median dari --repeat kali) dan, pada satu run
+terpisah, memori puncaknya dengan tracemalloc (tracemalloc memperlambat
+eksekusi sehingga tidak dipakai saat mengukur waktu). Hasil disimpan sebagai
+JSON dan bisa dibandingkan dengan file hasil sebelumnya.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import lxml
+import numpy as np
+
+import app
+from benchmarks.generate import DEFAULT_CONFIG, config_key, generate_kml, resolve_config
+from movetoheal.rules import DEFAULT_RULE_SET, classify_placemarks
+
+SIZE_SUFFIXES = {'k': 1000, 'm': 1000000}
+DEFAULT_SIZES = '1k,10k,100k'
+
+# identify_type dipanggil per placemark; cukup diukur pada sampel
+IDENTIFY_SAMPLE = 10000
+
+REGRESSION_THRESHOLD = 0.10
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text and text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def dataset_path(data_dir, config):
+    path = os.path.join(data_dir, f"bench-{config['placemarks']}-{config_key(config)}.kml")
+    if not os.path.exists(path):
+        print(f"Membuat data {config['placemarks']} placemark: {path}", file=sys.stderr)
+        generate_kml(path + '.part', **config)
+        os.replace(path + '.part', path)
+    return path
+
+
+def build_operations(path):
+    """Operasi yang diukur untuk satu dataset: list (nama, fungsi, jumlah item)"""
+    with open(path, 'rb') as handle:
+        folders_data, store = app.parse_kml_file(handle)
+    largest = max(folders_data, key=lambda folder_data: len(folder_data['placemarks']))
+    sample = range(min(IDENTIFY_SAMPLE, len(store)))
+
+    def parse():
+        with open(path, 'rb') as handle:
+            app.parse_kml_file(handle)
+
+    def identify():
+        for index in sample:
+            app.identify_type(store.name[index], store.description[index], DEFAULT_RULE_SET)
+
+    return [
+        ('parse_kml_file', parse, len(store)),
+        ('identify_type', identify, len(sample)),
+        ('classify_placemarks', lambda: classify_placemarks(store.with_types(None), DEFAULT_RULE_SET), len(store)),
+        ('create_enhanced_kml', lambda: app.create_enhanced_kml(folders_data, store), len(store)),
+        ('create_single_folder_kml', lambda: app.create_single_folder_kml(largest, store), len(largest['placemarks'])),
+        ('create_zip_with_separate_kmls', lambda: app.create_zip_with_separate_kmls(folders_data, store), len(store)),
+    ]
+
+
+def measure(function, repeat):
+    """(list durasi detik, memori puncak tracemalloc dalam byte)"""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return durations, peak
+
+
+def run(sizes, repeat=3, data_dir=None, operations=None, **generator_config):
+    """Jalankan benchmark; mengembalikan dict hasil (siap disimpan sebagai JSON)"""
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), 'movetoheal-bench')
+    os.makedirs(data_dir, exist_ok=True)
+    results = []
+    for size in sizes:
+        config = resolve_config(placemarks=size, **generator_config)
+        path = dataset_path(data_dir, config)
+        for name, function, items in build_operations(path):
+            if operations and name not in operations:
+                continue
+            durations, peak = measure(function, repeat)
+            result = {
+                'size': size,
+                'operation': name,
+                'items': items,
+                'seconds': statistics.median(durations),
+                'runs': durations,
+                'peak_bytes': peak,
+                'input_bytes': os.path.getsize(path),
+            }
+            results.append(result)
+            print(f"{size:>9} {name:<30} {result['seconds']:9.4f}s {peak / 1048576:10.1f} MB", file=sys.stderr)
+    return {'meta': environment(generator_config, repeat), 'results': results}
+
+
+def environment(generator_config, repeat):
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'lxml': lxml.__version__,
+        'repeat': repeat,
+        'generator': {key: value for key, value in resolve_config(**generator_config).items() if key != 'placemarks'},
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Baris perbandingan (size, operasi) yang ada di kedua hasil
+
+    ratio > 1 berarti lebih lambat / lebih boros dari baseline; regression
+    bernilai True bila waktu atau memori naik lebih dari threshold.
+    """
+    previous = {(row['size'], row['operation']): row for row in baseline['results']}
+    rows = []
+    for row in current['results']:
+        old = previous.get((row['size'], row['operation']))
+        if old is None:
+            continue
+        time_ratio = row['seconds'] / old['seconds'] if old['seconds'] else None
+        memory_ratio = row['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else None
+        rows.append({
+            'size': row['size'],
+            'operation': row['operation'],
+            'seconds': row['seconds'],
+            'baseline_seconds': old['seconds'],
+            'time_ratio': time_ratio,
+            'peak_bytes': row['peak_bytes'],
+            'baseline_peak_bytes': old['peak_bytes'],
+            'memory_ratio': memory_ratio,
+            'regression': any(ratio is not None and ratio > 1 + threshold for ratio in (time_ratio, memory_ratio)),
+        })
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'size':>9} {'operasi':<30} {'waktu':>8} {'memori':>8}")
+    for row in rows:
+        time_text = f"{row['time_ratio']:.2f}x" if row['time_ratio'] is not None else '-'
+        memory_text = f"{row['memory_ratio']:.2f}x" if row['memory_ratio'] is not None else '-'
+        flag = '  REGRESI' if row['regression'] else ''
+        print(f"{row['size']:>9} {row['operation']:<30} {time_text:>8} {memory_text:>8}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parse/klasifikasi/ekspor KML")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="Jumlah placemark, misal 1k,10k,100k,1m")
+    parser.add_argument('--repeat', type=int, default=3, help="Jumlah pengulangan untuk pengukuran waktu")
+    parser.add_argument('--operations', help="Batasi operasi (dipisah koma)")
+    parser.add_argument('--folders', type=int)
+    parser.add_argument('--depth', type=int)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--type-mix', type=json.loads, help='Bobot tipe (JSON), misal \'{"OB": 5, "KU-Line": 1}\'')
+    parser.add_argument('--min-vertices', type=int, help=f"Vertex minimum LineString (default {DEFAULT_CONFIG['line_vertices'][0]})")
+    parser.add_argument('--max-vertices', type=int, help=f"Vertex maksimum LineString (default {DEFAULT_CONFIG['line_vertices'][1]})")
+    parser.add_argument('--data-dir', help="Direktori data sintetis (default: temp)")
+    parser.add_argument('--out', help="Simpan hasil sebagai JSON")
+    parser.add_argument('--baseline', help="File hasil sebelumnya untuk dibandingkan")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    line_vertices = None
+    if args.min_vertices is not None or args.max_vertices is not None:
+        low, high = DEFAULT_CONFIG['line_vertices']
+        low = low if args.min_vertices is None else args.min_vertices
+        high = high if args.max_vertices is None else args.max_vertices
+        if not 2 <= low <= high:
+            parser.error("--min-vertices harus >= 2 dan <= --max-vertices")
+        line_vertices = (low, high)
+
+    result = run(
+        [parse_size(size) for size in args.sizes.split(',') if size.strip()],
+        repeat=max(1, args.repeat),
+        data_dir=args.data_dir,
+        operations=set(args.operations.split(',')) if args.operations else None,
+        folders=args.folders, depth=args.depth, seed=args.seed,
+        type_mix=args.type_mix, line_vertices=line_vertices,
+    )
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as handle:
+            json.dump(result, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            rows = compare(result, json.load(handle), args.threshold)
+        print_comparison(rows)
+        if args.fail_on_regression and any(row['regression'] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Inti pemrosesan KML movetoheal (tanpa ketergantungan ke Streamlit)"""
@@ -0,0 +1,96 @@
+"""Filter dan paginasi placemark untuk tabel browser di UI
+
+Filter dihitung di server sebagai mask NumPy atas kolom PlacemarkStore;
+hanya baris pada halaman aktif yang dibentuk menjadi dict untuk dikirim ke
+client.
+"""
+import re
+
+import numpy as np
+
+from movetoheal.perf import span
+from movetoheal.store import GEOMETRY_CODES
+
+
+def folder_subtree(folders_data, folder_ids):
+    """Id folder beserta seluruh subfoldernya"""
+    selected = set()
+    pending = list(folder_ids)
+    while pending:
+        folder_id = pending.pop()
+        if folder_id not in selected:
+            selected.add(folder_id)
+            pending.extend(folders_data[folder_id]['children'])
+    return sorted(selected)
+
+
+def name_matches(names, query):
+    """Mask baris yang namanya memuat query (tanpa membedakan huruf besar/kecil)
+
+    Seluruh kolom nama digabung lalu dipindai sekali oleh regex, posisi hasil
+    dipetakan ke baris dengan searchsorted (sama seperti RuleSet.classify).
+    """
+    mask = np.zeros(len(names), dtype=bool)
+    query = query.replace('\n', ' ')
+    if not names or not query:
+        return mask
+    texts = ['' if name is None else str(name) for name in names]
+    lengths = np.fromiter((len(text) + 1 for text in texts), dtype=np.int64, count=len(texts))
+    row_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    positions = [match.start() for match in re.finditer(f"(?={re.escape(query)})", '\n'.join(texts), re.IGNORECASE)]
+    if positions:
+        mask[np.searchsorted(row_starts, positions, side='right') - 1] = True
+    return mask
+
+
+def filter_placemarks(store, folders_data, folder_ids=None, types=None, geometries=None, name_query='',
+                      attribute=None):
+    """Index placemark (urutan dokumen) yang lolos semua filter
+
+    Filter yang None/kosong tidak membatasi; folder_ids ikut mencakup
+    subfoldernya. attribute adalah (nama atribut, nilai) yang dicocokkan
+    persis (tanpa beda huruf) lewat indeks atribut store.
+    """
+    with span('filter_placemarks', placemarks=len(store)) as record:
+        indices = _filter_indices(store, folders_data, folder_ids, types, geometries, name_query, attribute)
+        record.set(matches=len(indices))
+    return indices
+
+
+def _filter_indices(store, folders_data, folder_ids, types, geometries, name_query, attribute):
+    mask = np.ones(len(store), dtype=bool)
+    if attribute and attribute[0] and str(attribute[1]).strip():
+        matched = np.zeros(len(store), dtype=bool)
+        matched[store.attribute_lookup(*attribute)] = True
+        mask &= matched
+    if folder_ids:
+        mask &= np.isin(store.folder_id, folder_subtree(folders_data, folder_ids))
+    if types:
+        mask &= np.isin(np.asarray(store.type, dtype=object), list(types))
+    if geometries:
+        mask &= np.isin(store.geometry, [GEOMETRY_CODES[name] for name in geometries])
+    if name_query:
+        mask &= name_matches(store.name, name_query)
+    return np.flatnonzero(mask)
+
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
+
+
+def page_rows(store, folders_data, indices, page, page_size, rule_set):
+    """Baris tabel untuk satu halaman (page dimulai dari 1)"""
+    start = (min(max(page, 1), page_count(len(indices), page_size)) - 1) * page_size
+    rows = []
+    for index in indices[start:start + page_size].tolist():
+        type_name = store.type[index]
+        rows.append({
+            'Folder': folders_data[store.folder_id[index]]['path'],
+            'Nama': store.name[index],
+            'Tipe': type_name,
+            'Geometri Asli': store.geometry_type(index),
+            'Vertex': store.vertex_count(index),
+            'Icon Terapkan': rule_set.style_for(type_name)['icon_url'] or 'LineString Hijau',
+            **store.attributes_at(index),
+        })
+    return rows
@@ -0,0 +1,241 @@
+"""Cache hasil pemrosesan berbasis hash isi file
+
+Kunci cache dibangun dari SHA-256 isi file upload ditambah sidik pengaturan
+yang relevan untuk setiap tahap, sehingga setiap tahap dimemo terpisah:
+
+- parse:    (hash file)
+- classify: (hash file, sidik aturan)
+- artefak:  (hash file, sidik aturan, profil ekspor, format, nama artefak)
+- folder:   (sidik isi folder, sidik aturan, profil ekspor, format), dipakai
+            ulang antar revisi file selama isi folder tidak berubah
+
+Mengganti profil ekspor hanya membuat artefak baru, hasil parse dan
+klasifikasi tetap dipakai ulang. Entry disimpan di memori dengan batas
+ukuran (LRU); bila direktori disk diberikan, entry yang tergusur dari
+memori dipindah ke disk yang juga dibatasi ukurannya (LRU).
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from movetoheal.store import PlacemarkStore
+
+DEFAULT_MEMORY_MB = 512
+DEFAULT_DISK_MB = 2048
+
+_HASH_CHUNK = 1 << 20
+
+
+def content_hash(fileobj):
+    """SHA-256 (hex) isi file-like, dibaca per blok lalu posisi dikembalikan ke awal"""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(_HASH_CHUNK), b''):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def profile_key(profile):
+    """Sidik profil ekspor (dict) yang stabil untuk kunci cache"""
+    return json.dumps(profile, sort_keys=True, default=str)
+
+
+def estimate_size(value):
+    """Perkiraan ukuran (byte) sebuah hasil untuk anggaran cache"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, PlacemarkStore):
+        text_columns = (value.name, value.description, value.icon_url)
+        return value.nbytes + sum(len(text or '') + 50 for column in text_columns for text in column)
+    if hasattr(value, 'nbytes'):
+        return value.nbytes
+    if isinstance(value, dict):
+        return 64 + sum(estimate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        # List tipe hanya berisi referensi ke string yang sama
+        if value and isinstance(value[0], str):
+            return 8 * len(value)
+        return 64 + sum(estimate_size(item) for item in value)
+    return 64
+
+
+class ResultCache:
+    """Cache LRU dua tingkat (memori, lalu disk opsional) dengan anggaran byte
+
+    Aman dipakai bersama oleh banyak sesi Streamlit (thread); hitungan hit
+    dan miss dicatat per tahap (bagian pertama kunci).
+    """
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_MB << 20, disk_dir=None, disk_budget=DEFAULT_DISK_MB << 20):
+        self.memory_budget = memory_budget
+        self.disk_dir = disk_dir
+        self.disk_budget = disk_budget if disk_dir else 0
+        self.memory_used = 0
+        self.disk_used = 0
+        self.stats = {}
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _count(self, key, outcome):
+        counters = self.stats.setdefault(key[0], {'hit': 0, 'miss': 0})
+        counters[outcome] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha256(repr(key).encode('utf-8')).hexdigest() + '.pkl')
+
+    def get(self, key, default=None):
+        """Ambil entry (memori lalu disk); entry dari disk dinaikkan ke memori"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._count(key, 'hit')
+                return self._memory[key][0]
+            if key not in self._disk:
+                self._count(key, 'miss')
+                return default
+            path, size = self._disk.pop(key)
+            self.disk_used -= size
+        try:
+            with open(path, 'rb') as handle:
+                value = pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self._count(key, 'miss')
+            return default
+        finally:
+            _remove_file(path)
+        with self._lock:
+            self._count(key, 'hit')
+        self.put(key, value, size)
+        return value
+
+    def put(self, key, value, size=None):
+        """Simpan entry lalu gusur entry paling lama bila anggaran terlampaui"""
+        size = estimate_size(value) if size is None else size
+        evicted = []
+        with self._lock:
+            if key in self._memory:
+                self.memory_used -= self._memory.pop(key)[1]
+            if size > self.memory_budget:
+                evicted.append((key, value, size))
+            else:
+                self._memory[key] = (value, size)
+                self.memory_used += size
+            while self.memory_used > self.memory_budget:
+                old_key, (old_value, old_size) = self._memory.popitem(last=False)
+                self.memory_used -= old_size
+                evicted.append((old_key, old_value, old_size))
+        for old_key, old_value, old_size in evicted:
+            self._spill(old_key, old_value, old_size)
+        return value
+
+    def _spill(self, key, value, size):
+        """Pindahkan entry tergusur ke disk (bila disk aktif dan muat)"""
+        if not self.disk_budget or size > self.disk_budget:
+            return
+        path = self._disk_path(key)
+        try:
+            with open(path, 'wb') as handle:
+                pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        except (OSError, pickle.PicklingError):
+            _remove_file(path)
+            return
+        removed = []
+        with self._lock:
+            if key in self._disk:
+                self.disk_used -= self._disk.pop(key)[1]
+            self._disk[key] = (path, size)
+            self.disk_used += size
+            while self.disk_used > self.disk_budget:
+                _, (old_path, old_size) = self._disk.popitem(last=False)
+                self.disk_used -= old_size
+                removed.append(old_path)
+        for old_path in removed:
+            _remove_file(old_path)
+
+    def get_or_compute(self, key, compute, size=None):
+        """Nilai dari cache, atau hasil compute() yang langsung disimpan
+
+        size(value) opsional untuk menghitung ukuran entry; hasil None tidak
+        disimpan (misal parse yang gagal).
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        value = compute()
+        if value is not None:
+            self.put(key, value, size(value) if size else None)
+        return value
+
+    def size_of(self, key):
+        """Ukuran entry tanpa mengubah urutan LRU (None bila tidak ada)"""
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key][1]
+            if key in self._disk:
+                return self._disk[key][1]
+        return None
+
+    def summary(self):
+        """Ringkasan untuk UI: hit/miss total dan per tahap serta pemakaian"""
+        with self._lock:
+            stats = {stage: dict(counters) for stage, counters in self.stats.items()}
+            return {
+                'hit': sum(counters['hit'] for counters in stats.values()),
+                'miss': sum(counters['miss'] for counters in stats.values()),
+                'stages': stats,
+                'entries': len(self._memory) + len(self._disk),
+                'memory_used': self.memory_used,
+                'memory_budget': self.memory_budget,
+                'disk_used': self.disk_used,
+                'disk_budget': self.disk_budget,
+            }
+
+    def clear(self):
+        with self._lock:
+            paths = [path for path, _ in self._disk.values()]
+            self._memory.clear()
+            self._disk.clear()
+            self.memory_used = 0
+            self.disk_used = 0
+        for path in paths:
+            _remove_file(path)
+
+
+def cache_from_env(environ=None):
+    """ResultCache dengan anggaran dari environment
+
+    MOVETOHEAL_CACHE_MB: anggaran memori (MB, default 512)
+    MOVETOHEAL_CACHE_DIR: direktori cache disk (kosong: tanpa disk)
+    MOVETOHEAL_CACHE_DISK_MB: anggaran disk (MB, default 2048)
+    """
+    environ = os.environ if environ is None else environ
+    try:
+        memory_mb = float(environ.get('MOVETOHEAL_CACHE_MB', DEFAULT_MEMORY_MB))
+        disk_mb = float(environ.get('MOVETOHEAL_CACHE_DISK_MB', DEFAULT_DISK_MB))
+    except ValueError:
+        raise ValueError("MOVETOHEAL_CACHE_MB dan MOVETOHEAL_CACHE_DISK_MB harus berupa angka")
+    return ResultCache(
+        memory_budget=int(memory_mb * (1 << 20)),
+        disk_dir=environ.get('MOVETOHEAL_CACHE_DIR') or None,
+        disk_budget=int(disk_mb * (1 << 20)),
+    )
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,262 @@
+"""CLI batch: proses banyak file KML/KMZ tanpa UI
+
+    python -m movetoheal process data/ --out hasil/
+    python -m movetoheal process "arsip/**/*.kmz" --out hasil/ --format kmz --per-folder
+    python -m movetoheal process besar.kml --out hasil/ --tiles 2000
+
+Setiap file diproses di worker process (parse -> klasifikasi -> ekspor).
+Progres ditulis ke stderr per file, lalu ringkasan dicetak dan laporan JSON
+lengkap disimpan di direktori keluaran. Hanya modul inti yang diimpor
+(tanpa Streamlit/pandas) sehingga start worker tetap cepat.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from movetoheal.export import build_folder_zip, pool_context, render_document, render_folder_exports, render_tiled_kmz
+from movetoheal.parser import parse_kml
+from movetoheal.rules import DEFAULT_RULE_SET, load_rule_set
+from movetoheal.simplify import prepare_export_store
+from movetoheal.tiles import DEFAULT_MAX_PER_TILE
+from movetoheal.writer import EXPORT_PROFILES, resolve_profile
+
+INPUT_EXTENSIONS = ('.kml', '.kmz')
+REPORT_NAME = 'report.json'
+
+_worker_state = {}
+
+
+def _glob_base(pattern):
+    """Bagian awal pola glob tanpa karakter glob (dasar path relatif keluaran)"""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or '.'
+
+
+def find_inputs(patterns):
+    """File input dari daftar direktori (rekursif), glob atau path file
+
+    Mengembalikan list (path, path relatif untuk keluaran) tanpa duplikat.
+    Path relatif dihitung dari direktori atau bagian awal pola glob, jadi
+    arsip/a/x.kmz dan arsip/b/x.kmz dari "arsip/**/*.kmz" menjadi a/x.kmz dan
+    b/x.kmz; path relatif yang tetap bentrok (misal x.kml dan x.kmz, atau
+    dua direktori input) diberi akhiran " (2)", " (3)" dan seterusnya.
+    """
+    found = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                for name in sorted(names):
+                    if name.lower().endswith(INPUT_EXTENSIONS):
+                        path = os.path.join(root, name)
+                        found.setdefault(os.path.abspath(path), os.path.relpath(path, pattern))
+        else:
+            matches = glob.glob(pattern, recursive=True) or ([pattern] if os.path.isfile(pattern) else [])
+            base = _glob_base(pattern) if glob.has_magic(pattern) else None
+            for path in matches:
+                if os.path.isfile(path) and path.lower().endswith(INPUT_EXTENSIONS):
+                    relative = os.path.relpath(path, base) if base else os.path.basename(path)
+                    found.setdefault(os.path.abspath(path), relative)
+
+    # Keluaran ditentukan oleh path relatif tanpa ekstensi
+    inputs = sorted(found.items(), key=lambda item: (item[1], item[0]))
+    seen = Counter()
+    unique = []
+    for path, relative in inputs:
+        stem, extension = os.path.splitext(relative)
+        seen[stem.lower()] += 1
+        if seen[stem.lower()] > 1:
+            relative = f"{stem} ({seen[stem.lower()]}){extension}"
+        unique.append((path, relative))
+    return unique
+
+
+def output_path(out_dir, relative, output_format, per_folder, tile_size=None):
+    stem = os.path.splitext(relative)[0]
+    if per_folder:
+        return os.path.join(out_dir, f"{stem}_folders.zip")
+    return os.path.join(out_dir, f"{stem}_tiles.kmz" if tile_size else f"{stem}.{output_format}")
+
+
+def _init_worker(rules_path, profile, output_format, per_folder, tile_size=None):
+    _worker_state.update(
+        rule_set=load_rule_set(rules_path) if rules_path else DEFAULT_RULE_SET,
+        profile=profile,
+        output_format=output_format,
+        per_folder=per_folder,
+        tile_size=tile_size,
+    )
+
+
+def process_file(path, destination, rule_set=None, profile=None, output_format='kml', per_folder=False,
+                 tile_size=None):
+    """Parse, klasifikasi dan ekspor satu file; mengembalikan baris laporan"""
+    result = {'input': path, 'output': destination, 'status': 'ok', 'error': None,
+              'folders': 0, 'placemarks': 0, 'types': {},
+              'input_bytes': os.path.getsize(path), 'output_bytes': 0}
+    started = time.perf_counter()
+    try:
+        with open(path, 'rb') as handle:
+            folders_data, store = parse_kml(handle, rule_set)
+        result['folders'] = len(folders_data)
+        result['placemarks'] = len(store)
+        result['types'] = dict(Counter(store.type))
+
+        store = prepare_export_store(store, profile)
+        if per_folder:
+            # Sudah berada di worker process: render folder secara serial
+            exports = render_folder_exports(folders_data, store, rule_set, profile, output_format, max_workers=1)
+            data = build_folder_zip(exports).getvalue()
+        elif tile_size:
+            data = render_tiled_kmz(folders_data, store, rule_set, profile, tile_size)
+        else:
+            data = render_document(folders_data, store, rule_set, profile, output_format)
+
+        os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+        partial = destination + '.part'
+        with open(partial, 'wb') as handle:
+            handle.write(data)
+        os.replace(partial, destination)
+        result['output_bytes'] = len(data)
+    except Exception as exc:
+        # Satu file gagal (input rusak maupun bug ekspor) tidak menghentikan batch
+        result.update(status='error', error=f"{type(exc).__name__}: {exc}", output=None)
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _process_in_worker(path, destination):
+    return process_file(path, destination, **_worker_state)
+
+
+def run_batch(inputs, out_dir, rules_path=None, profile=None, output_format='kml', per_folder=False,
+              workers=None, progress=None, tile_size=None):
+    """Proses seluruh input; progress(done, total, result) dipanggil per file
+
+    tile_size (jumlah placemark maksimum per tile) menghasilkan KMZ
+    bertingkat Region/LOD. Mengembalikan list baris laporan dalam urutan input.
+    """
+    jobs = [(path, output_path(out_dir, relative, output_format, per_folder, tile_size)) for path, relative in inputs]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    results = [None] * len(jobs)
+
+    if workers < 2:
+        _init_worker(rules_path, profile, output_format, per_folder, tile_size)
+        for i, (path, destination) in enumerate(jobs):
+            results[i] = _process_in_worker(path, destination)
+            if progress:
+                progress(i + 1, len(jobs), results[i])
+        return results
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=pool_context(),
+        initializer=_init_worker,
+        initargs=(rules_path, profile, output_format, per_folder, tile_size),
+    ) as executor:
+        futures = {executor.submit(_process_in_worker, path, destination): i
+                   for i, (path, destination) in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as exc:
+                # Worker mati (misal kehabisan memori): catat sebagai error file ini
+                path, destination = jobs[i]
+                results[i] = {'input': path, 'output': None, 'status': 'error',
+                              'error': f"{type(exc).__name__}: {exc}", 'folders': 0, 'placemarks': 0,
+                              'types': {}, 'input_bytes': os.path.getsize(path), 'output_bytes': 0, 'seconds': 0.0}
+            if progress:
+                progress(done, len(jobs), results[i])
+    return results
+
+
+def summarize(results, seconds):
+    """Ringkasan batch: jumlah file, placemark, ukuran dan tipe"""
+    ok = [result for result in results if result['status'] == 'ok']
+    types = Counter()
+    for result in ok:
+        types.update(result['types'])
+    return {
+        'files': len(results),
+        'ok': len(ok),
+        'errors': len(results) - len(ok),
+        'placemarks': sum(result['placemarks'] for result in ok),
+        'input_bytes': sum(result['input_bytes'] for result in results),
+        'output_bytes': sum(result['output_bytes'] for result in ok),
+        'types': dict(types.most_common()),
+        'seconds': round(seconds, 3),
+    }
+
+
+def _print_progress(done, total, result):
+    status = 'OK ' if result['status'] == 'ok' else 'ERR'
+    detail = f"{result['placemarks']} placemark" if result['status'] == 'ok' else result['error']
+    print(f"[{done}/{total}] {status} {result['input']} ({detail}, {result['seconds']:.2f}s)", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m movetoheal', description="Pemrosesan KML/KMZ movetoheal")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    process = commands.add_parser('process', help="Proses banyak file KML/KMZ sekaligus")
+    process.add_argument('inputs', nargs='+', help="Direktori, pola glob atau file .kml/.kmz")
+    process.add_argument('--out', required=True, help="Direktori keluaran")
+    process.add_argument('--format', dest='output_format', choices=['kml', 'kmz'], default='kml')
+    process.add_argument('--profile', choices=sorted(EXPORT_PROFILES), default='standar')
+    process.add_argument('--rules', help="File aturan YAML/JSON (default: aturan bawaan)")
+    process.add_argument('--simplify', type=float, metavar='METER', help="Sederhanakan LineString dengan toleransi (meter)")
+    layout = process.add_mutually_exclusive_group()
+    layout.add_argument('--per-folder', action='store_true', help="Satu ZIP berisi file per folder")
+    layout.add_argument('--tiles', type=int, nargs='?', const=DEFAULT_MAX_PER_TILE, metavar='PLACEMARK',
+                        help=f"KMZ bertingkat Region/LOD, maksimum placemark per tile (default {DEFAULT_MAX_PER_TILE})")
+    process.add_argument('--workers', type=int, default=None, help="Jumlah worker process (default: jumlah CPU)")
+    process.add_argument('--report', help=f"Path laporan JSON (default: <out>/{REPORT_NAME})")
+    process.add_argument('--quiet', action='store_true', help="Tanpa progres per file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.rules:
+        try:
+            load_rule_set(args.rules)  # validasi sekali sebelum worker dibuat
+        except (OSError, ValueError) as exc:
+            print(f"Error membaca file aturan: {exc}", file=sys.stderr)
+            return 2
+
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        print("Tidak ada file .kml/.kmz yang cocok", file=sys.stderr)
+        return 2
+
+    profile = resolve_profile(args.profile)
+    profile['simplify_tolerance'] = args.simplify
+
+    os.makedirs(args.out, exist_ok=True)
+    started = time.perf_counter()
+    results = run_batch(
+        inputs, args.out, args.rules, profile, args.output_format, args.per_folder,
+        workers=args.workers, progress=None if args.quiet else _print_progress, tile_size=args.tiles,
+    )
+    summary = summarize(results, time.perf_counter() - started)
+
+    report_path = args.report or os.path.join(args.out, REPORT_NAME)
+    with open(report_path, 'w', encoding='utf-8') as handle:
+        json.dump({'summary': summary, 'files': results}, handle, indent=2, ensure_ascii=False)
+
+    print(f"{summary['ok']}/{summary['files']} file berhasil, {summary['errors']} error, "
+          f"{summary['placemarks']} placemark dalam {summary['seconds']:.1f}s")
+    for type_name, count in summary['types'].items():
+        print(f"  {type_name}: {count}")
+    print(f"Laporan: {report_path}")
+    return 1 if summary['errors'] else 0
@@ -0,0 +1,209 @@
+"""Perbandingan dua revisi KML (revisi lama vs baru)
+
+Setiap placemark diberi hash geometri (kode geometri + bytes koordinat) dan
+hash isi (hash geometri + nama + deskripsi + atribut ExtendedData).
+Placemark dipasangkan dalam tiga tahap, masing-masing satu kali lewat dict
+(linear terhadap jumlah placemark):
+
+1. hash isi + path folder sama: tidak berubah (atau hanya tipenya)
+2. kunci stabil (path folder + nama, menurut urutan kemunculan): geometri,
+   deskripsi dan/atau tipe berubah
+3. hash isi saja: placemark pindah folder
+
+Sisanya ditambah (hanya di revisi baru) atau dihapus (hanya di revisi lama).
+Sidik folder (hash isi + tipe seluruh placemark-nya) menandai folder yang
+berubah dan menjadi kunci cache render per folder yang bisa dipakai ulang
+antar revisi.
+"""
+import hashlib
+from collections import Counter, defaultdict, deque
+
+from movetoheal.perf import span
+from movetoheal.rules import DEFAULT_RULE_SET
+from movetoheal.stats import haversine_m
+from movetoheal.writer import KmlWriter, resolve_profile, write_placemark, write_shared_styles
+
+STATUSES = ('Ditambah', 'Dipindah', 'Tipe Berubah', 'Diubah', 'Dihapus')
+
+_DIGEST_SIZE = 16
+
+
+def placemark_hashes(store):
+    """(hash geometri, hash isi) per placemark sebagai list bytes"""
+    geometry_hashes, content_hashes = [], []
+    coords = store.coords
+    offsets = store.offsets.tolist()
+    for index, code in enumerate(store.geometry.tolist()):
+        geometry = hashlib.blake2b(coords[offsets[index]:offsets[index + 1]].tobytes(),
+                                   digest_size=_DIGEST_SIZE, salt=bytes([code])).digest()
+        content = hashlib.blake2b(geometry, digest_size=_DIGEST_SIZE)
+        # <name/> atau <description/> kosong tersimpan sebagai None
+        content.update((store.name[index] or '').encode('utf-8') + b'\0'
+                       + (store.description[index] or '').encode('utf-8'))
+        if store.attributes:
+            content.update(b'\0' + repr(sorted(store.attributes_at(index).items())).encode('utf-8'))
+        geometry_hashes.append(geometry)
+        content_hashes.append(content.digest())
+    return geometry_hashes, content_hashes
+
+
+def folder_signatures(folders_data, store, content_hashes=None):
+    """Sidik hex per folder: path, lalu hash isi dan tipe setiap placemark"""
+    if content_hashes is None:
+        content_hashes = placemark_hashes(store)[1]
+    signatures = []
+    for folder_data in folders_data:
+        digest = hashlib.blake2b(folder_data['path'].encode('utf-8'), digest_size=_DIGEST_SIZE)
+        for index in folder_data['placemarks']:
+            digest.update(content_hashes[index])
+            digest.update(store.type[index].encode('utf-8') + b'\0')
+        signatures.append(digest.hexdigest())
+    return signatures
+
+
+def _match(old_keys, new_keys, old_pending, new_pending):
+    """Pasangkan index dengan kunci sama (urutan kemunculan); mengembalikan list (lama, baru)"""
+    available = defaultdict(deque)
+    for old in old_pending:
+        available[old_keys(old)].append(old)
+    pairs = []
+    for new in new_pending:
+        candidates = available.get(new_keys(new))
+        if candidates:
+            pairs.append((candidates.popleft(), new))
+    return pairs
+
+
+def diff_revisions(old_folders, old_store, new_folders, new_store):
+    """Laporan perbedaan revisi lama -> baru
+
+    Mengembalikan dict berisi 'rows' (hanya placemark yang berubah),
+    'summary' (jumlah per status), 'changed_folders' (id folder revisi baru
+    yang sidiknya berbeda atau baru) dan 'removed_folders' (path folder yang
+    hilang).
+    """
+    with span('diff_revisions', old=len(old_store), new=len(new_store)) as record:
+        old_geometry, old_content = placemark_hashes(old_store)
+        new_geometry, new_content = placemark_hashes(new_store)
+        old_path = [old_folders[folder_id]['path'] for folder_id in old_store.folder_id.tolist()]
+        new_path = [new_folders[folder_id]['path'] for folder_id in new_store.folder_id.tolist()]
+
+        old_pending = range(len(old_store))
+        new_pending = range(len(new_store))
+        pairs = []
+        for old_key, new_key in (
+            (lambda i: (old_content[i], old_path[i]), lambda i: (new_content[i], new_path[i])),
+            (lambda i: (old_path[i], old_store.name[i]), lambda i: (new_path[i], new_store.name[i])),
+            (lambda i: old_content[i], lambda i: new_content[i]),
+        ):
+            matched = _match(old_key, new_key, old_pending, new_pending)
+            pairs.extend(matched)
+            old_done = {old for old, _ in matched}
+            new_done = {new for _, new in matched}
+            old_pending = [old for old in old_pending if old not in old_done]
+            new_pending = [new for new in new_pending if new not in new_done]
+
+        rows = []
+        unchanged = 0
+        for old, new in sorted(pairs, key=lambda pair: pair[1]):
+            changes = []
+            if old_geometry[old] != new_geometry[new]:
+                changes.append('geometri')
+            if old_path[old] != new_path[new]:
+                changes.append('folder')
+            if old_store.type[old] != new_store.type[new]:
+                changes.append('tipe')
+            if old_store.description[old] != new_store.description[new]:
+                changes.append('deskripsi')
+            if (old_store.attributes or new_store.attributes) \
+                    and old_store.attributes_at(old) != new_store.attributes_at(new):
+                changes.append('atribut')
+            if not changes:
+                unchanged += 1
+                continue
+            if 'geometri' in changes or 'folder' in changes:
+                status = 'Dipindah'
+            elif 'tipe' in changes:
+                status = 'Tipe Berubah'
+            else:
+                status = 'Diubah'
+            rows.append(_row(status, old_folders, old_store, old, new_folders, new_store, new, changes))
+        rows.extend(_row('Ditambah', old_folders, old_store, None, new_folders, new_store, new, []) for new in new_pending)
+        rows.extend(_row('Dihapus', old_folders, old_store, old, new_folders, new_store, None, []) for old in old_pending)
+
+        counts = Counter(row['Status'] for row in rows)
+        summary = {'Tidak Berubah': unchanged}
+        summary.update((status, counts[status]) for status in STATUSES)
+
+        old_signatures = dict(zip((folder_data['path'] for folder_data in old_folders),
+                                  folder_signatures(old_folders, old_store, old_content)))
+        new_signatures = folder_signatures(new_folders, new_store, new_content)
+        new_paths = {folder_data['path'] for folder_data in new_folders}
+        report = {
+            'rows': rows,
+            'summary': summary,
+            'changed_folders': [folder_data['id'] for folder_data in new_folders
+                                if old_signatures.get(folder_data['path']) != new_signatures[folder_data['id']]],
+            'removed_folders': [path for path in old_signatures if path not in new_paths],
+        }
+        record.set(changed=len(rows), changed_folders=len(report['changed_folders']))
+    return report
+
+
+def _row(status, old_folders, old_store, old, new_folders, new_store, new, changes):
+    row = {'Status': status, 'old': old, 'new': new}
+    current, store, folders_data = (new, new_store, new_folders) if new is not None else (old, old_store, old_folders)
+    row['Folder'] = folders_data[store.folder_id[current]]['path']
+    row['Nama'] = store.name[current]
+    row['Tipe'] = store.type[current]
+    row['Folder Lama'] = old_folders[old_store.folder_id[old]]['path'] if old is not None and new is not None else None
+    row['Tipe Lama'] = old_store.type[old] if old is not None and new is not None else None
+    row['Perubahan'] = ', '.join(changes)
+    row['Pergeseran (m)'] = None
+    if 'geometri' in changes:
+        old_coords, new_coords = old_store.coordinates(old), new_store.coordinates(new)
+        if len(old_coords) and len(new_coords):
+            row['Pergeseran (m)'] = round(float(haversine_m(*old_coords[0, :2], *new_coords[0, :2])), 2)
+    return row
+
+
+def diff_rows(rows):
+    """Baris laporan untuk tabel/CSV (tanpa kolom internal)"""
+    return [{key: value for key, value in row.items() if key not in ('old', 'new')} for row in rows]
+
+
+def write_delta_kml(sink, report, old_folders, old_store, new_folders, new_store, rule_set=None, profile=None):
+    """Tulis KML delta: folder per status, berisi subfolder per path folder
+
+    Placemark 'Dihapus' ditulis dari revisi lama, sisanya dari revisi baru.
+    """
+    rule_set = rule_set or DEFAULT_RULE_SET
+    profile = resolve_profile(profile)
+    writer = KmlWriter(sink, profile['indent'])
+    writer.start_kml()
+    writer.leaf('name', 'Delta Revisi')
+    if profile['shared_styles']:
+        types = [new_store.type[row['new']] if row['new'] is not None else old_store.type[row['old']]
+                 for row in report['rows']]
+        write_shared_styles(writer, rule_set, list(dict.fromkeys(types)))
+
+    by_status = defaultdict(lambda: defaultdict(list))
+    for row in report['rows']:
+        by_status[row['Status']][row['Folder']].append(row)
+    for status in STATUSES:
+        if status not in by_status:
+            continue
+        removed = status == 'Dihapus'
+        store = old_store if removed else new_store
+        writer.start('Folder')
+        writer.leaf('name', status)
+        writer.leaf('description', f"{sum(len(rows) for rows in by_status[status].values())} item")
+        for path, rows in by_status[status].items():
+            writer.start('Folder')
+            writer.leaf('name', path)
+            for row in rows:
+                write_placemark(writer, store, row['old'] if removed else row['new'], rule_set, profile,
+                                'Folder', path, ' ' * 16)
+            writer.end()
+        writer.end()
+    writer.end_kml()
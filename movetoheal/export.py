@@ -0,0 +1,166 @@
+"""Ekspor per folder: setiap folder dirender satu kali, paralel bila besar
+
+Render KML adalah pekerjaan CPU-bound, jadi folder dibagi ke process pool.
+Store, rule set dan profil dikirim satu kali per worker (initializer), lalu
+setiap task hanya membawa folder_data. Hasil dikumpulkan menurut urutan
+folder asli sehingga isi ZIP selalu deterministik, dan bytes yang sama
+dipakai ulang untuk download per folder.
+"""
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from movetoheal.diff import write_delta_kml
+from movetoheal.kmz import write_kmz, write_kmz_entries
+from movetoheal.perf import span
+from movetoheal.tiles import DEFAULT_MAX_PER_TILE, tiled_kmz_entries
+from movetoheal.validate import write_validation_kml
+from movetoheal.writer import write_enhanced_kml, write_single_folder_kml
+
+# Di bawah jumlah placemark ini biaya start worker lebih besar dari hasilnya
+PARALLEL_MIN_PLACEMARKS = 5000
+
+_worker_state = {}
+
+# Modul yang dimuat sekali oleh proses forkserver, bukan oleh setiap worker
+_WORKER_MODULES = ['movetoheal.cli', 'movetoheal.merge']
+
+
+def folder_filename(folder_data, extension='kml'):
+    """Nama file yang aman untuk satu folder, berdasarkan path folder"""
+    safe_name = re.sub(r'[^\w\s/-]', '', folder_data['path']).strip()
+    safe_name = re.sub(r'[-\s/]+', '_', safe_name)
+    return f"{safe_name}.{extension}"
+
+
+def render_document(folders_data, store, rule_set=None, profile=None, output_format='kml'):
+    """Render KML utuh (semua folder) menjadi bytes KML atau KMZ"""
+    with span('render_document', placemarks=len(store), format=output_format) as record:
+        output = BytesIO()
+        if output_format == 'kmz':
+            write_kmz(output, lambda entry: write_enhanced_kml(entry, folders_data, store, rule_set, profile))
+        else:
+            write_enhanced_kml(output, folders_data, store, rule_set, profile)
+        record.set(bytes=output.tell())
+    return output.getvalue()
+
+
+def render_tiled_kmz(folders_data, store, rule_set=None, profile=None, max_per_tile=DEFAULT_MAX_PER_TILE):
+    """Render KMZ bertingkat (tile Region/LOD dengan NetworkLink) menjadi bytes"""
+    with span('render_tiled_kmz', placemarks=len(store), max_per_tile=max_per_tile) as record:
+        output = BytesIO()
+        entries = tiled_kmz_entries(folders_data, store, rule_set, profile, max_per_tile)
+        write_kmz_entries(output, entries)
+        record.set(tiles=len(entries) - 1, bytes=output.tell())
+    return output.getvalue()
+
+
+def render_validation(report, profile=None, output_format='kml'):
+    """Render folder pelanggar validasi menjadi bytes KML atau KMZ"""
+    output = BytesIO()
+    if output_format == 'kmz':
+        write_kmz(output, lambda entry: write_validation_kml(entry, report, profile))
+    else:
+        write_validation_kml(output, report, profile)
+    return output.getvalue()
+
+
+def render_delta(report, old_folders, old_store, new_folders, new_store, rule_set=None, profile=None,
+                 output_format='kml'):
+    """Render KML delta antar revisi (lihat movetoheal.diff) menjadi bytes KML atau KMZ"""
+    output = BytesIO()
+
+    def write(sink):
+        write_delta_kml(sink, report, old_folders, old_store, new_folders, new_store, rule_set, profile)
+
+    if output_format == 'kmz':
+        write_kmz(output, write)
+    else:
+        write(output)
+    return output.getvalue()
+
+
+def render_folder(folder_data, store, rule_set=None, profile=None, output_format='kml'):
+    """Render satu folder menjadi bytes KML atau KMZ"""
+    output = BytesIO()
+    if output_format == 'kmz':
+        write_kmz(output, lambda entry: write_single_folder_kml(entry, folder_data, store, rule_set, profile))
+    else:
+        write_single_folder_kml(output, folder_data, store, rule_set, profile)
+    return output.getvalue()
+
+
+def _init_worker(store, rule_set, profile, output_format):
+    _worker_state.update(store=store, rule_set=rule_set, profile=profile, output_format=output_format)
+
+
+def _render_in_worker(folder_data):
+    return render_folder(folder_data, **_worker_state)
+
+
+def pool_context():
+    """Konteks multiprocessing untuk process pool movetoheal (forkserver atau spawn)"""
+    # Bukan fork: server Streamlit multi-thread, dan proses hasil fork mewarisi
+    # lock yang sedang dipegang thread lain (misal handler logging perf).
+    # forkserver membuat worker dari proses server bersih yang hanya memuat
+    # modul movetoheal; spawn di platform tanpa forkserver
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(_WORKER_MODULES)
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def render_folder_exports(folders_data, store, rule_set=None, profile=None, output_format='kml', max_workers=None):
+    """Render setiap folder yang berisi placemark tepat satu kali
+
+    Mengembalikan list dict {'folder', 'filename', 'data'} dalam urutan
+    folders_data.
+    """
+    folders = [folder_data for folder_data in folders_data if len(folder_data['placemarks'])]
+    total_placemarks = sum(len(folder_data['placemarks']) for folder_data in folders)
+    workers = min(max_workers or os.cpu_count() or 1, len(folders))
+    if total_placemarks < PARALLEL_MIN_PLACEMARKS:
+        workers = 1
+
+    with span('render_folder_exports', folders=len(folders), placemarks=total_placemarks,
+              workers=workers, format=output_format) as record:
+        if workers < 2:
+            rendered = [render_folder(folder_data, store, rule_set, profile, output_format) for folder_data in folders]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=pool_context(),
+                initializer=_init_worker,
+                initargs=(store, rule_set, profile, output_format),
+            ) as executor:
+                # Folder terbesar dikirim lebih dulu agar beban worker seimbang
+                order = sorted(range(len(folders)), key=lambda i: len(folders[i]['placemarks']), reverse=True)
+                futures = {i: executor.submit(_render_in_worker, folders[i]) for i in order}
+                rendered = [futures[i].result() for i in range(len(folders))]
+        record.set(bytes=sum(len(data) for data in rendered))
+
+    return [
+        {'folder': folder_data, 'filename': folder_filename(folder_data, output_format), 'data': data}
+        for folder_data, data in zip(folders, rendered)
+    ]
+
+
+def build_folder_zip(exports):
+    """Gabungkan hasil render_folder_exports menjadi ZIP (BytesIO)"""
+    zip_buffer = BytesIO()
+    timestamp = time.localtime()[:6]
+    with span('build_folder_zip', files=len(exports)) as record:
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for export in exports:
+                info = zipfile.ZipInfo(export['filename'], date_time=timestamp)
+                # KMZ sudah terkompresi, simpan tanpa kompresi ulang
+                info.compress_type = zipfile.ZIP_STORED if export['filename'].endswith('.kmz') else zipfile.ZIP_DEFLATED
+                zip_file.writestr(info, export['data'])
+        record.set(bytes=zip_buffer.tell())
+    zip_buffer.seek(0)
+    return zip_buffer
@@ -0,0 +1,56 @@
+"""Dukungan KMZ (KML terkompresi ZIP) untuk input dan output
+
+Input: dokumen KML di dalam arsip dibaca sebagai stream yang didekompresi
+sambil jalan, tanpa diekstrak menjadi string utuh di memori.
+Output: KML ditulis langsung ke entry 'doc.kml' (dan entry lain untuk KMZ
+bertingkat) sehingga kompresi terjadi bersamaan dengan penulisan dokumen.
+"""
+import zipfile
+from contextlib import contextmanager
+
+KMZ_DOC_NAME = 'doc.kml'
+KML_MIME = 'application/vnd.google-earth.kml+xml'
+KMZ_MIME = 'application/vnd.google-earth.kmz'
+
+
+def find_kml_entry(archive):
+    """Nama entry KML utama: 'doc.kml', atau file .kml pertama (utamakan root)"""
+    names = [info.filename for info in archive.infolist()
+             if not info.is_dir() and info.filename.lower().endswith('.kml')]
+    if not names:
+        raise ValueError("Arsip KMZ tidak berisi file .kml")
+    if KMZ_DOC_NAME in names:
+        return KMZ_DOC_NAME
+    root_names = [name for name in names if '/' not in name]
+    return (root_names or names)[0]
+
+
+@contextmanager
+def open_kml_stream(fileobj):
+    """Buka stream KML dari file KML biasa atau KMZ (dideteksi dari isinya)"""
+    fileobj.seek(0)
+    if not zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        yield fileobj
+        return
+
+    fileobj.seek(0)
+    with zipfile.ZipFile(fileobj) as archive:
+        with archive.open(find_kml_entry(archive)) as entry:
+            yield entry
+
+
+def write_kmz(sink, write_kml, compresslevel=6):
+    """Tulis KMZ ke sink biner; write_kml(stream) menulis isi doc.kml"""
+    write_kmz_entries(sink, [(KMZ_DOC_NAME, write_kml)], compresslevel)
+
+
+def write_kmz_entries(sink, entries, compresslevel=6):
+    """Tulis KMZ berisi banyak entry; entries berisi (nama, write_kml(stream))
+
+    Entry pertama sebaiknya doc.kml agar dikenali sebagai dokumen utama.
+    """
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as archive:
+        for name, write_kml in entries:
+            with archive.open(name, 'w') as entry:
+                write_kml(entry)
@@ -0,0 +1,141 @@
+"""Gabungan banyak file KML/KMZ satu proyek menjadi satu dokumen
+
+File diparse bersamaan di process pool (tanpa klasifikasi), lalu
+digabung menjadi satu pohon folder: setiap file sumber menjadi folder akar
+dengan pohon folder aslinya di bawahnya, sehingga path folder gabungan
+adalah '<file sumber>/<path asli>'. Placemark dengan hash geometri dan nama
+yang sama hanya disimpan sekali (kemunculan pertama, menurut urutan file).
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+
+from movetoheal.diff import placemark_hashes
+from movetoheal.export import pool_context
+from movetoheal.parser import PARSE_ERRORS, parse_kml
+from movetoheal.perf import span
+from movetoheal.store import PlacemarkStore, concat_extra_columns
+
+# Di bawah total ukuran ini parse serial lebih cepat dari start worker
+PARALLEL_MIN_BYTES = 4 << 20
+
+
+def _parse_source(data):
+    """Parse satu file (bytes) tanpa klasifikasi; error dikembalikan, bukan dilempar"""
+    started = time.perf_counter()
+    result = {'status': 'ok', 'error': None, 'parsed': None}
+    try:
+        result['parsed'] = parse_kml(BytesIO(data), classify=False)
+    except PARSE_ERRORS as exc:
+        result.update(status='error', error=f"{type(exc).__name__}: {exc}")
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def parse_sources(datas, max_workers=None):
+    """Parse banyak file (list bytes) sekaligus; hasil per file dalam urutan input
+
+    Setiap hasil berisi 'status' ('ok'/'error'), 'error', 'seconds' dan
+    'parsed' ((folders_data, store) atau None).
+    """
+    workers = min(max_workers or os.cpu_count() or 1, len(datas))
+    if sum(len(data) for data in datas) < PARALLEL_MIN_BYTES:
+        workers = 1
+    with span('parse_sources', files=len(datas), workers=workers) as record:
+        if workers < 2:
+            results = [_parse_source(data) for data in datas]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as executor:
+                results = list(executor.map(_parse_source, datas))
+        record.set(errors=sum(result['status'] != 'ok' for result in results))
+    return results
+
+
+def source_names(file_names):
+    """Nama folder akar per file sumber (tanpa ekstensi, dibuat unik)"""
+    names, seen = [], {}
+    for file_name in file_names:
+        name = os.path.splitext(os.path.basename(file_name))[0] or 'Tanpa Nama'
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name} ({seen[name]})")
+    return names
+
+
+def merge_key(sources):
+    """Kunci cache gabungan dari (nama sumber, hash file) dalam urutan upload"""
+    return hashlib.sha256(json.dumps(list(sources)).encode('utf-8')).hexdigest()
+
+
+def merge_parsed(sources):
+    """Gabungkan list (nama sumber, folders_data, store) menjadi satu dokumen
+
+    Mengembalikan (folders_data, store, rows): store tanpa tipe (klasifikasi
+    dilakukan pemanggil) dan rows berisi jumlah placemark serta duplikat
+    yang dibuang per file sumber.
+    """
+    with span('merge_parsed', files=len(sources)) as record:
+        folders_data = []
+        columns = {'name': [], 'description': [], 'icon_url': []}
+        folder_ids, geometries, coords, counts, source_of = [], [], [], [], []
+        for position, (source_name, source_folders, store) in enumerate(sources):
+            root = {'id': len(folders_data), 'name': source_name, 'parent_id': None, 'children': [],
+                    'depth': 0, 'path': source_name, 'placemarks': None}
+            folders_data.append(root)
+            base = root['id'] + 1
+            for folder_data in source_folders:
+                folders_data.append({
+                    'id': folder_data['id'] + base,
+                    'name': folder_data['name'],
+                    'parent_id': root['id'] if folder_data['parent_id'] is None else folder_data['parent_id'] + base,
+                    'children': [child_id + base for child_id in folder_data['children']],
+                    'depth': folder_data['depth'] + 1,
+                    'path': f"{source_name}/{folder_data['path']}",
+                    'placemarks': None,
+                })
+                if folder_data['parent_id'] is None:
+                    root['children'].append(folder_data['id'] + base)
+            for column, values in columns.items():
+                values.extend(getattr(store, column))
+            folder_ids.append(store.folder_id + base)
+            geometries.append(store.geometry)
+            coords.append(store.coords)
+            counts.append(np.diff(store.offsets))
+            source_of.append(np.full(len(store), position, dtype=np.int64))
+
+        offsets = np.zeros(len(columns['name']) + 1, dtype=np.int64)
+        np.cumsum(np.concatenate(counts) if counts else [], out=offsets[1:])
+        parts, attributes = concat_extra_columns([source_store for _, _, source_store in sources])
+        store = PlacemarkStore(
+            columns['name'], columns['description'], columns['icon_url'],
+            np.concatenate(folder_ids).astype(np.int32) if folder_ids else np.empty(0, np.int32),
+            np.concatenate(geometries) if geometries else np.empty(0, np.int8),
+            np.concatenate(coords) if coords else np.empty((0, 3)),
+            offsets,
+            parts,
+            attributes,
+        )
+        source_of = np.concatenate(source_of) if source_of else np.empty(0, np.int64)
+
+        # Duplikat: hash geometri + nama sama dengan placemark sebelumnya
+        seen = set()
+        keep = np.ones(len(store), dtype=bool)
+        for index, key in enumerate(zip(placemark_hashes(store)[0], store.name)):
+            if key in seen:
+                keep[index] = False
+            else:
+                seen.add(key)
+        if not keep.all():
+            store = store.subset(np.flatnonzero(keep))
+        for folder_data, indices in zip(folders_data, store.folder_indices(len(folders_data))):
+            folder_data['placemarks'] = indices
+
+        removed = np.bincount(source_of[~keep], minlength=len(sources))
+        rows = [{'Sumber': source_name, 'Placemark': len(source_store), 'Duplikat Dibuang': int(removed[position])}
+                for position, (source_name, _, source_store) in enumerate(sources)]
+        record.set(placemarks=len(store), duplicates=int(removed.sum()))
+    return folders_data, store, rows
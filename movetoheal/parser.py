@@ -0,0 +1,242 @@
+"""Parser KML streaming menjadi pohon folder dan PlacemarkStore
+
+Modul ini tidak bergantung pada Streamlit/pandas sehingga bisa dipakai oleh
+UI maupun CLI batch (worker process tetap cepat saat start).
+"""
+import zipfile
+
+import numpy as np
+from lxml import etree
+
+from movetoheal.kmz import open_kml_stream
+from movetoheal.perf import span
+from movetoheal.rules import classify_placemarks
+from movetoheal.store import PlacemarkStoreBuilder, parse_coordinates
+
+KML_NS = '{http://www.opengis.net/kml/2.2}'
+GX_NS = '{http://www.google.com/kml/ext/2.2}'
+
+# Geometri langsung di bawah Placemark -> nama geometry_type
+_GEOMETRY_TAGS = {
+    KML_NS + 'Point': 'Point',
+    KML_NS + 'LineString': 'LineString',
+    KML_NS + 'LinearRing': 'LineString',
+    KML_NS + 'Polygon': 'Polygon',
+    KML_NS + 'MultiGeometry': 'MultiGeometry',
+    GX_NS + 'Track': 'Track',
+    GX_NS + 'MultiTrack': 'Track',
+}
+
+# Geometry_type untuk MultiGeometry yang hanya berisi satu bagian
+_SINGLE_PART_TYPES = {'Point': 'Point', 'LineString': 'LineString', 'outerBoundaryIs': 'Polygon', 'Track': 'Track'}
+
+# Error yang menandakan file input tidak bisa dibaca sebagai KML/KMZ
+PARSE_ERRORS = (etree.XMLSyntaxError, OSError, zipfile.BadZipFile, ValueError)
+
+
+def parse_kml(source, rule_set=None, classify=True):
+    """Parse KML file secara streaming (iterparse) dengan struktur folder asli
+
+    File dibaca langsung dari file handle (KMZ didekompresi sambil jalan
+    tanpa diekstrak), setiap Placemark diproses saat
+    tag penutupnya ditemukan lalu elemennya dibersihkan, sehingga memori
+    hanya sebesar placemark terbesar, bukan sebesar file.
+
+    Dalam satu traversal dibangun pohon folder: setiap folder_data memiliki
+    'id', 'parent_id', 'children', 'depth' dan 'path', dan setiap placemark
+    hanya masuk ke folder terdekat yang memuatnya.
+
+    Tipe placemark diidentifikasi sekaligus untuk semua placemark setelah
+    parsing selesai, menggunakan rule_set (default: DEFAULT_RULE_SET).
+    classify=False melewati langkah ini (tipe diisi terpisah, misal dari cache).
+
+    Mengembalikan (folders_data, store): store adalah PlacemarkStore berbasis
+    kolom dan folder_data['placemarks'] berisi array index placemark ke store.
+    File yang rusak menghasilkan salah satu dari PARSE_ERRORS.
+    """
+    with span('parse') as record:
+        folders_data, store = _parse_tree(source)
+        record.set(placemarks=len(store), folders=len(folders_data), vertices=len(store.coords))
+
+    # Identifikasi tipe seluruh placemark dalam satu batch
+    if classify:
+        classify_placemarks(store, rule_set)
+    return folders_data, store
+
+
+def _parse_tree(source):
+    """Satu traversal iterparse: pohon folder dan PlacemarkStore tanpa tipe"""
+    folders_data = []
+    builder = PlacemarkStoreBuilder()
+    has_root_placemarks = False
+
+    # Stack folder yang sedang terbuka: (elemen, folder_data)
+    open_folders = []
+
+    with open_kml_stream(source) as kml_stream:
+        context = etree.iterparse(
+            kml_stream,
+            events=('start', 'end'),
+            tag=(KML_NS + 'Folder', KML_NS + 'Placemark', KML_NS + 'name'),
+            huge_tree=True,
+        )
+        for event, elem in context:
+            tag = elem.tag
+            if tag == KML_NS + 'Folder':
+                if event == 'start':
+                    parent = open_folders[-1][1] if open_folders else None
+                    folder_data = {
+                        'id': len(folders_data),
+                        'name': 'Unnamed Folder',
+                        'parent_id': parent['id'] if parent else None,
+                        'children': [],
+                        'depth': len(open_folders),
+                        'path': '',
+                        'placemarks': None
+                    }
+                    if parent:
+                        parent['children'].append(folder_data['id'])
+                    folders_data.append(folder_data)
+                    open_folders.append((elem, folder_data))
+                else:
+                    open_folders.pop()
+                    _release_element(elem)
+            elif event != 'end':
+                continue
+            elif tag == KML_NS + 'name':
+                # Nama folder adalah child langsung dari Folder
+                if open_folders and elem.getparent() is open_folders[-1][0]:
+                    open_folders[-1][1]['name'] = elem.text or 'Unnamed Folder'
+            else:
+                placemark_data = extract_placemark_data(elem)
+                _release_element(elem)
+                if not placemark_data:
+                    continue
+                # Placemark hanya masuk ke folder terdekat (-1: root)
+                if open_folders:
+                    builder.append(placemark_data, open_folders[-1][1]['id'])
+                else:
+                    builder.append(placemark_data, -1)
+                    has_root_placemarks = True
+        del context
+
+    store = builder.build()
+
+    # Parent selalu muncul sebelum child, path cukup dihitung sekali jalan
+    for folder_data in folders_data:
+        parent_id = folder_data['parent_id']
+        if parent_id is None:
+            folder_data['path'] = folder_data['name']
+        else:
+            folder_data['path'] = f"{folders_data[parent_id]['path']}/{folder_data['name']}"
+
+    # Jika ada placemark di root, buat folder khusus
+    if has_root_placemarks:
+        root_id = len(folders_data)
+        store.folder_id[store.folder_id == -1] = root_id
+        folders_data.append({
+            'id': root_id,
+            'name': 'Root Placemarks',
+            'parent_id': None,
+            'children': [],
+            'depth': 0,
+            'path': 'Root Placemarks',
+            'placemarks': None
+        })
+
+    for folder_data, indices in zip(folders_data, store.folder_indices(len(folders_data))):
+        folder_data['placemarks'] = indices
+
+    return folders_data, store
+
+
+def _release_element(elem):
+    """Bersihkan elemen yang sudah diproses beserta sibling sebelumnya"""
+    elem.clear()
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def extract_placemark_data(placemark):
+    """Ekstrak data dari placemark termasuk geometry asli"""
+    placemark_data = {}
+
+    # Extract name
+    name_elem = placemark.find('{http://www.opengis.net/kml/2.2}name')
+    placemark_data['name'] = name_elem.text if name_elem is not None else 'N/A'
+
+    # Extract description
+    desc_elem = placemark.find('{http://www.opengis.net/kml/2.2}description')
+    placemark_data['description'] = desc_elem.text if desc_elem is not None else ''
+
+    # Extract geometry type dan coordinates asli (di-parse menjadi array float)
+    geometry_elem = next(placemark.iterchildren(*_GEOMETRY_TAGS), None)
+    if geometry_elem is not None and _GEOMETRY_TAGS[geometry_elem.tag] in ('Polygon', 'MultiGeometry', 'Track'):
+        parts = []
+        _collect_parts(geometry_elem, parts)
+        geometry_type = _GEOMETRY_TAGS[geometry_elem.tag]
+        if geometry_type == 'MultiGeometry' and len(parts) == 1:
+            geometry_type = _SINGLE_PART_TYPES[parts[0][0]]
+        placemark_data['geometry_type'] = geometry_type
+        placemark_data['coordinates'] = np.concatenate([coords for _, coords in parts]) if parts else parse_coordinates(None)
+        placemark_data['parts'] = [(kind, len(coords)) for kind, coords in parts]
+    else:
+        if geometry_elem is None:
+            # Geometri tidak langsung di bawah Placemark: cari seperti sebelumnya
+            geometry_elem = placemark.find(f'.//{KML_NS}LineString')
+            if geometry_elem is None:
+                geometry_elem = placemark.find(f'.//{KML_NS}Point')
+        placemark_data['geometry_type'] = _GEOMETRY_TAGS[geometry_elem.tag] if geometry_elem is not None else 'Unknown'
+        coords_elem = geometry_elem.find(f'{KML_NS}coordinates') if geometry_elem is not None else None
+        placemark_data['coordinates'] = parse_coordinates(coords_elem.text if coords_elem is not None else None)
+
+    # Extract icon URL
+    icon_elem = placemark.find('.//{http://www.opengis.net/kml/2.2}href')
+    placemark_data['icon_url'] = icon_elem.text if icon_elem is not None else 'N/A'
+
+    placemark_data['attributes'] = extract_extended_data(placemark)
+
+    return placemark_data
+
+
+def _collect_parts(elem, parts):
+    """Kumpulkan (jenis bagian, array koordinat) dari satu elemen geometri secara rekursif"""
+    tag = elem.tag
+    if tag in (KML_NS + 'Point', KML_NS + 'LineString', KML_NS + 'LinearRing'):
+        coords_elem = elem.find(f'{KML_NS}coordinates')
+        kind = 'Point' if tag == KML_NS + 'Point' else 'LineString'
+        parts.append((kind, parse_coordinates(coords_elem.text if coords_elem is not None else None)))
+    elif tag == KML_NS + 'Polygon':
+        for boundary in ('outerBoundaryIs', 'innerBoundaryIs'):
+            for coords_elem in elem.iterfind(f'{KML_NS}{boundary}/{KML_NS}LinearRing/{KML_NS}coordinates'):
+                parts.append((boundary, parse_coordinates(coords_elem.text)))
+    elif tag == GX_NS + 'Track':
+        # gx:coord berisi "lon lat alt" dipisah spasi, satu vertex per elemen
+        texts = [','.join(coord.text.split()) for coord in elem.iterfind(f'{GX_NS}coord') if coord.text]
+        parts.append(('Track', parse_coordinates(' '.join(texts))))
+    elif tag in (KML_NS + 'MultiGeometry', GX_NS + 'MultiTrack'):
+        for child in elem:
+            _collect_parts(child, parts)
+
+
+def extract_extended_data(placemark):
+    """Atribut ExtendedData (Data/value dan SchemaData/SimpleData) sebagai dict teks
+
+    Nilai kosong dianggap tidak ada.
+    """
+    attributes = {}
+    extended = placemark.find(f'{KML_NS}ExtendedData')
+    if extended is None:
+        return attributes
+    for data_elem in extended.iterfind(f'{KML_NS}Data'):
+        value_elem = data_elem.find(f'{KML_NS}value')
+        value = value_elem.text.strip() if value_elem is not None and value_elem.text else ''
+        if data_elem.get('name') and value:
+            attributes[data_elem.get('name')] = value
+    for simple_elem in extended.iterfind(f'{KML_NS}SchemaData/{KML_NS}SimpleData'):
+        value = simple_elem.text.strip() if simple_elem.text else ''
+        if simple_elem.get('name') and value:
+            attributes[simple_elem.get('name')] = value
+    return attributes
@@ -0,0 +1,182 @@
+"""Instrumentasi per tahap pipeline (span)
+
+    with span('parse') as record:
+        ...
+        record.set(placemarks=len(store))
+
+Setiap span mencatat waktu wall, waktu CPU proses, perubahan RSS, jumlah
+elemen (counts) dan, bila diaktifkan, puncak alokasi tracemalloc. Span
+bersarang mencatat parent-nya. Span yang selesai ditulis sebagai satu baris
+JSON ke logger 'movetoheal.perf' dan dikumpulkan oleh collect() untuk panel
+UI.
+
+Diaktifkan lewat environment MOVETOHEAL_PERF:
+    (kosong/0) mati: span() mengembalikan objek no-op bersama
+    1          waktu, CPU, RSS dan counts
+    memory     ditambah puncak tracemalloc (lebih lambat)
+MOVETOHEAL_PERF_LOG=path menulis baris JSON ke file (default: stderr).
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger('movetoheal.perf')
+
+_enabled = False
+_trace_memory = False
+_local = threading.local()
+
+
+class _NullSpan:
+    """Span yang tidak mencatat apa pun (instrumentasi mati)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **counts):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Satu tahap yang sedang diukur; gunakan lewat span()"""
+
+    def __init__(self, name, counts):
+        self.name = name
+        self.counts = counts
+        self.record = None
+        self._child_peak = 0
+
+    def set(self, **counts):
+        """Tambahkan/ubah jumlah elemen yang dicatat span ini"""
+        self.counts.update(counts)
+
+    def __enter__(self):
+        stack = _stack()
+        self._parent = stack[-1] if stack else None
+        stack.append(self)
+        self._rss = current_rss()
+        if _trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._traced, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        rss = current_rss()
+        _stack().pop()
+
+        self.record = {
+            'span': self.name,
+            'parent': self._parent.name if self._parent else None,
+            'depth': len(_stack()),
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'rss_bytes': rss,
+            'rss_delta_bytes': rss - self._rss if rss is not None and self._rss is not None else None,
+            'max_rss_bytes': max_rss(),
+            'counts': self.counts,
+            'error': exc_type.__name__ if exc_type else None,
+            'pid': os.getpid(),
+            'time': round(time.time(), 3),
+        }
+        if _trace_memory and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], self._child_peak)
+            self.record['traced_peak_delta_bytes'] = peak - self._traced
+            # reset_peak di span ini juga mereset puncak milik parent
+            if self._parent is not None:
+                self._parent._child_peak = max(self._parent._child_peak, peak)
+
+        logger.info(json.dumps(self.record, default=str))
+        for spans in getattr(_local, 'collectors', ()):
+            spans.append(self.record)
+        return False
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def enabled():
+    return _enabled
+
+
+def span(name, **counts):
+    """Context manager pengukur satu tahap (no-op bila instrumentasi mati)"""
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, counts)
+
+
+class collect:
+    """Kumpulkan record span yang selesai di thread ini (misal satu rerun UI)"""
+
+    def __enter__(self):
+        self.spans = []
+        if not hasattr(_local, 'collectors'):
+            _local.collectors = []
+        _local.collectors.append(self.spans)
+        return self.spans
+
+    def __exit__(self, *exc):
+        _local.collectors.remove(self.spans)
+        return False
+
+
+def current_rss():
+    """RSS proses saat ini (byte) dari /proc; None bila tidak tersedia"""
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def max_rss():
+    """Puncak RSS proses (byte); None bila modul resource tidak ada"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def configure(mode=None, log_path=None):
+    """Aktifkan/matikan instrumentasi; mode seperti MOVETOHEAL_PERF"""
+    global _enabled, _trace_memory
+    mode = (mode or '').strip().lower()
+    _enabled = mode not in ('', '0', 'false', 'off')
+    _trace_memory = mode == 'memory'
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    if _enabled:
+        handler = logging.FileHandler(log_path) if log_path else logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+configure(os.environ.get('MOVETOHEAL_PERF'), os.environ.get('MOVETOHEAL_PERF_LOG'))
@@ -0,0 +1,182 @@
+"""Data preview peta dengan desimasi di server
+
+Browser hanya menerima paling banyak max_primitives primitif (marker titik
+ditambah vertex garis), berapa pun ukuran file:
+
+- titik di dalam tampilan dikelompokkan per tipe ke grid di atas kotak
+  tampilan; grid dikasarkan sampai jumlah cluster muat anggaran
+- LineString yang bbox-nya menyentuh tampilan disederhanakan (Douglas-Peucker)
+  mulai dari toleransi satu piksel, digandakan sampai vertex muat anggaran
+
+Resolusi mengikuti kotak tampilan, jadi memperkecil tampilan (zoom)
+menghasilkan cluster lebih halus dan garis lebih detail. Modul ini hanya
+memakai NumPy; plotting dilakukan di app.
+"""
+import numpy as np
+
+from movetoheal.perf import span
+from movetoheal.rules import DEFAULT_RULE_SET
+from movetoheal.simplify import simplify_mask
+from movetoheal.spatial import local_scale
+from movetoheal.stats import LINESTRING
+from movetoheal.store import GEOMETRY_CODES
+from movetoheal.tiles import placemark_bounds
+
+POINT = GEOMETRY_CODES['Point']
+
+MAX_PRIMITIVES = 20000
+
+# Lebar kanvas (piksel) untuk toleransi penyederhanaan satu piksel
+CANVAS_PIXELS = 1000
+
+# Batas penggandaan toleransi garis sebelum garis terkecil dibuang
+_MAX_TOLERANCE_STEPS = 16
+
+
+def kml_color_to_hex(color):
+    """Warna KML aabbggrr menjadi #rrggbb"""
+    return f"#{color[6:8]}{color[4:6]}{color[2:4]}"
+
+
+def data_view(store):
+    """Kotak tampilan (west, south, east, north) seluruh data; None bila kosong"""
+    bounds = placemark_bounds(store)
+    finite = np.isfinite(bounds).all(axis=1)
+    if not finite.any():
+        return None
+    return (float(bounds[finite, 0].min()), float(bounds[finite, 1].min()),
+            float(bounds[finite, 2].max()), float(bounds[finite, 3].max()))
+
+
+def cluster_points(lon, lat, codes, view, max_points):
+    """Cluster titik per (kode tipe, sel grid) sampai jumlahnya <= max_points
+
+    Mengembalikan (lon, lat, jumlah, kode, index anggota pertama) per cluster.
+    """
+    if len(lon) <= max_points:
+        return lon, lat, np.ones(len(lon), dtype=np.int64), codes, np.arange(len(lon))
+    west, south, east, north = view
+    grid = max(int(np.sqrt(max_points)), 1)
+    while True:
+        ix = np.clip(((lon - west) / max(east - west, 1e-12) * grid).astype(np.int64), 0, grid - 1)
+        iy = np.clip(((lat - south) / max(north - south, 1e-12) * grid).astype(np.int64), 0, grid - 1)
+        keys = (codes.astype(np.int64) * grid + ix) * grid + iy
+        _, first, inverse, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+        if len(counts) <= max_points or grid == 1:
+            break
+        grid = int(grid / 1.4)
+    # Posisi cluster: rata-rata anggotanya
+    cluster_lon = np.bincount(inverse, weights=lon) / counts
+    cluster_lat = np.bincount(inverse, weights=lat) / counts
+    return cluster_lon, cluster_lat, counts, codes[first], first
+
+
+def _decimate_lines(lines, view, max_vertices):
+    """Mask vertex garis (sepanjang lines.coords) yang dikirim, dan toleransinya"""
+    keep = np.ones(len(lines.coords), dtype=bool)
+    if len(lines.coords) <= max_vertices:
+        return keep, 0.0
+    west, south, east, north = view
+    scale = local_scale(lines.coords)
+    tolerance = max((east - west) * scale[0], (north - south) * scale[1]) / CANVAS_PIXELS
+    for _ in range(_MAX_TOLERANCE_STEPS):
+        keep = simplify_mask(lines, tolerance, protect_types=())
+        kept = keep.sum()
+        if kept <= max_vertices:
+            return keep, tolerance
+        # Hanya ujung garis yang tersisa: toleransi lebih besar tidak membantu
+        if kept <= 2 * len(lines):
+            break
+        tolerance *= 2
+
+    # Masih terlalu banyak garis: utamakan garis dengan bbox terbesar
+    counts = np.bincount(np.repeat(np.arange(len(lines)), np.diff(lines.offsets))[keep], minlength=len(lines))
+    bounds = placemark_bounds(lines)
+    order = np.argsort(-np.hypot(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1]), kind='stable')
+    selected = np.zeros(len(lines), dtype=bool)
+    selected[order[np.cumsum(counts[order]) <= max_vertices]] = True
+    keep &= np.repeat(selected, np.diff(lines.offsets))
+    return keep, tolerance
+
+
+def preview_data(store, rule_set=None, view=None, max_primitives=MAX_PRIMITIVES):
+    """Trace preview per tipe untuk kotak tampilan view (default: seluruh data)
+
+    Mengembalikan dict berisi 'view', 'aspect' (rasio skala lat/lon agar
+    jarak tidak terdistorsi), 'points' (list per tipe: lon, lat, count,
+    size, label), 'lines' (list per tipe: lon, lat dengan NaN sebagai
+    pemisah garis, color, width) dan 'stats'.
+    """
+    rule_set = rule_set or DEFAULT_RULE_SET
+    view = view or data_view(store)
+    result = {'view': view, 'aspect': 1.0, 'points': [], 'lines': [],
+              'stats': {'Titik': 0, 'Marker Titik': 0, 'Vertex Garis': 0, 'Vertex Garis Dikirim': 0,
+                        'Toleransi Garis (m)': 0.0}}
+    if view is None:
+        return result
+    west, south, east, north = view
+    result['aspect'] = 1.0 / max(float(np.cos(np.radians((south + north) / 2))), 1e-6)
+
+    with span('preview_data', placemarks=len(store), max_primitives=max_primitives) as record:
+        types = np.asarray(store.type, dtype=object)
+        type_names, type_codes = np.unique(types, return_inverse=True) if len(types) else (np.empty(0), np.empty(0, np.int64))
+        counts = np.diff(store.offsets)
+
+        # Titik di dalam tampilan
+        points = np.flatnonzero((store.geometry == POINT) & (counts > 0))
+        lon, lat = store.coords[store.offsets[points], 0], store.coords[store.offsets[points], 1]
+        inside = (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+        points, lon, lat = points[inside], lon[inside], lat[inside]
+
+        # Garis yang bbox-nya menyentuh tampilan
+        bounds = placemark_bounds(store)
+        lines = np.flatnonzero((store.geometry == LINESTRING) & (counts > 1)
+                               & (bounds[:, 0] <= east) & (bounds[:, 2] >= west)
+                               & (bounds[:, 1] <= north) & (bounds[:, 3] >= south))
+
+        # Anggaran dibagi rata; sisa anggaran salah satu jenis dipakai jenis lain
+        line_vertices = int(counts[lines].sum())
+        point_budget = max(max_primitives - min(line_vertices, max_primitives // 2), 1)
+        cluster_lon, cluster_lat, cluster_size, cluster_code, first = cluster_points(
+            lon, lat, type_codes[points], view, point_budget)
+        line_budget = max(max_primitives - len(cluster_size), 0)
+
+        for code, type_name in enumerate(type_names.tolist()):
+            members = np.flatnonzero(cluster_code == code)
+            if not len(members):
+                continue
+            sizes = cluster_size[members]
+            labels = [store.name[points[index]] if size == 1 else f"{size} titik {type_name}"
+                      for index, size in zip(first[members].tolist(), sizes.tolist())]
+            result['points'].append({'type': type_name, 'lon': cluster_lon[members], 'lat': cluster_lat[members],
+                                     'count': sizes, 'size': np.clip(6 + 2 * np.log2(sizes), 6, 20), 'label': labels})
+
+        line_store = store.subset(lines)
+        keep, tolerance = _decimate_lines(line_store, view, line_budget)
+        owner = np.repeat(np.arange(len(line_store)), np.diff(line_store.offsets))
+        line_codes = type_codes[lines]
+        for code in np.unique(line_codes).tolist():
+            type_name = type_names[code]
+            vertex = keep & (line_codes[owner] == code)
+            if not vertex.any():
+                continue
+            # NaN di antara garis agar WebGL tidak menyambung garis berbeda
+            picked = np.flatnonzero(vertex)
+            breaks = np.flatnonzero(np.diff(owner[picked])) + 1
+            xy = np.insert(line_store.coords[picked, :2], breaks, np.nan, axis=0)
+            style = rule_set.style_for(type_name)
+            result['lines'].append({
+                'type': type_name, 'lon': xy[:, 0], 'lat': xy[:, 1],
+                'color': kml_color_to_hex(style['line_color']) if style['line_color'] else None,
+                'width': float(style['line_width'] or 1),
+            })
+
+        result['stats'] = {
+            'Titik': len(points),
+            'Marker Titik': len(cluster_size),
+            'Vertex Garis': line_vertices,
+            'Vertex Garis Dikirim': int(keep.sum()),
+            'Toleransi Garis (m)': round(float(tolerance), 2),
+        }
+        record.set(markers=len(cluster_size), line_vertices=int(keep.sum()))
+    return result
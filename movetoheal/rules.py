@@ -0,0 +1,283 @@
+"""Rule engine untuk identifikasi tipe placemark
+
+Aturan (pattern, field, match, priority, type, style) didefinisikan satu
+kali di DEFAULT_RULES atau dimuat dari file YAML/JSON milik user. field
+adalah 'name', 'description' atau nama atribut ExtendedData (misal spec_id).
+Semua pattern 'contains' untuk satu field dikompilasi menjadi satu regex
+alternation, lalu satu kolom diklasifikasi sekaligus dalam satu pemindaian;
+pattern 'equals' dicari lewat indeks atribut store tanpa memindai kolom.
+"""
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+from movetoheal.perf import span
+
+MATCH_MODES = ('contains', 'equals')
+
+DEFAULT_FALLBACK = {
+    'type': 'Unknown',
+    'style': {
+        'icon_url': 'http://maps.google.com/mapfiles/kml/paddle/red-circle.png',
+    },
+}
+
+# Urutan priority sama dengan rantai if/elif identify_type sebelumnya
+DEFAULT_RULES = [
+    {
+        'pattern': 'JC01', 'field': 'name', 'priority': 10, 'type': 'JC01',
+        'style': {'icon_url': 'http://maps.google.com/mapfiles/kml/shapes/forbidden.png'},
+        'symbol': '🚫', 'note': 'Titik forbidden',
+    },
+    {
+        'pattern': 'OP01', 'field': 'name', 'priority': 20, 'type': 'OP01',
+        'style': {'icon_url': 'http://maps.google.com/mapfiles/kml/paddle/ltblu-stars.png'},
+        'symbol': '🔵', 'note': 'Titik bintang biru',
+    },
+    {
+        'pattern': '-OB', 'field': 'name', 'priority': 30, 'type': 'OB',
+        'style': {'icon_url': 'http://maps.google.com/mapfiles/kml/shapes/placemark_square.png'},
+        'symbol': '◼️', 'note': 'Titik persegi',
+    },
+    {
+        'pattern': '-OC', 'field': 'name', 'priority': 40, 'type': 'OC',
+        'style': {'icon_url': 'http://maps.google.com/mapfiles/kml/shapes/triangle.png'},
+        'symbol': '🔺', 'note': 'Titik segitiga',
+    },
+    {
+        'pattern': 'OTB-4x1-Big-Bay', 'field': 'spec_id', 'match': 'equals', 'priority': 50,
+        'type': 'OTB-4x1-Big-Bay',
+        'style': {'icon_url': 'http://maps.google.com/mapfiles/kml/shapes/picnic.png'},
+        'symbol': '🧺', 'note': 'Titik picnic (atribut spec_id)',
+    },
+    {
+        # File lama menulis spec_id di dalam description
+        'pattern': 'OTB-4x1-Big-Bay', 'field': 'description', 'priority': 50, 'type': 'OTB-4x1-Big-Bay',
+        'style': {'icon_url': 'http://maps.google.com/mapfiles/kml/shapes/picnic.png'},
+        'symbol': '🧺', 'note': 'Titik picnic (spec_id di description)',
+    },
+    {
+        'pattern': '-KU', 'field': 'name', 'priority': 60, 'type': 'KU-Line',
+        'style': {'line_color': 'ff00ff00', 'line_width': 3},  # Hijau width 3
+        'symbol': '🟢', 'note': 'Garis hijau width 3',
+    },
+]
+
+
+class RuleSet:
+    """Kumpulan aturan yang sudah dikompilasi menjadi satu matcher per field"""
+
+    def __init__(self, rules, fallback=None):
+        self.fallback = _normalize_fallback(fallback or DEFAULT_FALLBACK)
+        normalized = [_normalize_rule(rule, i) for i, rule in enumerate(rules)]
+        # Stabil: rule dengan priority sama tetap mengikuti urutan definisi
+        self.rules = sorted(normalized, key=lambda rule: rule['priority'])
+        self.types = [rule['type'] for rule in self.rules]
+
+        self.styles = {}
+        for rule in self.rules:
+            self.styles.setdefault(rule['type'], rule['style'])
+        self.styles.setdefault(self.fallback['type'], self.fallback['style'])
+
+        # Sidik aturan untuk kunci cache: aturan yang sama -> sidik yang sama
+        definition = json.dumps({'rules': self.rules, 'fallback': self.fallback}, sort_keys=True, default=str)
+        self.fingerprint = hashlib.sha256(definition.encode('utf-8')).hexdigest()
+
+        # Satu regex per field; group ke-n (1-based) menunjuk rank aturan.
+        # Lookahead membuat pattern yang saling tumpang tindih tetap terdeteksi.
+        self.fields = list(dict.fromkeys(rule['field'] for rule in self.rules))
+        self._matchers = {}
+        for field in self.fields:
+            ranks = [rank for rank, rule in enumerate(self.rules)
+                     if rule['field'] == field and rule['match'] == 'contains']
+            if not ranks:
+                continue
+            alternation = '|'.join(f"({re.escape(self.rules[rank]['pattern'])})" for rank in ranks)
+            self._matchers[field] = (re.compile(f"(?=(?:{alternation}))", re.IGNORECASE), np.array(ranks))
+        self._equals = [(rank, rule['field'], rule['pattern']) for rank, rule in enumerate(self.rules)
+                        if rule['match'] == 'equals']
+
+    def classify(self, columns, lookup=None):
+        """Klasifikasi satu batch; columns adalah dict field -> list nilai
+
+        lookup(field, pattern) mengembalikan array index baris yang nilainya
+        sama dengan pattern (misal PlacemarkStore.attribute_lookup), atau None
+        bila field tidak terindeks sehingga kolomnya dibandingkan langsung.
+        Mengembalikan list tipe dengan panjang yang sama dengan kolomnya.
+        """
+        size = max((len(values) for values in columns.values()), default=0)
+        no_match = len(self.rules)
+        best = np.full(size, no_match, dtype=np.int64)
+
+        for rank, field, pattern in self._equals:
+            rows = lookup(field, pattern) if lookup else None
+            if rows is None:
+                values = columns.get(field) or []
+                key = pattern.strip().lower()
+                rows = [row for row, value in enumerate(values)
+                        if value is not None and str(value).strip().lower() == key]
+            if len(rows):
+                np.minimum.at(best, np.asarray(rows, dtype=np.int64), rank)
+
+        for field, (matcher, ranks) in self._matchers.items():
+            values = columns.get(field)
+            if not values:
+                continue
+            texts = ['' if value is None else str(value) for value in values]
+            # Gabungkan seluruh kolom; '\n' tidak pernah ada di dalam pattern
+            lengths = np.fromiter((len(text) + 1 for text in texts), dtype=np.int64, count=len(texts))
+            row_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            joined = '\n'.join(texts)
+
+            positions = []
+            groups = []
+            for match in matcher.finditer(joined):
+                positions.append(match.start())
+                groups.append(match.lastindex)
+            if not positions:
+                continue
+
+            rows = np.searchsorted(row_starts, positions, side='right') - 1
+            np.minimum.at(best, rows, ranks[np.asarray(groups) - 1])
+
+        labels = np.array(self.types + [self.fallback['type']], dtype=object)
+        return labels[best].tolist()
+
+    def classify_one(self, name, description):
+        """Klasifikasi satu placemark (untuk pemanggilan tunggal)"""
+        return self.classify({'name': [name], 'description': [description]})[0]
+
+    def style_for(self, type_name):
+        """Style lengkap (icon_url, line_color, line_width) untuk satu tipe"""
+        style = self.styles.get(type_name, self.fallback['style'])
+        line_color = style.get('line_color')
+        return {
+            'icon_url': style.get('icon_url'),
+            'line_color': line_color,
+            'line_width': style.get('line_width', 1) if line_color else None,
+        }
+
+    def line_types(self):
+        """Tipe yang digambar sebagai garis (style memiliki line_color)"""
+        return [type_name for type_name, style in self.styles.items() if style.get('line_color')]
+
+    def describe(self):
+        """Baris tabel aturan untuk ditampilkan di UI"""
+        rows = []
+        for rule in self.rules:
+            style = rule['style']
+            if style.get('icon_url'):
+                icon = os.path.basename(style['icon_url'])
+            else:
+                icon = 'LineString'
+            rows.append({
+                'Pattern': rule['pattern'],
+                'Field': rule['field'],
+                'Match': rule['match'],
+                'Priority': rule['priority'],
+                'Tipe': rule['type'],
+                'Icon': icon,
+                'Simbol': rule['symbol'],
+                'Keterangan': rule['note'],
+            })
+        return rows
+
+
+def _normalize_rule(rule, index):
+    if not isinstance(rule, dict):
+        raise ValueError(f"Aturan #{index + 1} harus berupa mapping")
+    missing = [key for key in ('pattern', 'type') if not rule.get(key)]
+    if missing:
+        raise ValueError(f"Aturan #{index + 1} tidak memiliki {', '.join(missing)}")
+    pattern = str(rule['pattern'])
+    if '\n' in pattern:
+        raise ValueError(f"Pattern aturan #{index + 1} tidak boleh berisi baris baru")
+    match = str(rule.get('match', 'contains'))
+    if match not in MATCH_MODES:
+        raise ValueError(f"Match aturan #{index + 1} harus salah satu dari {', '.join(MATCH_MODES)}")
+    style = rule.get('style') or {}
+    if not isinstance(style, dict):
+        raise ValueError(f"Style aturan #{index + 1} harus berupa mapping")
+    return {
+        'pattern': pattern,
+        'field': str(rule.get('field', 'name')),
+        'match': match,
+        'priority': float(rule.get('priority', index)),
+        'type': str(rule['type']),
+        'style': style,
+        'symbol': rule.get('symbol', ''),
+        'note': rule.get('note', ''),
+    }
+
+
+def _normalize_fallback(fallback):
+    return {
+        'type': str(fallback.get('type', 'Unknown')),
+        'style': fallback.get('style') or DEFAULT_FALLBACK['style'],
+    }
+
+
+def rule_set_from_dict(data):
+    """Buat RuleSet dari struktur {'rules': [...], 'fallback': {...}}"""
+    if isinstance(data, list):
+        data = {'rules': data}
+    if not isinstance(data, dict) or not isinstance(data.get('rules'), list):
+        raise ValueError("File aturan harus memiliki daftar 'rules'")
+    return RuleSet(data['rules'], data.get('fallback'))
+
+
+def load_rule_set(source):
+    """Muat RuleSet dari path atau file-like (misal UploadedFile) YAML/JSON"""
+    if hasattr(source, 'read'):
+        name = getattr(source, 'name', '')
+        content = source.read()
+    else:
+        name = str(source)
+        with open(source, 'rb') as handle:
+            content = handle.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+
+    if name.lower().endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML diperlukan untuk membaca file aturan YAML")
+        try:
+            data = yaml.safe_load(content)
+        except yaml.YAMLError as exc:
+            raise ValueError(f"File aturan YAML tidak valid: {exc}")
+    else:
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"File aturan JSON tidak valid: {exc}")
+    return rule_set_from_dict(data)
+
+
+DEFAULT_RULE_SET = RuleSet(DEFAULT_RULES)
+
+
+def classify_placemarks(store, rule_set=None):
+    """Isi kolom 'type' PlacemarkStore dalam satu batch
+
+    Field selain name/description dibaca dari atribut ExtendedData store;
+    aturan 'equals' pada atribut memakai indeks atribut store.
+    """
+    rule_set = rule_set or DEFAULT_RULE_SET
+    with span('classify', placemarks=len(store), rules=len(rule_set.rules)):
+        columns = {'name': store.name, 'description': store.description}
+        for field in rule_set.fields:
+            if field not in columns and field in store.attributes:
+                columns[field] = store.attribute_values(field)
+
+        def lookup(field, pattern):
+            if field in ('name', 'description') or field not in store.attributes:
+                return None
+            return store.attribute_lookup(field, pattern)
+
+        store.type = rule_set.classify(columns, lookup)
+    return store
@@ -0,0 +1,143 @@
+"""Penyederhanaan LineString (Douglas-Peucker) dengan toleransi meter
+
+Semua LineString diproses bersamaan: setiap iterasi menghitung jarak
+seluruh vertex interior terhadap chord rentangnya dengan NumPy, lalu setiap
+rentang yang jarak maksimumnya melebihi toleransi dibelah di vertex
+tersebut. Jumlah iterasi sebanding dengan kedalaman rekursi Douglas-Peucker,
+bukan dengan jumlah garis.
+
+Vertex ujung selalu dipertahankan, begitu juga vertex yang berimpit
+(dalam snap_distance) dengan titik JC01/OB sehingga sambungan tidak bergeser.
+"""
+import numpy as np
+
+from movetoheal.perf import span
+from movetoheal.spatial import GridIndex, local_scale, point_segment_distance
+from movetoheal.stats import LINESTRING
+from movetoheal.store import GEOMETRY_CODES, format_coordinates
+
+POINT = GEOMETRY_CODES['Point']
+
+PROTECT_TYPES = ('JC01', 'OB')
+SNAP_DISTANCE = 0.5
+
+
+def _protected_vertices(store, xy, line_vertex, protect_types, snap_distance):
+    """Mask vertex LineString yang berimpit dengan titik bertipe protect_types"""
+    protected = np.zeros(len(line_vertex), dtype=bool)
+    types = np.asarray(store.type, dtype=object)
+    counts = np.diff(store.offsets)
+    nodes = np.flatnonzero((store.geometry == POINT) & (counts > 0) & np.isin(types, list(protect_types)))
+    if not len(nodes) or not len(line_vertex):
+        return protected
+    node_xy = xy[store.offsets[nodes]]
+    query, node = GridIndex(node_xy, node_xy, snap_distance).candidates(xy[line_vertex])
+    close = np.hypot(*(xy[line_vertex][query] - node_xy[node]).T) <= snap_distance
+    protected[query[close]] = True
+    return protected
+
+
+def simplify_mask(store, tolerance, protect_types=PROTECT_TYPES, snap_distance=SNAP_DISTANCE):
+    """Mask vertex (sepanjang store.coords) yang dipertahankan"""
+    keep = np.ones(len(store.coords), dtype=bool)
+    counts = np.diff(store.offsets)
+    lines = np.flatnonzero((store.geometry == LINESTRING) & (counts > 2))
+    if not len(lines) or tolerance <= 0:
+        return keep
+
+    xy = store.coords[:, :2] * local_scale(store.coords)
+    line_vertex = _ranges(store.offsets[lines], store.offsets[lines + 1])
+    keep[line_vertex] = False
+
+    # Titik awal: ujung garis dan vertex yang dilindungi
+    anchors = np.zeros(len(line_vertex), dtype=bool)
+    line_starts = np.cumsum(counts[lines]) - counts[lines]
+    anchors[line_starts] = True
+    anchors[line_starts + counts[lines] - 1] = True
+    anchors |= _protected_vertices(store, xy, line_vertex, protect_types, snap_distance)
+    anchor_vertex = line_vertex[anchors]
+    keep[anchor_vertex] = True
+
+    # Rentang awal: pasangan anchor berurutan dalam garis yang sama
+    owner = np.repeat(np.arange(len(store)), counts)[anchor_vertex]
+    same_line = owner[:-1] == owner[1:]
+    starts, ends = anchor_vertex[:-1][same_line], anchor_vertex[1:][same_line]
+
+    while True:
+        interior = ends - starts - 1
+        active = interior > 0
+        starts, ends, interior = starts[active], ends[active], interior[active]
+        if not len(starts):
+            break
+        vertex = _ranges(starts + 1, ends)
+        span_id = np.repeat(np.arange(len(starts)), interior)
+        distance = point_segment_distance(xy[vertex], xy[starts[span_id]], xy[ends[span_id]])
+
+        # Vertex terjauh per rentang: urutkan (rentang, -jarak), ambil yang pertama
+        order = np.lexsort((-distance, span_id))
+        first = order[np.cumsum(interior) - interior]
+        split = distance[first] > tolerance
+        pivot = vertex[first][split]
+        keep[pivot] = True
+        starts, ends = (np.concatenate([starts[split], pivot]), np.concatenate([pivot, ends[split]]))
+    return keep
+
+
+def _ranges(starts, stops):
+    """Gabungan arange(start, stop) untuk banyak rentang sekaligus"""
+    lengths = stops - starts
+    total = int(lengths.sum())
+    return np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+
+
+def prepare_export_store(store, profile):
+    """Store untuk ekspor: disederhanakan bila profil memiliki simplify_tolerance"""
+    tolerance = profile.get('simplify_tolerance') if isinstance(profile, dict) else None
+    return simplify_store(store, tolerance) if tolerance else store
+
+
+def simplify_store(store, tolerance, protect_types=PROTECT_TYPES, snap_distance=SNAP_DISTANCE):
+    """Salinan store dengan LineString disederhanakan (toleransi dalam meter)"""
+    with span('simplify', placemarks=len(store), vertices=len(store.coords), tolerance=tolerance) as record:
+        keep = simplify_mask(store, tolerance, protect_types, snap_distance)
+        owner = np.repeat(np.arange(len(store)), np.diff(store.offsets))
+        offsets = np.zeros(len(store) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(owner[keep], minlength=len(store)), out=offsets[1:])
+        simplified = store.with_coordinates(store.coords[keep], offsets)
+        record.set(kept_vertices=int(keep.sum()))
+    return simplified
+
+
+def _coordinate_text_sizes(store, profile):
+    """Perkiraan panjang teks <coordinates> per placemark untuk profil ekspor"""
+    sizes = np.zeros(len(store), dtype=np.int64)
+    counts = np.diff(store.offsets)
+    for index in np.flatnonzero((store.geometry == LINESTRING) & (counts > 0)).tolist():
+        sizes[index] = len(format_coordinates(store.coordinates(index), profile['precision'], profile['drop_zero_altitude']))
+    return sizes
+
+
+def simplification_report(folders_data, original, simplified, profile):
+    """Baris per folder: vertex LineString dan ukuran teks koordinat sebelum/sesudah"""
+    is_line = original.geometry == LINESTRING
+    folder_id = original.folder_id.astype(np.int64)
+    before = np.bincount(folder_id[is_line], weights=np.diff(original.offsets)[is_line], minlength=len(folders_data))
+    after = np.bincount(folder_id[is_line], weights=np.diff(simplified.offsets)[is_line], minlength=len(folders_data))
+    size_before = np.bincount(folder_id, weights=_coordinate_text_sizes(original, profile), minlength=len(folders_data))
+    size_after = np.bincount(folder_id, weights=_coordinate_text_sizes(simplified, profile), minlength=len(folders_data))
+
+    rows = []
+    for folder_data in folders_data:
+        fid = folder_data['id']
+        if not before[fid]:
+            continue
+        rows.append({
+            'Folder': folder_data['path'],
+            'Vertex Asli': int(before[fid]),
+            'Vertex Sederhana': int(after[fid]),
+            'Reduksi Vertex (%)': round(100.0 * (1 - float(after[fid] / before[fid])), 1),
+            'Teks Koordinat Asli (byte)': int(size_before[fid]),
+            'Teks Koordinat Sederhana (byte)': int(size_after[fid]),
+            'Reduksi Ukuran (%)': round(100.0 * (1 - float(size_after[fid] / size_before[fid])), 1) if size_before[fid] else 0.0,
+        })
+    return rows
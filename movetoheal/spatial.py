@@ -0,0 +1,200 @@
+"""Indeks spasial grid untuk query jarak titik dan segmen kabel
+
+Koordinat diproyeksikan sekali ke bidang lokal (equirectangular, meter)
+yang berpusat di lintang rata-rata data; untuk jaringan skala kota/kabupaten
+selisihnya terhadap jarak geodesik jauh di bawah toleransi validasi.
+
+Setiap item (titik atau bounding box segmen) didaftarkan ke semua sel grid
+yang disentuhnya, lalu seluruh pasangan (sel, item) diurutkan sekali.
+Query mengambil kandidat dari sel-sel tetangga dengan searchsorted, sehingga
+jarak hanya dihitung untuk pasangan yang berdekatan, bukan semua titik
+terhadap semua segmen.
+"""
+import numpy as np
+
+from movetoheal.stats import EARTH_RADIUS_M, LINESTRING
+from movetoheal.store import GEOMETRY_CODES
+
+POINT = GEOMETRY_CODES['Point']
+
+# Kunci sel: ix * _KEY_STRIDE + iy (ix, iy bisa negatif)
+_KEY_STRIDE = 1 << 31
+
+# Batas rata-rata sel per item; bila terlampaui ukuran sel diperbesar
+_MAX_CELLS_PER_ITEM = 16
+
+# Pencarian tetangga terdekat bertahap: ukuran sel digandakan per level
+_SEARCH_LEVELS = 13
+
+
+def local_scale(coords):
+    """Faktor (x, y) derajat -> meter lokal, berpusat di lintang rata-rata"""
+    finite = np.isfinite(coords[:, 1])
+    lat0 = float(np.mean(coords[finite, 1])) if finite.any() else 0.0
+    return np.array([np.cos(np.radians(lat0)), 1.0]) * np.radians(1.0) * EARTH_RADIUS_M
+
+
+class GridIndex:
+    """Grid hash atas bounding box item (titik: min == max)"""
+
+    def __init__(self, min_xy, max_xy, cell_size):
+        cell_size = float(cell_size)
+        while True:
+            low = np.floor(min_xy / cell_size).astype(np.int64)
+            high = np.floor(max_xy / cell_size).astype(np.int64)
+            spans = high - low + 1
+            cells = spans[:, 0] * spans[:, 1]
+            if not len(cells) or cells.sum() <= _MAX_CELLS_PER_ITEM * len(cells):
+                break
+            cell_size *= 2
+        self.cell_size = cell_size
+
+        # Ekspansi setiap item ke seluruh sel yang disentuh bbox-nya
+        items = np.repeat(np.arange(len(cells)), cells)
+        local = np.arange(len(items)) - np.repeat(np.cumsum(cells) - cells, cells)
+        width = spans[items, 0]
+        ix = low[items, 0] + local % width
+        iy = low[items, 1] + local // width
+        keys = ix * _KEY_STRIDE + iy
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._items = items[order]
+
+    def cell_of(self, xy):
+        return np.floor(xy / self.cell_size).astype(np.int64)
+
+    def candidates(self, xy, rings=1):
+        """Pasangan (index query, index item) untuk item di sel tetangga
+
+        Setiap item yang berjarak <= rings * cell_size dari titik query pasti
+        termasuk; item bisa muncul lebih dari sekali.
+        """
+        offsets = np.arange(-rings, rings + 1)
+        dx, dy = (value.ravel() for value in np.meshgrid(offsets, offsets))
+        cell = self.cell_of(xy)
+        keys = ((cell[:, 0:1] + dx) * _KEY_STRIDE + (cell[:, 1:2] + dy)).ravel()
+        start = np.searchsorted(self._keys, keys, side='left')
+        counts = np.searchsorted(self._keys, keys, side='right') - start
+        total = int(counts.sum())
+        query = np.repeat(np.arange(len(keys)) // len(dx), counts)
+        position = np.repeat(start, counts) + (np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts))
+        return query, self._items[position]
+
+
+def point_segment_distance(p, a, b):
+    """Jarak euclidean titik p ke segmen a-b (array (n, 2), meter)"""
+    ab = b - a
+    length2 = np.einsum('ij,ij->i', ab, ab)
+    t = np.einsum('ij,ij->i', p - a, ab) / np.where(length2 > 0, length2, 1.0)
+    closest = a + np.clip(t, 0.0, 1.0)[:, None] * ab
+    return np.hypot(*(p - closest).T)
+
+
+class SpatialIndex:
+    """Titik (Point) dan segmen kabel sebuah PlacemarkStore dalam meter lokal
+
+    Dibangun satu kali setelah parse; grid per ukuran sel dibuat saat
+    pertama kali dibutuhkan lalu disimpan.
+    """
+
+    def __init__(self, store, cable_types):
+        coords = store.coords
+        self._scale = local_scale(coords)
+
+        # Titik: vertex pertama setiap placemark Point
+        counts = np.diff(store.offsets)
+        is_point = (store.geometry == POINT) & (counts > 0)
+        self.point_index = np.flatnonzero(is_point)
+        self.point_xy = self.project(coords[store.offsets[self.point_index], :2])
+
+        # Segmen: pasangan vertex berurutan dalam satu LineString kabel
+        types = np.asarray(store.type, dtype=object)
+        is_cable = np.isin(types, list(cable_types)) & (store.geometry == LINESTRING) & (counts > 1)
+        self.cable_index = np.flatnonzero(is_cable)
+        owner = np.repeat(np.arange(len(store)), counts)
+        first = np.flatnonzero((owner[:-1] == owner[1:]) & is_cable[owner[:-1]]) if len(owner) > 1 else np.empty(0, np.int64)
+        self.segment_owner = owner[first]
+        self.segment_a = self.project(coords[first, :2])
+        self.segment_b = self.project(coords[first + 1, :2])
+
+        # Ujung kabel: vertex pertama dan terakhir setiap kabel
+        self.cable_ends = np.stack([store.offsets[self.cable_index], store.offsets[self.cable_index + 1] - 1], axis=1)
+        self.cable_end_xy = self.project(coords[self.cable_ends.ravel(), :2]).reshape(-1, 2, 2)
+
+        self._grids = {}
+
+    @property
+    def nbytes(self):
+        """Perkiraan ukuran array indeks (termasuk grid yang sudah dibuat)"""
+        arrays = [self.point_index, self.point_xy, self.cable_index, self.segment_owner,
+                  self.segment_a, self.segment_b, self.cable_ends, self.cable_end_xy]
+        grids = sum(grid._keys.nbytes + grid._items.nbytes for grid in self._grids.values())
+        return sum(array.nbytes for array in arrays) + grids
+
+    def project(self, lonlat):
+        """Lon/lat (derajat) ke meter lokal"""
+        return np.asarray(lonlat, dtype=np.float64) * self._scale
+
+    def _grid(self, kind, cell_size):
+        key = (kind, cell_size)
+        if key not in self._grids:
+            if kind == 'segment':
+                low = np.minimum(self.segment_a, self.segment_b)
+                high = np.maximum(self.segment_a, self.segment_b)
+                self._grids[key] = GridIndex(low, high, cell_size)
+            else:
+                self._grids[key] = GridIndex(self.point_xy, self.point_xy, cell_size)
+        return self._grids[key]
+
+    def nearest_segment(self, xy, cell_size=50.0, max_distance=None):
+        """(jarak meter, index segmen) terdekat untuk setiap titik query
+
+        Pencarian diperluas bertahap memakai grid yang makin kasar (sel
+        digandakan per level); titik tanpa segmen dalam jangkauan
+        (max_distance, atau cell_size * 4096) mendapat jarak NaN dan index -1.
+        """
+        distance = np.full(len(xy), np.inf)
+        nearest = np.full(len(xy), -1, dtype=np.int64)
+        if not len(xy) or not len(self.segment_owner):
+            return np.full(len(xy), np.nan), nearest
+
+        pending = np.arange(len(xy))
+        for level in range(_SEARCH_LEVELS):
+            grid = self._grid('segment', cell_size * (1 << level))
+            query, segment = grid.candidates(xy[pending])
+            if len(query):
+                d = point_segment_distance(xy[pending][query], self.segment_a[segment], self.segment_b[segment])
+                # Minimum per titik: urutkan (titik, jarak) lalu ambil yang pertama
+                order = np.lexsort((d, query))
+                first = order[np.r_[True, query[order][1:] != query[order][:-1]]]
+                targets = pending[query[first]]
+                better = d[first] < distance[targets]
+                distance[targets[better]] = d[first][better]
+                nearest[targets[better]] = segment[first][better]
+            reach = grid.cell_size
+            pending = pending[distance[pending] > reach]
+            if not len(pending) or (max_distance is not None and reach >= max_distance):
+                break
+
+        distance[~np.isfinite(distance)] = np.nan
+        if max_distance is not None:
+            beyond = distance > max_distance
+            distance[beyond] = np.nan
+            nearest[beyond] = -1
+        return distance, nearest
+
+    def points_within(self, xy, radius, mask=None):
+        """Pasangan (index query, index titik, jarak) dengan jarak <= radius
+
+        mask opsional membatasi titik index (boolean sepanjang point_index).
+        """
+        empty = np.empty(0, dtype=np.int64)
+        if not len(xy) or not len(self.point_index):
+            return empty, empty, np.empty(0)
+        query, point = self._grid('point', radius).candidates(xy, 1)
+        if mask is not None:
+            keep = mask[point]
+            query, point = query[keep], point[keep]
+        d = np.hypot(*(xy[query] - self.point_xy[point]).T)
+        keep = d <= radius
+        return query[keep], point[keep], d[keep]
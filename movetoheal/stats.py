@@ -0,0 +1,144 @@
+"""Statistik jaringan: panjang kabel, vertex, bounding box dan densitas titik
+
+Semua jarak dihitung sekaligus dengan rumus haversine NumPy di atas array
+koordinat PlacemarkStore (tanpa pemanggilan geopy per segmen). Selisih
+terhadap jarak geodesik WGS84 (Vincenty) di bawah 0,5%.
+"""
+import csv
+from io import StringIO
+
+import numpy as np
+
+from movetoheal.perf import span
+from movetoheal.store import GEOMETRY_CODES
+
+EARTH_RADIUS_M = 6371008.8
+LINESTRING = GEOMETRY_CODES['LineString']
+
+CABLE_TYPES = ('KU-Line',)
+DENSITY_TYPES = ('OB', 'OC', 'JC01')
+
+
+def haversine_m(lon1, lat1, lon2, lat2):
+    """Jarak haversine (meter) antar pasangan titik, bekerja pada array"""
+    lon1, lat1, lon2, lat2 = (np.radians(value) for value in (lon1, lat1, lon2, lat2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def placemark_lengths(store):
+    """Panjang (meter) setiap placemark LineString; placemark lain bernilai 0"""
+    coords = store.coords
+    if len(coords) < 2:
+        return np.zeros(len(store))
+
+    segments = haversine_m(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+    # Segmen ke-k menghubungkan vertex k dan k+1; buang yang melewati batas placemark
+    counts = np.diff(store.offsets)
+    owner = np.repeat(np.arange(len(store)), counts)
+    valid = owner[:-1] == owner[1:]
+    lengths = np.bincount(owner[:-1][valid], weights=segments[valid], minlength=len(store))
+
+    lengths[store.geometry != LINESTRING] = 0.0
+    return lengths
+
+
+def compute_network_stats(folders_data, store, cable_types=CABLE_TYPES, density_types=DENSITY_TYPES):
+    """Statistik per folder dan total jaringan
+
+    Mengembalikan (rows, total): rows adalah list dict per folder (placemark
+    langsung di folder tersebut) dan total adalah dict ringkasan seluruh file.
+    """
+    with span('network_stats', placemarks=len(store), folders=len(folders_data)):
+        return _network_stats(folders_data, store, cable_types, density_types)
+
+
+def _network_stats(folders_data, store, cable_types, density_types):
+    folder_count = len(folders_data)
+    types = np.array(store.type, dtype=object)
+    folder_id = store.folder_id.astype(np.int64)
+    counts = np.diff(store.offsets)
+
+    is_cable = np.isin(types, cable_types) & (store.geometry == LINESTRING)
+    lengths = placemark_lengths(store)
+
+    cable_length = np.bincount(folder_id[is_cable], weights=lengths[is_cable], minlength=folder_count)
+    cable_count = np.bincount(folder_id[is_cable], minlength=folder_count)
+    cable_vertices = np.bincount(folder_id[is_cable], weights=counts[is_cable], minlength=folder_count)
+    type_counts = {
+        type_name: np.bincount(folder_id[types == type_name], minlength=folder_count)
+        for type_name in density_types
+    }
+
+    # Bounding box per folder dari seluruh vertex
+    vertex_folder = np.repeat(folder_id, counts)
+    bbox_min = np.full((folder_count, 2), np.inf)
+    bbox_max = np.full((folder_count, 2), -np.inf)
+    if len(vertex_folder):
+        np.minimum.at(bbox_min, vertex_folder, store.coords[:, :2])
+        np.maximum.at(bbox_max, vertex_folder, store.coords[:, :2])
+
+    rows = []
+    for folder_data in folders_data:
+        fid = folder_data['id']
+        has_bbox = np.isfinite(bbox_min[fid, 0])
+        row = {
+            'Folder': folder_data['path'],
+            'Jumlah Kabel': int(cable_count[fid]),
+            'Panjang Kabel (m)': round(float(cable_length[fid]), 2),
+            'Vertex Kabel': int(cable_vertices[fid]),
+        }
+        for type_name in density_types:
+            row[type_name] = int(type_counts[type_name][fid])
+        row['Titik per km'] = _density(sum(row[t] for t in density_types), cable_length[fid])
+        row.update(_bbox_columns(bbox_min[fid], bbox_max[fid], has_bbox))
+        rows.append(row)
+
+    total_length = float(cable_length.sum())
+    total_points = sum(int(type_counts[t].sum()) for t in density_types)
+    has_bbox = len(store.coords) > 0
+    total = {
+        'Folder': 'TOTAL',
+        'Jumlah Kabel': int(cable_count.sum()),
+        'Panjang Kabel (m)': round(total_length, 2),
+        'Vertex Kabel': int(cable_vertices.sum()),
+    }
+    for type_name in density_types:
+        total[type_name] = int(type_counts[type_name].sum())
+    total['Titik per km'] = _density(total_points, total_length)
+    total.update(_bbox_columns(
+        np.nanmin(store.coords[:, :2], axis=0) if has_bbox else None,
+        np.nanmax(store.coords[:, :2], axis=0) if has_bbox else None,
+        has_bbox,
+    ))
+    return rows, total
+
+
+def _density(point_count, length_m):
+    if length_m <= 0:
+        return None
+    return round(point_count / (length_m / 1000.0), 3)
+
+
+def _bbox_columns(bbox_min, bbox_max, has_bbox):
+    if not has_bbox:
+        return {'Min Lon': None, 'Min Lat': None, 'Max Lon': None, 'Max Lat': None}
+    return {
+        'Min Lon': float(bbox_min[0]),
+        'Min Lat': float(bbox_min[1]),
+        'Max Lon': float(bbox_max[0]),
+        'Max Lat': float(bbox_max[1]),
+    }
+
+
+def stats_to_csv(rows, total=None):
+    """Tulis baris statistik (dan baris total) sebagai teks CSV"""
+    all_rows = list(rows) + ([total] if total else [])
+    if not all_rows:
+        return ''
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(all_rows[0].keys()))
+    writer.writeheader()
+    writer.writerows(all_rows)
+    return buffer.getvalue()
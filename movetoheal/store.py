@@ -0,0 +1,422 @@
+"""Penyimpanan placemark berbasis kolom
+
+Setiap placemark disimpan sebagai satu baris pada beberapa kolom (name,
+description, type, folder_id, geometry) dan seluruh koordinat disimpan
+dalam satu array float64 datar berbentuk (n_vertex, 3) dengan offsets per
+placemark. Koordinat di-parse satu kali saat load; altitude yang tidak ada
+disimpan sebagai NaN sehingga teks keluaran tetap sama dengan aslinya.
+
+Geometri yang terdiri dari beberapa bagian (Polygon dengan ring dalam,
+MultiGeometry, gx:Track/MultiTrack) tetap menyimpan seluruh vertex-nya
+berurutan di rentang placemark tersebut; kolom part (jenis dan offset awal
+relatif terhadap placemark) hanya dibuat bila ada geometri seperti itu.
+
+ExtendedData (Data/SimpleData) disimpan sebagai kolom atribut berisi teks
+asli (None bila placemark tidak memiliki atribut tersebut), sehingga ekspor
+menulis nilainya persis seperti input. Untuk indeks dan filter, setiap kolom
+diberi tipe sekali saat dibutuhkan: kolom yang seluruh nilainya bilangan
+bulat atau desimal menjadi array NumPy (lihat typed_column).
+"""
+import copy
+import re
+from itertools import repeat
+
+import numpy as np
+
+GEOMETRY_TYPES = ('Unknown', 'Point', 'LineString', 'Polygon', 'MultiGeometry', 'Track')
+GEOMETRY_CODES = {name: code for code, name in enumerate(GEOMETRY_TYPES)}
+
+# Jenis bagian geometri; ring Polygon dibedakan luar/dalam
+PART_TYPES = ('Point', 'LineString', 'outerBoundaryIs', 'innerBoundaryIs', 'Track')
+PART_CODES = {name: code for code, name in enumerate(PART_TYPES)}
+
+_INT_TEXT = re.compile(r'[-+]?(?:0|[1-9][0-9]*)')
+_FLOAT_TEXT = re.compile(r'[-+]?(?:(?:0|[1-9][0-9]*)(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][-+]?[0-9]+)?')
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+# Bilangan bulat terbesar yang selalu tepat di float64
+_FLOAT_EXACT_INT = 2 ** 53
+
+_EMPTY_COORDS = np.empty((0, 3), dtype=np.float64)
+
+
+def parse_coordinates(text):
+    """Parse teks <coordinates> KML menjadi array (n, 3) float64
+
+    Tuple tanpa altitude mendapat NaN pada kolom ketiga. Teks kosong atau
+    tidak valid menghasilkan array kosong.
+    """
+    if not text or not text.strip():
+        return _EMPTY_COORDS
+    if ', ' in text or ' ,' in text:
+        text = re.sub(r'\s*,\s*', ',', text)
+
+    tuples = text.split()
+    count = len(tuples)
+    commas = text.count(',')
+    try:
+        if commas == 2 * count:
+            return np.array(text.replace(',', ' ').split(), dtype=np.float64).reshape(count, 3)
+        if commas == count:
+            coords = np.full((count, 3), np.nan)
+            coords[:, :2] = np.array(text.replace(',', ' ').split(), dtype=np.float64).reshape(count, 2)
+            return coords
+        # Campuran 2D/3D: parse per tuple
+        coords = np.full((count, 3), np.nan)
+        for i, item in enumerate(tuples):
+            values = [float(value) for value in item.split(',')[:3]]
+            coords[i, :len(values)] = values
+        return coords
+    except ValueError:
+        return _EMPTY_COORDS
+
+
+def _format_values(values):
+    """Teks terpendek yang round-trip untuk setiap float ('0.0' menjadi '0')"""
+    return list(map(str.removesuffix, map(repr, values.ravel().tolist()), repeat('.0')))
+
+
+def format_coordinates(coords, precision=None, drop_zero_altitude=False):
+    """Format array koordinat (n, 3) menjadi teks <coordinates> KML
+
+    precision membulatkan ke jumlah desimal tertentu; drop_zero_altitude
+    menghilangkan altitude bila seluruh altitude placemark bernilai 0.
+    """
+    if precision is not None:
+        coords = np.round(coords, precision) + 0.0  # -0.0 menjadi 0.0
+    missing_alt = np.isnan(coords[:, 2])
+    if drop_zero_altitude and np.all(missing_alt | (coords[:, 2] == 0)):
+        missing_alt = np.ones(len(coords), dtype=bool)
+    if not missing_alt.any():
+        texts = iter(_format_values(coords))
+        return ' '.join(map(','.join, zip(texts, texts, texts)))
+    if missing_alt.all():
+        texts = iter(_format_values(coords[:, :2]))
+        return ' '.join(map(','.join, zip(texts, texts)))
+    # Campuran tuple dengan dan tanpa altitude
+    parts = []
+    for row, missing in zip(coords, missing_alt):
+        parts.append(','.join(_format_values(row[:2] if missing else row)))
+    return ' '.join(parts)
+
+
+def typed_column(values):
+    """Kolom atribut bertipe dari list teks (None: tidak ada nilai), untuk indeks
+
+    int64 bila semua nilai bilangan bulat dalam rentang int64 tanpa nilai
+    kosong, float64 (NaN untuk nilai kosong) bila semua nilai berupa angka
+    yang bisa direpresentasikan float tanpa kehilangan digit bilangan bulat
+    (|n| <= 2**53), selain itu list teks. Teks seperti '007' tetap teks agar
+    angka nol di depan tidak hilang.
+    """
+    present = [value for value in values if value is not None]
+    if not present:
+        return list(values)
+    if all(_INT_TEXT.fullmatch(value) for value in present):
+        numbers = [int(value) for value in present]
+        if len(present) == len(values) and all(_INT64_MIN <= number <= _INT64_MAX for number in numbers):
+            return np.array(numbers, dtype=np.int64)
+        if all(abs(number) <= _FLOAT_EXACT_INT for number in numbers):
+            return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+        return list(values)
+    if all(_FLOAT_TEXT.fullmatch(value) for value in present) \
+            and all(abs(int(value)) <= _FLOAT_EXACT_INT for value in present if _INT_TEXT.fullmatch(value)):
+        return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+    return list(values)
+
+
+def _number_key(text):
+    """Angka dari teks untuk mencari di kolom angka (int bila bilangan bulat); None bila bukan angka"""
+    text = str(text).strip()
+    if _INT_TEXT.fullmatch(text):
+        return int(text)
+    if _FLOAT_TEXT.fullmatch(text):
+        return float(text)
+    return None
+
+
+class PlacemarkStore:
+    """Kolom-kolom placemark hasil parsing (dibuat oleh PlacemarkStoreBuilder)"""
+
+    def __init__(self, name, description, icon_url, folder_id, geometry, coords, offsets,
+                 parts=None, attributes=None):
+        self.name = name
+        self.description = description
+        self.icon_url = icon_url
+        self.type = ['Unknown'] * len(name)
+        self.folder_id = folder_id
+        self.geometry = geometry
+        self.coords = coords
+        self.offsets = offsets
+        # (part_offsets, part_start, part_kind) atau None: satu bagian per placemark
+        self.parts = parts
+        # Nama atribut -> list teks asli
+        self.attributes = attributes or {}
+        self._attribute_columns = {}
+        self._attribute_index = {}
+
+    def __len__(self):
+        return len(self.name)
+
+    def geometry_type(self, index):
+        return GEOMETRY_TYPES[self.geometry[index]]
+
+    def coordinates(self, index):
+        """View array (n, 3) koordinat placemark (tanpa salinan)"""
+        return self.coords[self.offsets[index]:self.offsets[index + 1]]
+
+    def vertex_count(self, index):
+        return int(self.offsets[index + 1] - self.offsets[index])
+
+    def geometry_parts(self, index):
+        """List (jenis bagian, view koordinat) untuk satu placemark"""
+        coords = self.coordinates(index)
+        if self.parts is None:
+            kind = self.geometry_type(index)
+            return [(kind, coords)] if kind in PART_CODES else []
+        part_offsets, part_start, part_kind = self.parts
+        first, last = part_offsets[index], part_offsets[index + 1]
+        bounds = part_start[first:last].tolist() + [len(coords)]
+        return [(PART_TYPES[kind], coords[start:stop])
+                for kind, start, stop in zip(part_kind[first:last].tolist(), bounds[:-1], bounds[1:])]
+
+    def attribute_values(self, name):
+        """Teks asli satu atribut per placemark (None bila kosong atau atribut tidak ada)"""
+        return self.attributes.get(name) or [None] * len(self)
+
+    def attributes_at(self, index):
+        """Atribut satu placemark sebagai dict teks asli (tanpa nilai kosong)"""
+        return {name: column[index] for name, column in self.attributes.items() if column[index] is not None}
+
+    def attribute_column(self, name):
+        """Kolom atribut bertipe (lihat typed_column), dibuat sekali per atribut"""
+        if name not in self._attribute_columns:
+            self._attribute_columns[name] = typed_column(self.attribute_values(name))
+        return self._attribute_columns[name]
+
+    def attribute_index(self, name):
+        """Indeks atribut: dict kunci nilai -> array index placemark
+
+        Kunci kolom angka adalah angkanya, kunci kolom teks adalah teks tanpa
+        beda huruf besar/kecil. Dibangun sekali per atribut saat pertama
+        dibutuhkan.
+        """
+        if name not in self._attribute_index:
+            column = self.attribute_column(name)
+            numeric = isinstance(column, np.ndarray)
+            groups = {}
+            for row, value in enumerate(column.tolist() if numeric else column):
+                if value is None or value != value:
+                    continue
+                key = value if numeric else value.strip().lower()
+                groups.setdefault(key, []).append(row)
+            self._attribute_index[name] = {key: np.array(rows, dtype=np.int64) for key, rows in groups.items()}
+        return self._attribute_index[name]
+
+    def attribute_lookup(self, name, value):
+        """Index placemark yang atribut name-nya sama dengan value (tanpa beda huruf)"""
+        empty = np.empty(0, dtype=np.int64)
+        if name not in self.attributes:
+            return empty
+        if isinstance(self.attribute_column(name), np.ndarray):
+            key = _number_key(value)
+        else:
+            key = str(value).strip().lower()
+        return self.attribute_index(name).get(key, empty) if key is not None else empty
+
+    def coordinates_text(self, index, limit=None, precision=None, drop_zero_altitude=False):
+        """Teks <coordinates>; limit membatasi jumlah vertex yang diformat"""
+        coords = self.coordinates(index)
+        if limit is not None:
+            coords = coords[:limit]
+        if not len(coords):
+            return 'N/A'
+        return format_coordinates(coords, precision, drop_zero_altitude)
+
+    def folder_indices(self, folder_count):
+        """Index placemark per folder (urutan dokumen) dalam satu pengurutan"""
+        if folder_count == 0:
+            return []
+        order = np.argsort(self.folder_id, kind='stable')
+        counts = np.bincount(self.folder_id, minlength=folder_count)
+        return np.split(order.astype(np.int64), np.cumsum(counts)[:-1])
+
+    def record(self, index):
+        """Satu placemark sebagai dict (untuk tampilan, bukan untuk ekspor massal)"""
+        geometry_type = self.geometry_type(index)
+        return {
+            'name': self.name[index],
+            'description': self.description[index],
+            'type': self.type[index],
+            'geometry_type': geometry_type,
+            'original_geometry': geometry_type,
+            'coordinates': self.coordinates_text(index),
+            'icon_url': self.icon_url[index],
+            'folder_id': int(self.folder_id[index]),
+            'attributes': self.attributes_at(index),
+        }
+
+    def with_types(self, types):
+        """Salinan dangkal dengan kolom type lain (array koordinat dipakai bersama)"""
+        store = copy.copy(self)
+        store.type = types
+        return store
+
+    def with_coordinates(self, coords, offsets):
+        """Salinan dangkal dengan array koordinat lain (misal hasil penyederhanaan)"""
+        store = copy.copy(self)
+        store.coords = coords
+        store.offsets = offsets
+        return store
+
+    def subset(self, indices):
+        """Store baru berisi placemark terpilih saja, dalam urutan indices"""
+        indices = np.asarray(indices, dtype=np.int64)
+        starts, stops = self.offsets[indices], self.offsets[indices + 1]
+        counts = stops - starts
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        vertex = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+        picked = indices.tolist()
+        parts = None
+        if self.parts is not None:
+            part_offsets, part_start, part_kind = self.parts
+            part_counts = part_offsets[indices + 1] - part_offsets[indices]
+            part_rows = np.repeat(part_offsets[indices] - (np.cumsum(part_counts) - part_counts), part_counts) \
+                + np.arange(part_counts.sum())
+            parts = (np.concatenate(([0], np.cumsum(part_counts))).astype(np.int64),
+                     part_start[part_rows], part_kind[part_rows])
+        attributes = {name: [column[i] for i in picked] for name, column in self.attributes.items()}
+        store = PlacemarkStore(
+            [self.name[i] for i in picked], [self.description[i] for i in picked],
+            [self.icon_url[i] for i in picked], self.folder_id[indices], self.geometry[indices],
+            self.coords[vertex], offsets, parts, attributes,
+        )
+        store.type = [self.type[i] for i in picked]
+        return store
+
+    @property
+    def nbytes(self):
+        """Perkiraan ukuran array numerik (tanpa string)"""
+        size = self.coords.nbytes + self.offsets.nbytes + self.folder_id.nbytes + self.geometry.nbytes
+        if self.parts is not None:
+            size += sum(array.nbytes for array in self.parts)
+        return size + sum(8 * len(column) for column in self.attributes.values())
+
+
+def _full_parts(store):
+    """Kolom part store; store tanpa kolom part mendapat satu bagian per Point/LineString"""
+    if store.parts is not None:
+        return store.parts
+    kind = np.full(len(GEOMETRY_TYPES), -1, dtype=np.int8)
+    kind[GEOMETRY_CODES['Point']] = PART_CODES['Point']
+    kind[GEOMETRY_CODES['LineString']] = PART_CODES['LineString']
+    kinds = kind[store.geometry]
+    has_part = kinds >= 0
+    part_offsets = np.zeros(len(store) + 1, dtype=np.int64)
+    np.cumsum(has_part, out=part_offsets[1:])
+    return part_offsets, np.zeros(int(has_part.sum()), dtype=np.int64), kinds[has_part]
+
+
+def concat_extra_columns(stores):
+    """(parts, attributes) untuk gabungan beberapa store berurutan
+
+    Atribut dengan nama sama digabung; tipenya ditentukan ulang oleh store
+    gabungan saat dibutuhkan.
+    """
+    parts = None
+    if any(store.parts is not None for store in stores):
+        all_parts = [_full_parts(store) for store in stores]
+        counts = np.concatenate([np.diff(part_offsets) for part_offsets, _, _ in all_parts])
+        part_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=part_offsets[1:])
+        parts = (part_offsets, np.concatenate([start for _, start, _ in all_parts]),
+                 np.concatenate([kind for _, _, kind in all_parts]))
+    attributes = {}
+    for name in dict.fromkeys(name for store in stores for name in store.attributes):
+        values = []
+        for store in stores:
+            values.extend(store.attribute_values(name))
+        attributes[name] = values
+    return parts, attributes
+
+
+class PlacemarkStoreBuilder:
+    """Kumpulkan placemark satu per satu lalu bangun PlacemarkStore"""
+
+    def __init__(self):
+        self._name = []
+        self._description = []
+        self._icon_url = []
+        self._folder_id = []
+        self._geometry = []
+        self._chunks = []
+        self._counts = []
+        # Index placemark -> list (jenis bagian, jumlah vertex), hanya untuk geometri beberapa bagian
+        self._parts = {}
+        # Nama atribut -> (list baris, list nilai)
+        self._attributes = {}
+
+    def __len__(self):
+        return len(self._name)
+
+    def append(self, placemark_data, folder_id):
+        """Tambahkan hasil extract_placemark_data; mengembalikan index placemark"""
+        coords = placemark_data['coordinates']
+        self._name.append(placemark_data['name'])
+        self._description.append(placemark_data['description'])
+        self._icon_url.append(placemark_data['icon_url'])
+        self._folder_id.append(folder_id)
+        self._geometry.append(GEOMETRY_CODES[placemark_data['geometry_type']])
+        if len(coords):
+            self._chunks.append(coords)
+        self._counts.append(len(coords))
+
+        row = len(self._name) - 1
+        if placemark_data.get('parts') is not None:
+            self._parts[row] = placemark_data['parts']
+        for name, value in (placemark_data.get('attributes') or {}).items():
+            rows, values = self._attributes.setdefault(name, ([], []))
+            rows.append(row)
+            values.append(value)
+        return row
+
+    def build(self):
+        offsets = np.zeros(len(self._counts) + 1, dtype=np.int64)
+        np.cumsum(self._counts, out=offsets[1:])
+        coords = np.concatenate(self._chunks) if self._chunks else _EMPTY_COORDS.copy()
+        parts = None
+        if self._parts:
+            part_counts, part_start, part_kind = [], [], []
+            for row, code in enumerate(self._geometry):
+                row_parts = self._parts.get(row)
+                if row_parts is None:
+                    kind = GEOMETRY_TYPES[code]
+                    row_parts = [(kind, self._counts[row])] if kind in PART_CODES else []
+                start = 0
+                for kind, count in row_parts:
+                    part_kind.append(PART_CODES[kind])
+                    part_start.append(start)
+                    start += count
+                part_counts.append(len(row_parts))
+            part_offsets = np.zeros(len(part_counts) + 1, dtype=np.int64)
+            np.cumsum(part_counts, out=part_offsets[1:])
+            parts = (part_offsets, np.array(part_start, dtype=np.int64), np.array(part_kind, dtype=np.int8))
+        attributes = {}
+        for name, (rows, values) in self._attributes.items():
+            column = [None] * len(self._name)
+            for row, value in zip(rows, values):
+                column[row] = value
+            attributes[name] = column
+        store = PlacemarkStore(
+            self._name,
+            self._description,
+            self._icon_url,
+            np.array(self._folder_id, dtype=np.int32),
+            np.array(self._geometry, dtype=np.int8),
+            coords,
+            offsets,
+            parts,
+            attributes,
+        )
+        self.__init__()
+        return store
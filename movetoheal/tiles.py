@@ -0,0 +1,199 @@
+"""Ekspor KMZ bertingkat (Region/LOD) untuk jaringan sangat besar
+
+Placemark dibagi ke piramida tile quadtree menurut titik tengah bounding
+box-nya: tile yang berisi lebih dari max_per_tile placemark dibelah menjadi
+empat sampai max_depth. Setiap tile menjadi satu file KML di dalam KMZ:
+
+- tile daun berisi placemark (folder dan style sama dengan ekspor biasa)
+  dengan <Region>/<Lod> sehingga baru digambar saat cukup besar di layar
+- tile induk hanya berisi <NetworkLink> ke tile anak, dimuat onRegion
+- doc.kml kecil yang menautkan tile akar
+
+Google Earth hanya memuat tile yang terlihat pada tingkat zoom saat ini,
+sehingga dokumen jutaan placemark tetap responsif.
+"""
+import numpy as np
+
+from movetoheal.kmz import KMZ_DOC_NAME
+from movetoheal.rules import DEFAULT_RULE_SET
+from movetoheal.writer import KmlWriter, resolve_profile, used_types, write_placemark, write_shared_styles
+
+DEFAULT_MAX_PER_TILE = 2000
+DEFAULT_MAX_DEPTH = 10
+
+# Tile daun digambar bila Region-nya minimal sebesar ini (piksel)
+MIN_LOD_PIXELS = 128
+
+TILE_DIR = 'tiles'
+
+# Setengah ukuran minimum Region (derajat, ~10 m) agar tile satu titik tetap aktif
+_MIN_HALF_SIZE = 1e-4
+
+
+def placemark_bounds(store):
+    """Bounding box (west, south, east, north) per placemark; NaN bila tanpa koordinat"""
+    bounds = np.full((len(store), 4), np.nan)
+    counts = np.diff(store.offsets)
+    has_coords = counts > 0
+    if not has_coords.any():
+        return bounds
+    # Placemark tanpa vertex tidak punya baris koordinat, jadi rentang tetap bersambung
+    starts = store.offsets[:-1][has_coords]
+    lon, lat = store.coords[:, 0], store.coords[:, 1]
+    bounds[has_coords, 0] = np.minimum.reduceat(lon, starts)
+    bounds[has_coords, 1] = np.minimum.reduceat(lat, starts)
+    bounds[has_coords, 2] = np.maximum.reduceat(lon, starts)
+    bounds[has_coords, 3] = np.maximum.reduceat(lat, starts)
+    return bounds
+
+
+def _region_box(box, bounds):
+    """Region tile: gabungan kotak tile dan bbox isinya, dengan ukuran minimum"""
+    west, south = np.fmin(box[:2], bounds[:, :2].min(axis=0))
+    east, north = np.fmax(box[2:], bounds[:, 2:].max(axis=0))
+    center_x, center_y = (west + east) / 2, (south + north) / 2
+    return (float(min(west, center_x - _MIN_HALF_SIZE)), float(min(south, center_y - _MIN_HALF_SIZE)),
+            float(max(east, center_x + _MIN_HALF_SIZE)), float(max(north, center_y + _MIN_HALF_SIZE)))
+
+
+def build_tiles(store, max_per_tile=DEFAULT_MAX_PER_TILE, max_depth=DEFAULT_MAX_DEPTH):
+    """Piramida tile quadtree: list dict dengan tile akar di posisi pertama
+
+    Setiap tile berisi 'key' (t + digit kuadran), 'depth', 'region'
+    (west, south, east, north), 'placemarks' (index terurut, hanya di tile
+    daun) dan 'children' (key tile anak).
+    """
+    bounds = placemark_bounds(store)
+    members = np.flatnonzero(np.isfinite(bounds).all(axis=1))
+    if not len(members):
+        return []
+    center = (bounds[:, :2] + bounds[:, 2:]) / 2
+    root_box = np.concatenate([bounds[members, :2].min(axis=0), bounds[members, 2:].max(axis=0)])
+    max_per_tile = max(int(max_per_tile), 1)
+    tiles = []
+
+    def split(key, box, members, depth):
+        tile = {'key': key, 'depth': depth, 'region': _region_box(box, bounds[members]),
+                'placemarks': None, 'children': []}
+        tiles.append(tile)
+        # Titik tengah yang semuanya sama tidak bisa dibelah lebih lanjut
+        if len(members) <= max_per_tile or depth >= max_depth or not np.ptp(center[members], axis=0).any():
+            tile['placemarks'] = np.sort(members)
+            return
+        west, south, east, north = box
+        mid_x, mid_y = (west + east) / 2, (south + north) / 2
+        is_east = center[members, 0] >= mid_x
+        is_north = center[members, 1] >= mid_y
+        # Urutan kuadran: 0 barat laut, 1 timur laut, 2 barat daya, 3 tenggara
+        quadrant = is_east.astype(np.int64) + 2 * (~is_north)
+        for digit in range(4):
+            child = members[quadrant == digit]
+            if not len(child):
+                continue
+            child_box = np.array([
+                mid_x if digit % 2 else west,
+                south if digit >= 2 else mid_y,
+                east if digit % 2 else mid_x,
+                mid_y if digit >= 2 else north,
+            ])
+            tile['children'].append(key + str(digit))
+            split(key + str(digit), child_box, child, depth + 1)
+
+    split('t', root_box, members, 0)
+    return tiles
+
+
+def tile_filename(key):
+    """Path entry KMZ untuk satu tile"""
+    return f"{TILE_DIR}/{key}.kml"
+
+
+def write_region(writer, region, min_lod_pixels=MIN_LOD_PIXELS):
+    west, south, east, north = region
+    writer.start('Region')
+    writer.start('LatLonAltBox')
+    writer.leaf('north', repr(north))
+    writer.leaf('south', repr(south))
+    writer.leaf('east', repr(east))
+    writer.leaf('west', repr(west))
+    writer.end()
+    writer.start('Lod')
+    writer.leaf('minLodPixels', str(min_lod_pixels))
+    writer.leaf('maxLodPixels', '-1')
+    writer.end()
+    writer.end()
+
+
+def write_network_link(writer, tile, href, min_lod_pixels=MIN_LOD_PIXELS):
+    """NetworkLink ke tile yang dimuat saat Region-nya aktif"""
+    writer.start('NetworkLink')
+    writer.leaf('name', tile['key'])
+    write_region(writer, tile['region'], min_lod_pixels)
+    writer.start('Link')
+    writer.leaf('href', href)
+    writer.leaf('viewRefreshMode', 'onRegion')
+    writer.end()
+    writer.end()
+
+
+def write_tile_kml(sink, tile, tiles_by_key, folders_data, store, rule_set=None, profile=None,
+                   min_lod_pixels=MIN_LOD_PIXELS):
+    """Tulis satu tile: placemark per folder (daun) atau NetworkLink ke anak"""
+    rule_set = rule_set or DEFAULT_RULE_SET
+    profile = resolve_profile(profile)
+    writer = KmlWriter(sink, profile['indent'])
+    writer.start_kml()
+    writer.leaf('name', tile['key'])
+    # Tile akar selalu aktif, sama dengan NetworkLink di doc.kml
+    write_region(writer, tile['region'], min_lod_pixels if tile['depth'] else 0)
+
+    placemarks = tile['placemarks']
+    if placemarks is not None:
+        if profile['shared_styles']:
+            write_shared_styles(writer, rule_set, used_types(store, placemarks.tolist()))
+        # Kelompokkan per folder dengan urutan folder asli
+        folder_id = store.folder_id[placemarks]
+        order = np.lexsort((placemarks, folder_id))
+        placemarks, folder_id = placemarks[order], folder_id[order]
+        breaks = np.flatnonzero(np.diff(folder_id)) + 1
+        for group in np.split(placemarks, breaks):
+            folder_data = folders_data[store.folder_id[group[0]]]
+            writer.start('Folder')
+            writer.leaf('name', folder_data['path'])
+            for index in group.tolist():
+                write_placemark(writer, store, index, rule_set, profile, 'Folder', folder_data['path'], ' ' * 12)
+            writer.end()
+
+    for child_key in tile['children']:
+        # Relatif terhadap tile ini (semua tile berada di direktori yang sama)
+        write_network_link(writer, tiles_by_key[child_key], f"{child_key}.kml", min_lod_pixels)
+    writer.end_kml()
+
+
+def write_root_kml(sink, tiles, store, profile=None):
+    """doc.kml: ringkasan dan NetworkLink ke tile akar (selalu dimuat)
+
+    Placemark tanpa koordinat tidak masuk tile mana pun.
+    """
+    profile = resolve_profile(profile)
+    writer = KmlWriter(sink, profile['indent'])
+    writer.start_kml()
+    writer.leaf('name', 'KML Enhanced (Bertingkat)')
+    leaves = [tile for tile in tiles if tile['placemarks'] is not None]
+    placed = sum(len(tile['placemarks']) for tile in leaves)
+    writer.leaf('description', f"{placed} dari {len(store)} placemark dalam {len(leaves)} tile")
+    if tiles:
+        write_network_link(writer, tiles[0], tile_filename(tiles[0]['key']), min_lod_pixels=0)
+    writer.end_kml()
+
+
+def tiled_kmz_entries(folders_data, store, rule_set=None, profile=None, max_per_tile=DEFAULT_MAX_PER_TILE,
+                      max_depth=DEFAULT_MAX_DEPTH, min_lod_pixels=MIN_LOD_PIXELS):
+    """Entry (nama, write_kml) untuk kmz.write_kmz_entries: doc.kml lalu setiap tile"""
+    tiles = build_tiles(store, max_per_tile, max_depth)
+    tiles_by_key = {tile['key']: tile for tile in tiles}
+    entries = [(KMZ_DOC_NAME, lambda sink: write_root_kml(sink, tiles, store, profile))]
+    for tile in tiles:
+        entries.append((tile_filename(tile['key']), lambda sink, tile=tile: write_tile_kml(
+            sink, tile, tiles_by_key, folders_data, store, rule_set, profile, min_lod_pixels)))
+    return entries
@@ -0,0 +1,209 @@
+"""Validasi topologi jaringan di atas SpatialIndex
+
+Laporan berisi:
+- jarak setiap titik (OB/OC/JC01/OP01) ke kabel terdekat, dan titik yang
+  lebih jauh dari max_cable_distance
+- ujung kabel menggantung: ujung KU-Line yang tidak berada dalam
+  snap_distance dari titik JC01/OB
+- titik bertumpuk: titik yang berjarak <= stack_distance dari titik lain
+  (duplikat bila namanya juga sama)
+
+Pelanggar bisa diekspor sebagai folder KML terpisah.
+"""
+from collections import Counter
+
+import numpy as np
+
+from movetoheal.perf import span
+from movetoheal.rules import DEFAULT_RULE_SET
+from movetoheal.spatial import SpatialIndex
+from movetoheal.store import format_coordinates
+from movetoheal.writer import KmlWriter, resolve_profile, write_style
+
+DEFAULT_OPTIONS = {
+    'max_cable_distance': 50.0,
+    'snap_distance': 5.0,
+    'stack_distance': 0.5,
+    'point_types': ('OB', 'OC', 'JC01', 'OP01'),
+    'node_types': ('JC01', 'OB'),
+}
+
+OFFENDER_STYLES = {
+    'far': {'icon_url': 'http://maps.google.com/mapfiles/kml/paddle/orange-circle.png'},
+    'dangling': {'icon_url': 'http://maps.google.com/mapfiles/kml/paddle/red-stars.png'},
+    'stacked': {'icon_url': 'http://maps.google.com/mapfiles/kml/paddle/purple-square.png'},
+}
+
+OFFENDER_FOLDERS = {
+    'far': 'Titik Jauh dari Kabel',
+    'dangling': 'Ujung Kabel Menggantung',
+    'stacked': 'Titik Bertumpuk',
+}
+
+
+def build_spatial_index(store, rule_set=None):
+    """SpatialIndex dengan tipe kabel dari rule set (style garis)"""
+    rule_set = rule_set or DEFAULT_RULE_SET
+    with span('spatial_index', placemarks=len(store)) as record:
+        index = SpatialIndex(store, rule_set.line_types())
+        record.set(points=len(index.point_index), segments=len(index.segment_owner))
+    return index
+
+
+def resolve_options(**options):
+    resolved = dict(DEFAULT_OPTIONS)
+    resolved.update({key: value for key, value in options.items() if value is not None})
+    return resolved
+
+
+def validate_network(folders_data, store, index, **options):
+    """Laporan validasi: dict berisi list baris per kategori dan ringkasan"""
+    options = resolve_options(**options)
+    with span('validate_network', placemarks=len(store)) as record:
+        report = {
+            'options': options,
+            'points': _cable_distances(folders_data, store, index, options),
+            'dangling': _dangling_ends(folders_data, store, index, options),
+            'stacked': _stacked_points(folders_data, store, index, options),
+        }
+        report['far'] = [row for row in report['points'] if row['Jauh']]
+        report['summary'] = {
+            'Titik Diperiksa': len(report['points']),
+            'Titik Jauh dari Kabel': len(report['far']),
+            'Ujung Kabel Menggantung': len(report['dangling']),
+            'Titik Bertumpuk': len(report['stacked']),
+        }
+        record.set(**{key.replace(' ', '_').lower(): value for key, value in report['summary'].items()})
+    return report
+
+
+def _point_mask(store, index, type_names):
+    types = np.asarray(store.type, dtype=object)
+    return np.isin(types[index.point_index], list(type_names)) if len(index.point_index) else np.zeros(0, bool)
+
+
+def _base_row(folders_data, store, placemark):
+    return {
+        'index': int(placemark),
+        'Folder': folders_data[store.folder_id[placemark]]['path'],
+        'Nama': store.name[placemark],
+        'Tipe': store.type[placemark],
+    }
+
+
+def _cable_distances(folders_data, store, index, options):
+    selected = np.flatnonzero(_point_mask(store, index, options['point_types']))
+    distance, segment = index.nearest_segment(index.point_xy[selected], cell_size=options['max_cable_distance'])
+    rows = []
+    for position, d, s in zip(selected.tolist(), distance.tolist(), segment.tolist()):
+        placemark = index.point_index[position]
+        row = _base_row(folders_data, store, placemark)
+        found = s >= 0
+        row['Jarak ke Kabel (m)'] = round(d, 2) if found else None
+        row['Kabel Terdekat'] = store.name[index.segment_owner[s]] if found else None
+        row['Jauh'] = not found or d > options['max_cable_distance']
+        row['coords'] = store.coordinates(placemark)[:1]
+        rows.append(row)
+    return rows
+
+
+def _dangling_ends(folders_data, store, index, options):
+    if not len(index.cable_index):
+        return []
+    ends = index.cable_end_xy.reshape(-1, 2)
+    node_mask = _point_mask(store, index, options['node_types'])
+    query, _, _ = index.points_within(ends, options['snap_distance'], node_mask)
+    snapped = np.zeros(len(ends), dtype=bool)
+    snapped[query] = True
+
+    rows = []
+    for end in np.flatnonzero(~snapped).tolist():
+        cable, side = divmod(end, 2)
+        placemark = index.cable_index[cable]
+        row = _base_row(folders_data, store, placemark)
+        row['Ujung'] = 'akhir' if side else 'awal'
+        vertex = index.cable_ends[cable, side]
+        row['coords'] = store.coords[vertex:vertex + 1]
+        row['Lon'], row['Lat'] = store.coords[vertex, :2].tolist()
+        rows.append(row)
+    return rows
+
+
+def _stacked_points(folders_data, store, index, options):
+    query, point, _ = index.points_within(index.point_xy, options['stack_distance'])
+    pairs = query < point
+    query, point = query[pairs], point[pairs]
+    if not len(query):
+        return []
+
+    # Kelompokkan titik bertumpuk: label = index terkecil dalam komponen
+    labels = np.arange(len(index.point_index))
+    while True:
+        previous = labels.copy()
+        low = np.minimum(labels[query], labels[point])
+        np.minimum.at(labels, query, low)
+        np.minimum.at(labels, point, low)
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            break
+
+    members = np.unique(np.concatenate([query, point]))
+    group_size = np.bincount(labels[members], minlength=len(labels))
+    name_count = Counter((labels[position], store.name[index.point_index[position]]) for position in members.tolist())
+    rows = []
+    for position in members.tolist():
+        placemark = index.point_index[position]
+        group = labels[position]
+        row = _base_row(folders_data, store, placemark)
+        row['Grup'] = int(index.point_index[group])
+        row['Jumlah di Grup'] = int(group_size[group])
+        row['Duplikat Nama'] = name_count[(group, store.name[placemark])] > 1
+        row['coords'] = store.coordinates(placemark)[:1]
+        rows.append(row)
+    return rows
+
+
+def report_rows(rows):
+    """Baris laporan untuk tabel/CSV (tanpa kolom internal)"""
+    return [{key: value for key, value in row.items() if key not in ('index', 'coords', 'Jauh')} for row in rows]
+
+
+def _offender_description(kind, row, options):
+    if kind == 'far':
+        distance = row['Jarak ke Kabel (m)']
+        found = f"{distance} m ke {row['Kabel Terdekat'] or ''}" if distance is not None else "tidak ada kabel dalam jangkauan"
+        return f"{row['Tipe']} lebih dari {options['max_cable_distance']} m dari kabel: {found}\nFolder: {row['Folder']}"
+    if kind == 'dangling':
+        return (f"Ujung {row['Ujung']} kabel {row['Nama'] or ''} tidak berada dalam "
+                f"{options['snap_distance']} m dari {'/'.join(options['node_types'])}\nFolder: {row['Folder']}")
+    return f"Bertumpuk dengan {row['Jumlah di Grup'] - 1} titik lain (grup {row['Grup']})\nFolder: {row['Folder']}"
+
+
+def write_validation_kml(sink, report, profile=None):
+    """Tulis pelanggar sebagai folder 'Validasi' berisi subfolder per kategori"""
+    profile = resolve_profile(profile)
+    writer = KmlWriter(sink, profile['indent'])
+    writer.start_kml()
+    for kind, style_config in OFFENDER_STYLES.items():
+        write_style(writer, {'icon_url': style_config['icon_url'], 'line_color': None}, f"validasi-{kind}")
+
+    writer.start('Folder')
+    writer.leaf('name', 'Validasi')
+    for kind, folder_name in OFFENDER_FOLDERS.items():
+        rows = report[kind]
+        writer.start('Folder')
+        writer.leaf('name', folder_name)
+        writer.leaf('description', f"{len(rows)} item")
+        for row in rows:
+            writer.start('Placemark')
+            # <name/> kosong tersimpan sebagai None
+            writer.leaf('name', (row['Nama'] or '') + (f" ({row['Ujung']})" if kind == 'dangling' else ''))
+            writer.leaf('description', _offender_description(kind, row, report['options']))
+            writer.leaf('styleUrl', f"#validasi-{kind}")
+            writer.start('Point')
+            writer.leaf('coordinates', format_coordinates(
+                row['coords'], profile['precision'], drop_zero_altitude=profile['drop_zero_altitude']))
+            writer.end()
+            writer.end()
+        writer.end()
+    writer.end_kml()
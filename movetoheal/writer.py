@@ -0,0 +1,348 @@
+"""Serializer KML streaming
+
+KML ditulis bertahap ke sink (file-like teks atau biner) saat folder dan
+placemark dikunjungi, tanpa membangun ElementTree atau pretty-print minidom.
+Indentasi opsional meniru keluaran toprettyxml(indent="  ") sebelumnya.
+
+Profil ekspor mengatur bentuk keluaran: 'standar' sama dengan keluaran
+lama, 'compact' memakai satu <Style id> bersama per tipe di level Document
+(dirujuk lewat <styleUrl>), presisi koordinat terbatas, tanpa altitude nol
+dan description minimal. simplify_tolerance (meter) tidak dipakai oleh
+writer; pemanggil menyederhanakan store lebih dulu (movetoheal.simplify).
+"""
+import io
+import re
+from xml.sax.saxutils import escape
+
+from movetoheal.rules import DEFAULT_RULE_SET
+from movetoheal.store import format_coordinates
+
+KML_NAMESPACE = 'http://www.opengis.net/kml/2.2'
+
+# Jumlah vertex yang diformat untuk preview koordinat di description
+PREVIEW_VERTICES = 4
+
+DESCRIPTION_MODES = ('full', 'minimal', 'none')
+
+EXPORT_PROFILES = {
+    'standar': {
+        'indent': '  ',
+        'shared_styles': False,
+        'precision': None,
+        'drop_zero_altitude': False,
+        'description': 'full',
+        'simplify_tolerance': None,
+    },
+    'compact': {
+        'indent': '',
+        'shared_styles': True,
+        'precision': 6,
+        'drop_zero_altitude': True,
+        'description': 'minimal',
+        'simplify_tolerance': None,
+    },
+}
+
+_FLUSH_SIZE = 1 << 16
+_ESCAPES = {'"': '&quot;'}
+
+
+class KmlWriter:
+    """Penulis elemen XML bertahap dengan indentasi murah"""
+
+    def __init__(self, sink, indent='  '):
+        self._sink = sink
+        self._binary = not isinstance(sink, io.TextIOBase)
+        self._indent = indent or ''
+        self._newline = '\n' if indent else ''
+        self._depth = 0
+        self._stack = []
+        self._pending = []
+        self._pending_size = 0
+
+    def _write(self, text):
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= _FLUSH_SIZE:
+            self.flush()
+
+    def _line(self, text):
+        self._write(f"{self._indent * self._depth}{text}{self._newline}")
+
+    def flush(self):
+        if self._pending:
+            data = ''.join(self._pending)
+            self._sink.write(data.encode('utf-8') if self._binary else data)
+            self._pending = []
+            self._pending_size = 0
+
+    def start(self, tag, attrs=None):
+        attr_text = ''.join(f' {key}="{escape(value, _ESCAPES)}"' for key, value in (attrs or {}).items())
+        self._line(f"<{tag}{attr_text}>")
+        self._stack.append(tag)
+        self._depth += 1
+
+    def end(self):
+        tag = self._stack.pop()
+        self._depth -= 1
+        self._line(f"</{tag}>")
+
+    def leaf(self, tag, text):
+        """Elemen berisi teks saja; teks None ditulis sebagai elemen kosong"""
+        if text is None:
+            self._line(f"<{tag}/>")
+        else:
+            self._line(f"<{tag}>{escape(str(text), _ESCAPES)}</{tag}>")
+
+    def start_kml(self):
+        self._write(f'<?xml version="1.0" encoding="UTF-8"?>{self._newline or chr(10)}')
+        self.start('kml', {'xmlns': KML_NAMESPACE})
+        self.start('Document')
+
+    def end_kml(self):
+        while self._stack:
+            self.end()
+        self.flush()
+
+
+def resolve_profile(profile=None):
+    """Profil ekspor lengkap dari nama profil, dict parsial atau None"""
+    if profile is None:
+        return dict(EXPORT_PROFILES['standar'])
+    if isinstance(profile, str):
+        return dict(EXPORT_PROFILES[profile])
+    resolved = dict(EXPORT_PROFILES['standar'])
+    resolved.update(profile)
+    if resolved['description'] not in DESCRIPTION_MODES:
+        raise ValueError(f"Mode description tidak dikenal: {resolved['description']}")
+    return resolved
+
+
+def style_id(type_name):
+    """Id <Style> bersama untuk satu tipe"""
+    return 'style-' + re.sub(r'[^\w-]', '_', type_name)
+
+
+def write_shared_styles(writer, rule_set, type_names):
+    """Tulis satu <Style id> per tipe di level Document"""
+    for type_name in type_names:
+        write_style(writer, rule_set.style_for(type_name), style_id(type_name))
+
+
+def write_style(writer, style_config, element_id=None):
+    """Tulis <Style>: LineStyle untuk tipe garis, IconStyle untuk titik"""
+    writer.start('Style', {'id': element_id} if element_id else None)
+    if style_config['line_color']:
+        # Style untuk LineString (KU: hijau width 3), icon disembunyikan
+        writer.start('LineStyle')
+        writer.leaf('color', style_config['line_color'])
+        writer.leaf('width', style_config['line_width'])
+        writer.end()
+        writer.start('IconStyle')
+        writer.leaf('scale', '0')
+        writer.end()
+    else:
+        writer.start('IconStyle')
+        writer.start('Icon')
+        writer.leaf('href', style_config['icon_url'])
+        writer.end()
+        writer.end()
+    writer.end()
+
+
+def used_types(store, indices=None):
+    """Tipe yang benar-benar dipakai, dalam urutan kemunculan pertama"""
+    types = store.type if indices is None else (store.type[index] for index in indices)
+    return list(dict.fromkeys(types))
+
+
+def placemark_description(store, index, type_name, style_config, folder_label, folder_path, pad):
+    """Teks description placemark (isi sama dengan versi ElementTree sebelumnya)"""
+    return f"""
+{pad}<![CDATA[
+{pad}<h3>Informasi Titik</h3>
+{pad}<b>Nama:</b> {store.name[index]}<br/>
+{pad}<b>Tipe Teridentifikasi:</b> {type_name}<br/>
+{pad}<b>Geometri Asli:</b> {store.geometry_type(index)}<br/>
+{pad}<b>{folder_label}:</b> {folder_path}<br/>
+{pad}<b>Koordinat:</b> {store.coordinates_text(index, limit=PREVIEW_VERTICES)[:100]}...<br/>
+{pad}<b>Deskripsi Asli:</b> {store.description[index]}<br/>
+{pad}<b>Style Applied:</b> {style_config['icon_url'] or 'LineString Hijau'}<br/>
+{pad}]]>
+{pad}"""
+
+
+def minimal_description(store, index, type_name):
+    """Description singkat: tipe dan deskripsi asli (bila ada)"""
+    original = store.description[index]
+    return f"Tipe: {type_name}\n{original}" if original else f"Tipe: {type_name}"
+
+
+def write_placemark(writer, store, index, rule_set, profile, folder_label, folder_path, pad):
+    """Tulis satu Placemark dengan style dan geometri sesuai tipe"""
+    type_name = store.type[index]
+    geometry_type = store.geometry_type(index)
+    style_config = rule_set.style_for(type_name)
+    is_line = bool(style_config['line_color'])
+
+    writer.start('Placemark')
+    writer.leaf('name', store.name[index])
+    if profile['description'] == 'full':
+        writer.leaf('description', placemark_description(
+            store, index, type_name, style_config, folder_label, folder_path, pad))
+    elif profile['description'] == 'minimal':
+        writer.leaf('description', minimal_description(store, index, type_name))
+    elif store.description[index]:
+        writer.leaf('description', store.description[index])
+
+    # Style berdasarkan tipe (bersama di level Document atau inline)
+    if profile['shared_styles']:
+        writer.leaf('styleUrl', '#' + style_id(type_name))
+    else:
+        write_style(writer, style_config)
+
+    if store.attributes:
+        write_extended_data(writer, store.attributes_at(index))
+
+    # Geometry - gunakan geometri asli
+    if is_line and geometry_type in ('Point', 'Unknown'):
+        # Jika aslinya Point, buat LineString pendek dari koordinat tersebut
+        line_coords = None
+        coords = store.coordinates(index)
+        if len(coords):
+            lon, lat = coords[0, :2].tolist()
+            line_coords = f"{lon},{lat},0 {lon+0.001},{lat+0.001},0"
+        writer.start('LineString')
+        writer.leaf('coordinates', line_coords)
+        writer.end()
+    elif geometry_type in ('Polygon', 'MultiGeometry', 'Track'):
+        write_geometry_parts(writer, geometry_type, store.geometry_parts(index), profile)
+    else:
+        writer.start('LineString' if geometry_type == 'LineString' else 'Point')
+        writer.leaf('coordinates', store.coordinates_text(
+            index, precision=profile['precision'], drop_zero_altitude=profile['drop_zero_altitude']))
+        writer.end()
+
+    writer.end()
+
+
+def write_extended_data(writer, attributes):
+    """Tulis atribut placemark (teks asli) sebagai <ExtendedData>/<Data>"""
+    if not attributes:
+        return
+    writer.start('ExtendedData')
+    for name, value in attributes.items():
+        writer.start('Data', {'name': name})
+        writer.leaf('value', value)
+        writer.end()
+    writer.end()
+
+
+def write_geometry_parts(writer, geometry_type, parts, profile):
+    """Tulis geometri beberapa bagian (Polygon, MultiGeometry, gx:Track)
+
+    gx:Track ditulis sebagai LineString (timestamp tidak disimpan) sehingga
+    tidak perlu namespace gx. Ring dalam masuk ke Polygon terakhir.
+    """
+    multi = len(parts) > 1 and geometry_type != 'Polygon'
+    if multi:
+        writer.start('MultiGeometry')
+    polygon_open = False
+    for kind, coords in parts:
+        text = format_coordinates(coords, profile['precision'], profile['drop_zero_altitude'])
+        if kind == 'innerBoundaryIs' and polygon_open:
+            writer.start('innerBoundaryIs')
+        else:
+            if polygon_open:
+                writer.end()
+                polygon_open = False
+            if kind in ('outerBoundaryIs', 'innerBoundaryIs'):
+                writer.start('Polygon')
+                polygon_open = True
+                writer.start('outerBoundaryIs')
+            else:
+                writer.start('Point' if kind == 'Point' else 'LineString')
+                writer.leaf('coordinates', text)
+                writer.end()
+                continue
+        writer.start('LinearRing')
+        writer.leaf('coordinates', text)
+        writer.end()
+        writer.end()
+    if polygon_open:
+        writer.end()
+    if multi:
+        writer.end()
+
+
+def write_enhanced_kml(sink, folders_data, store, rule_set=None, profile=None):
+    """Tulis KML utuh dengan struktur folder asli (termasuk subfolder) ke sink"""
+    rule_set = rule_set or DEFAULT_RULE_SET
+    profile = resolve_profile(profile)
+    writer = KmlWriter(sink, profile['indent'])
+    writer.start_kml()
+    if profile['shared_styles']:
+        write_shared_styles(writer, rule_set, used_types(store))
+
+    def write_folder(folder_data):
+        writer.start('Folder')
+        writer.leaf('name', folder_data['name'])
+        writer.leaf('description', f"Folder: {folder_data['name']} - {len(folder_data['placemarks'])} items")
+        for index in folder_data['placemarks']:
+            write_placemark(writer, store, index, rule_set, profile, 'Folder', folder_data['path'], ' ' * 12)
+        for child_id in folder_data['children']:
+            write_folder(folders_data[child_id])
+        writer.end()
+
+    for folder_data in folders_data:
+        if folder_data['parent_id'] is None:
+            write_folder(folder_data)
+
+    writer.end_kml()
+
+
+def write_single_folder_kml(sink, folder_data, store, rule_set=None, profile=None):
+    """Tulis KML untuk satu folder saja (placemark langsung di folder tersebut)"""
+    rule_set = rule_set or DEFAULT_RULE_SET
+    profile = resolve_profile(profile)
+    writer = KmlWriter(sink, profile['indent'])
+    writer.start_kml()
+    writer.leaf('name', folder_data['name'])
+    writer.leaf('description', f"KML untuk folder: {folder_data['name']} - {len(folder_data['placemarks'])} items")
+    if profile['shared_styles']:
+        write_shared_styles(writer, rule_set, used_types(store, folder_data['placemarks']))
+    for index in folder_data['placemarks']:
+        write_placemark(writer, store, index, rule_set, profile, 'Folder Asli', folder_data['path'], ' ' * 8)
+    writer.end_kml()
+
+
+class _PreviewComplete(Exception):
+    pass
+
+
+class _PreviewSink(io.StringIO):
+    """Sink teks yang menghentikan penulisan setelah limit karakter"""
+
+    def __init__(self, limit):
+        super().__init__()
+        self._limit = limit
+
+    def write(self, text):
+        written = super().write(text)
+        if self.tell() >= self._limit:
+            raise _PreviewComplete()
+        return written
+
+
+def kml_preview(write_kml, limit=1000):
+    """Awal dokumen KML tanpa merender seluruh dokumen
+
+    write_kml(sink) menulis KML ke sink; penulisan dihentikan setelah sekitar
+    limit karakter (dibulatkan ke atas oleh buffer KmlWriter).
+    """
+    sink = _PreviewSink(limit)
+    try:
+        write_kml(sink)
+    except _PreviewComplete:
+        pass
+    return sink.getvalue()
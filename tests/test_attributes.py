@@ -0,0 +1,49 @@
+"""Atribut ExtendedData: teks asli untuk ekspor, kolom bertipe untuk indeks"""
+import io
+
+import numpy as np
+
+from movetoheal.parser import parse_kml
+from movetoheal.store import typed_column
+from movetoheal.writer import write_enhanced_kml
+
+ATTRIBUTE_KML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document><Folder><name>F</name>
+<Placemark><name>a</name><ExtendedData>
+<Data name="asset"><value>12345678901234567890</value></Data>
+<Data name="serial"><value>12345678901234567</value></Data>
+<Data name="ratio"><value>2.10</value></Data>
+<Data name="cores"><value>1.0</value></Data>
+</ExtendedData><Point><coordinates>106.1,-6.1</coordinates></Point></Placemark>
+<Placemark><name>b</name><ExtendedData>
+<Data name="asset"><value>1</value></Data>
+<Data name="ratio"><value>3</value></Data>
+<Data name="cores"><value>2</value></Data>
+</ExtendedData><Point><coordinates>106.2,-6.2</coordinates></Point></Placemark>
+</Folder></Document></kml>
+"""
+
+
+def test_typed_column_ranges():
+    assert typed_column(['12345678901234567890', '1']) == ['12345678901234567890', '1']
+    assert typed_column(['12345678901234567', None]) == ['12345678901234567', None]
+    assert typed_column(['007', '8']) == ['007', '8']
+    assert typed_column(['12345678901234567', '5']).dtype == np.int64
+    assert typed_column(['2.10', None]).dtype == np.float64
+
+
+def test_export_keeps_original_attribute_text():
+    folders_data, store = parse_kml(io.BytesIO(ATTRIBUTE_KML))
+    sink = io.StringIO()
+    write_enhanced_kml(sink, folders_data, store)
+    for text in ('12345678901234567890', '12345678901234567', '2.10', '1.0'):
+        assert f"<value>{text}</value>" in sink.getvalue()
+
+
+def test_attribute_lookup():
+    _, store = parse_kml(io.BytesIO(ATTRIBUTE_KML))
+    assert store.attribute_lookup('asset', '12345678901234567890').tolist() == [0]
+    assert store.attribute_lookup('serial', '12345678901234567').tolist() == [0]
+    assert store.attribute_lookup('ratio', '2.1').tolist() == [0]
+    assert store.attribute_lookup('cores', '2').tolist() == [1]
+    assert store.attribute_lookup('cores', 'x').tolist() == []
@@ -0,0 +1,25 @@
+"""Path keluaran CLI batch tidak boleh saling menimpa"""
+import os
+
+from movetoheal.cli import find_inputs
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write('<kml/>')
+
+
+def test_glob_keeps_subdirectories(tmp_path):
+    _touch(str(tmp_path / 'arsip' / 'a' / 'x.kmz'))
+    _touch(str(tmp_path / 'arsip' / 'b' / 'x.kmz'))
+    inputs = find_inputs([str(tmp_path / 'arsip' / '**' / '*.kmz')])
+    assert [relative for _, relative in inputs] == [os.path.join('a', 'x.kmz'), os.path.join('b', 'x.kmz')]
+
+
+def test_colliding_outputs_are_renamed(tmp_path):
+    _touch(str(tmp_path / 'd1' / 'x.kml'))
+    _touch(str(tmp_path / 'd2' / 'x.kml'))
+    _touch(str(tmp_path / 'd2' / 'x.kmz'))
+    relatives = [relative for _, relative in find_inputs([str(tmp_path / 'd1'), str(tmp_path / 'd2')])]
+    assert relatives == ['x.kml', 'x (2).kml', 'x (3).kmz']
@@ -0,0 +1,36 @@
+"""Regresi diff/merge untuk placemark dengan <name/> dan <description/> kosong"""
+from io import BytesIO
+
+from movetoheal.diff import diff_revisions, folder_signatures, placemark_hashes
+from movetoheal.merge import merge_parsed
+from movetoheal.parser import parse_kml
+
+EMPTY_TEXT_KML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document><Folder><name>F</name>
+<Placemark><name/><description></description><Point><coordinates>106.1,-6.1</coordinates></Point></Placemark>
+<Placemark><name>ODP-1</name><description/><Point><coordinates>106.2,-6.2</coordinates></Point></Placemark>
+</Folder></Document></kml>
+"""
+
+
+def _parse():
+    return parse_kml(BytesIO(EMPTY_TEXT_KML))
+
+
+def test_hashes_with_empty_name_and_description():
+    folders_data, store = _parse()
+    assert store.name[0] is None and store.description[1] is None
+    geometry_hashes, content_hashes = placemark_hashes(store)
+    assert len(set(geometry_hashes)) == 2 and len(set(content_hashes)) == 2
+    assert len(folder_signatures(folders_data, store)) == len(folders_data)
+
+
+def test_diff_and_merge_with_empty_name_and_description():
+    old_folders, old_store = _parse()
+    new_folders, new_store = _parse()
+    report = diff_revisions(old_folders, old_store, new_folders, new_store)
+    assert report['rows'] == [] and report['summary']['Tidak Berubah'] == 2
+
+    _, store, rows = merge_parsed([('a', old_folders, old_store), ('b', new_folders, new_store)])
+    assert len(store) == 2
+    assert [row['Duplikat Dibuang'] for row in rows] == [0, 2]
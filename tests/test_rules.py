@@ -0,0 +1,99 @@
+"""RuleSet.classify harus sama dengan rantai if/elif identify_type lama"""
+from io import BytesIO
+
+import pytest
+
+from movetoheal.parser import parse_kml
+from movetoheal.rules import DEFAULT_RULE_SET, DEFAULT_RULES, RuleSet
+
+
+def identify_type(name, description):
+    """Rantai if/elif sebelum rule engine (referensi)"""
+    name_str = str(name).upper()
+    desc_str = str(description).upper()
+
+    if 'JC01' in name_str:
+        return 'JC01'
+    elif 'OP01' in name_str:
+        return 'OP01'
+    elif '-OB' in name_str:
+        return 'OB'
+    elif '-OC' in name_str:
+        return 'OC'
+    elif 'OTB-4X1-BIG-BAY' in desc_str:
+        return 'OTB-4x1-Big-Bay'
+    elif '-KU' in name_str:
+        return 'KU-Line'
+    else:
+        return 'Unknown'
+
+
+CASES = [
+    ('JC01', ''),
+    ('jc01-titik', ''),
+    ('OP01-12', None),
+    ('P0001-OB', 'catatan'),
+    ('P0001-ob', ''),
+    ('P0001-Oc', ''),
+    ('ODP-1', 'spec_id: OTB-4x1-Big-Bay'),
+    ('ODP-1', 'SPEC_ID: otb-4X1-big-BAY'),
+    ('K1-KU', ''),
+    ('k1-ku', None),
+    # Cocok dengan beberapa aturan: priority terkecil menang
+    ('JC01-OB', ''),
+    ('OP01-JC01', ''),
+    ('P-OC-OB', ''),
+    ('P-KU-OB', ''),
+    ('K1-KU', 'OTB-4x1-Big-Bay'),
+    ('OP01-KU', 'OTB-4x1-Big-Bay'),
+    ('TITIK', ''),
+    ('', None),
+    (None, None),
+    ('OB', 'JC01'),
+]
+
+
+@pytest.mark.parametrize('name, description', CASES)
+def test_classify_matches_if_chain(name, description):
+    assert DEFAULT_RULE_SET.classify_one(name, description) == identify_type(name, description)
+
+
+def test_classify_batch_matches_if_chain():
+    names = [name for name, _ in CASES]
+    descriptions = [description for _, description in CASES]
+    assert DEFAULT_RULE_SET.classify({'name': names, 'description': descriptions}) == \
+        [identify_type(name, description) for name, description in CASES]
+
+
+def _spec_rule_set():
+    """Aturan bawaan dengan tipe berbeda untuk aturan description (priority sama dengan spec_id)"""
+    rules = [dict(rule) for rule in DEFAULT_RULES]
+    for rule in rules:
+        if rule['field'] == 'description':
+            rule['type'] = 'OTB-Deskripsi'
+    return RuleSet(rules)
+
+
+SPEC_KML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document><Folder><name>F</name>
+<Placemark><name>ODP-1</name><description>spec_id: OTB-4x1-Big-Bay</description>
+<ExtendedData><SchemaData><SimpleData name="spec_id">otb-4x1-big-bay</SimpleData></SchemaData></ExtendedData>
+<Point><coordinates>106.1,-6.1</coordinates></Point></Placemark>
+<Placemark><name>ODP-2</name><description>spec_id: OTB-4x1-Big-Bay</description>
+<Point><coordinates>106.2,-6.2</coordinates></Point></Placemark>
+<Placemark><name>ODP-3</name>
+<ExtendedData><Data name="spec_id"><value>OTB-4x1-Big-Bay-2</value></Data></ExtendedData>
+<Point><coordinates>106.3,-6.3</coordinates></Point></Placemark>
+</Folder></Document></kml>
+"""
+
+
+def test_spec_id_equals_beats_description_rule():
+    rule_set = _spec_rule_set()
+    _, store = parse_kml(BytesIO(SPEC_KML), rule_set)
+    assert store.type == ['OTB-4x1-Big-Bay', 'OTB-Deskripsi', 'Unknown']
+
+    # Tanpa indeks (kolom dibandingkan langsung) hasilnya sama
+    columns = {'name': store.name, 'description': store.description,
+               'spec_id': store.attribute_values('spec_id')}
+    assert rule_set.classify(columns) == store.type
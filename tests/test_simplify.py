@@ -0,0 +1,120 @@
+"""simplify_mask (vektor) harus sama dengan Douglas-Peucker rekursif per garis"""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from movetoheal.simplify import PROTECT_TYPES, SNAP_DISTANCE, simplify_mask, simplify_store
+from movetoheal.spatial import local_scale
+from movetoheal.store import PlacemarkStoreBuilder
+
+
+def _segment_distance(p, a, b):
+    ab_x, ab_y = b[0] - a[0], b[1] - a[1]
+    length2 = ab_x * ab_x + ab_y * ab_y
+    t = ((p[0] - a[0]) * ab_x + (p[1] - a[1]) * ab_y) / (length2 if length2 > 0 else 1.0)
+    t = min(max(t, 0.0), 1.0)
+    return math.hypot(p[0] - (a[0] + t * ab_x), p[1] - (a[1] + t * ab_y))
+
+
+def _douglas_peucker(xy, first, last, tolerance, keep):
+    """Rekursi klasik: belah di vertex terjauh (yang pertama bila sama jauh)"""
+    if last - first < 2:
+        return
+    distances = [_segment_distance(xy[i], xy[first], xy[last]) for i in range(first + 1, last)]
+    farthest = max(range(len(distances)), key=lambda i: (distances[i], -i))
+    if distances[farthest] > tolerance:
+        pivot = first + 1 + farthest
+        keep[pivot] = True
+        _douglas_peucker(xy, first, pivot, tolerance, keep)
+        _douglas_peucker(xy, pivot, last, tolerance, keep)
+
+
+def reference_mask(store, tolerance, protect_types=PROTECT_TYPES, snap_distance=SNAP_DISTANCE):
+    """Mask referensi: satu garis demi satu garis, anchor dicari brute force"""
+    keep = np.ones(len(store.coords), dtype=bool)
+    if tolerance <= 0:
+        return keep
+    xy = (store.coords[:, :2] * local_scale(store.coords)).tolist()
+    nodes = [xy[store.offsets[i]] for i in range(len(store))
+             if store.geometry_type(i) == 'Point' and store.vertex_count(i) and store.type[i] in protect_types]
+    for i in range(len(store)):
+        start, stop = int(store.offsets[i]), int(store.offsets[i + 1])
+        if store.geometry_type(i) != 'LineString' or stop - start < 3:
+            continue
+        keep[start:stop] = False
+        anchors = [start, stop - 1] + [
+            vertex for vertex in range(start + 1, stop - 1)
+            if any(math.hypot(xy[vertex][0] - node[0], xy[vertex][1] - node[1]) <= snap_distance for node in nodes)
+        ]
+        anchors = sorted(set(anchors))
+        keep[anchors] = True
+        for first, last in zip(anchors[:-1], anchors[1:]):
+            _douglas_peucker(xy, first, last, tolerance, keep)
+    return keep
+
+
+def _random_store(seed):
+    rng = random.Random(seed)
+    builder = PlacemarkStoreBuilder()
+    types = []
+
+    def add(geometry_type, coords, type_name):
+        builder.append({'name': type_name, 'description': '', 'icon_url': 'N/A',
+                        'geometry_type': geometry_type, 'coordinates': np.array(coords, dtype=np.float64)}, 0)
+        types.append(type_name)
+
+    line_vertices = []
+    for _ in range(40):
+        count = rng.choice([2, 3, 4, rng.randint(5, 200)])
+        lon, lat = 106.0 + rng.random() * 0.1, -6.0 - rng.random() * 0.1
+        coords = []
+        for _ in range(count):
+            lon += rng.gauss(0, 1e-4)
+            lat += rng.gauss(0, 1e-4)
+            coords.append((lon, lat, 0.0))
+        add('LineString', coords, 'KU-Line')
+        line_vertices.extend(coords)
+    # Garis degenerate: semua vertex sama, kolinear, vertex berulang dan garis tertutup
+    add('LineString', [(106.05, -6.05, 0.0)] * 6, 'KU-Line')
+    add('LineString', [(106.05 + j * 1e-4, -6.05, 0.0) for j in range(8)], 'KU-Line')
+    add('LineString', [(106.06, -6.06, 0.0), (106.06, -6.06, 0.0), (106.061, -6.0605, 0.0),
+                       (106.061, -6.0605, 0.0), (106.062, -6.06, 0.0)], 'KU-Line')
+    add('LineString', [(106.07, -6.07, 0.0), (106.071, -6.07, 0.0), (106.071, -6.071, 0.0),
+                       (106.0705, -6.0712, 0.0), (106.07, -6.07, 0.0)], 'KU-Line')
+    add('LineString', [], 'KU-Line')
+    # Titik di atas vertex garis: JC01/OB dilindungi, OC tidak
+    for type_name in ('JC01', 'OB', 'OC', 'OC'):
+        for vertex in rng.sample(line_vertices, 15):
+            add('Point', [vertex], type_name)
+    store = builder.build()
+    store.type = types
+    return store
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('tolerance', [0.5, 3.0, 20.0])
+def test_simplify_mask_matches_reference(seed, tolerance):
+    store = _random_store(seed)
+    expected = reference_mask(store, tolerance)
+    assert np.array_equal(simplify_mask(store, tolerance), expected)
+    assert np.array_equal(simplify_mask(store, tolerance, protect_types=()), reference_mask(store, tolerance, ()))
+
+
+def test_protected_vertices_and_short_lines_are_kept():
+    store = _random_store(7)
+    keep = simplify_mask(store, 1e6)
+    for i in range(len(store)):
+        start, stop = store.offsets[i], store.offsets[i + 1]
+        if store.geometry_type(i) != 'LineString' or stop - start < 3:
+            assert keep[start:stop].all()
+    protected = [store.coordinates(i)[0] for i in range(len(store)) if store.type[i] in PROTECT_TYPES]
+    line_coords = store.coords[np.repeat(store.geometry, np.diff(store.offsets)) == 2]
+    kept = {tuple(row) for row in store.coords[keep].tolist()}
+    for node in protected:
+        if any(np.array_equal(node, row) for row in line_coords):
+            assert tuple(node.tolist()) in kept
+
+    simplified = simplify_store(store, 1e6)
+    assert len(simplified.coords) == int(keep.sum())
@@ -0,0 +1,63 @@
+"""Validasi topologi jaringan dan KML pelanggarnya"""
+from io import BytesIO
+
+from movetoheal.export import render_validation
+from movetoheal.parser import parse_kml
+from movetoheal.validate import build_spatial_index, report_rows, validate_network
+
+from tests.test_diff import EMPTY_TEXT_KML
+
+# Kabel KU ~110 m ke timur: ujung awal di JC01, ujung akhir menggantung.
+# Dua OB bernama sama bertumpuk di atas kabel; titik tanpa nama ~1 km dari kabel.
+NETWORK_KML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document><Folder><name>Jaringan</name>
+<Placemark><name>K1-KU</name><LineString><coordinates>106.0,-6.0 106.001,-6.0</coordinates></LineString></Placemark>
+<Placemark><name>JC01-A</name><Point><coordinates>106.0,-6.0</coordinates></Point></Placemark>
+<Placemark><name>P1-OB</name><Point><coordinates>106.0005,-6.0</coordinates></Point></Placemark>
+<Placemark><name>P1-OB</name><Point><coordinates>106.0005,-6.0</coordinates></Point></Placemark>
+<Placemark><name/><Point><coordinates>106.01,-6.0</coordinates></Point></Placemark>
+</Folder></Document></kml>
+"""
+
+POINT_TYPES = ('OB', 'JC01', 'Unknown')
+
+
+def _validate(kml):
+    folders_data, store = parse_kml(BytesIO(kml))
+    index = build_spatial_index(store)
+    return store, validate_network(folders_data, store, index, point_types=POINT_TYPES)
+
+
+def test_validate_network_rows():
+    store, report = _validate(NETWORK_KML)
+
+    assert [(row['Nama'], row['Ujung']) for row in report['dangling']] == [('K1-KU', 'akhir')]
+    assert report['dangling'][0]['Lon'] == 106.001
+
+    stacked = report['stacked']
+    assert [row['Nama'] for row in stacked] == ['P1-OB', 'P1-OB']
+    assert all(row['Duplikat Nama'] and row['Jumlah di Grup'] == 2 for row in stacked)
+
+    assert [row['Nama'] for row in report['far']] == [None]
+    assert report['far'][0]['Jarak ke Kabel (m)'] is None or report['far'][0]['Jarak ke Kabel (m)'] > 50
+    assert report['summary'] == {'Titik Diperiksa': 4, 'Titik Jauh dari Kabel': 1,
+                                 'Ujung Kabel Menggantung': 1, 'Titik Bertumpuk': 2}
+    assert all('coords' not in row for row in report_rows(report['points']))
+
+
+def test_validation_kml():
+    _, report = _validate(NETWORK_KML)
+    text = render_validation(report).decode('utf-8')
+    assert '<name>K1-KU (akhir)</name>' in text
+    assert text.count('<name>P1-OB</name>') == 2
+    assert '<name></name>' in text
+    assert 'None' not in text
+    assert '<coordinates>106.001,-6</coordinates>' in text
+
+
+def test_validation_kml_with_empty_name_and_description():
+    _, report = _validate(EMPTY_TEXT_KML)
+    assert len(report['far']) == 2
+    for output_format in ('kml', 'kmz'):
+        assert render_validation(report, output_format=output_format)
+    assert 'None' not in render_validation(report).decode('utf-8')